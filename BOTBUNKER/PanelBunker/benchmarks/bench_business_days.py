@@ -0,0 +1,86 @@
+"""
+Benchmark: business-day offsets for delivery estimates
+
+For --rows random (start date, transit days) pairs (no database needed),
+times:
+  - loop:       the former ShippingCalculator._add_business_days() day-by-day
+                walk (weekends only, no holidays)
+  - calendar:   BusinessCalendar.add_business_days() per row, with the
+                destination's national and regional holidays
+  - vectorized: BusinessCalendar.offset() on the whole array in one call
+
+and checks that the calendar results are the loop's with holidays skipped.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_business_days.py [--rows 100000] [--province Barcelona]
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tracking.business_days import business_calendar
+
+
+def legacy_add_business_days(start_date: datetime, business_days: int) -> datetime:
+    """The loop ShippingCalculator used before tracking.business_days"""
+    current_date = start_date
+    days_added = 0
+
+    while days_added < business_days:
+        current_date += timedelta(days=1)
+        # Skip weekends (Saturday=5, Sunday=6)
+        if current_date.weekday() < 5:
+            days_added += 1
+
+    return current_date
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="start dates to offset")
+    parser.add_argument('--max-days', type=int, default=15, help="largest transit time in business days")
+    parser.add_argument('--country', default='ES', help="destination country code")
+    parser.add_argument('--province', default='Barcelona', help="destination province")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    first_day = np.datetime64(date(date.today().year, 1, 1), 'D')
+    start_days = first_day + rng.integers(0, 365, args.rows)
+    days = rng.integers(1, args.max_days + 1, args.rows)
+    starts = [datetime.combine(day.item(), datetime.min.time()) for day in start_days]
+
+    timings = {}
+    begin = time.perf_counter()
+    legacy = [legacy_add_business_days(start, int(n)) for start, n in zip(starts, days)]
+    timings['loop'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    scalar = [business_calendar.add_business_days(start, int(n), args.country, args.province)
+              for start, n in zip(starts, days)]
+    timings['calendar'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    vectorized = business_calendar.offset(start_days, days, args.country, args.province)
+    timings['vectorized'] = time.perf_counter() - begin
+
+    assert [d.date() for d in scalar] == vectorized.astype(object).tolist(), "scalar and vectorized disagree"
+    moved = sum(a != b for a, b in zip(legacy, scalar))
+
+    print(f"{args.rows:,} offsets of 1-{args.max_days} business days to {args.province} ({args.country}), "
+          f"{business_calendar.stats()}\n")
+    print(f"{'strategy':>11} {'total ms':>10} {'us/row':>8} {'speedup':>8}")
+    for label, seconds in timings.items():
+        print(f"{label:>11} {seconds * 1000:>10.1f} {seconds / args.rows * 1e6:>8.3f} "
+              f"{timings['loop'] / seconds:>7.1f}x")
+    print(f"\n{moved:,} estimates ({moved / args.rows:.1%}) move because of holidays the loop ignored")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: batch recomputation of stored delivery estimates
+
+Builds --rows synthetic trackings in the shape DatabaseManager.
+get_delivery_estimate_inputs() returns (seeded routes, Spanish provinces,
+random distances, delays and ship dates; no database needed) and times:
+  - per-row: the scalar path, EtaEngine.route_days() raised by the route
+             distance + BusinessCalendar.add_business_days() + strftime per tracking
+  - batch:   EtaBatch.from_rows() + compute_delivery_estimates() +
+             format_delivery_dates() + changed_estimates(), split by stage
+
+and checks that both produce the same transit days and dates.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_eta_batch.py [--rows 100000]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('ORS_API_KEY', 'bench')
+
+from tracking.models import ShippingRoute, CREATE_TABLES_SQL
+from tracking.business_days import business_calendar
+from tracking.openroute_service import estimate_transit_days
+from tracking.shipping_calculator import shipping_calc
+from tracking.eta_batch import EtaBatch, compute_delivery_estimates, format_delivery_dates, changed_estimates
+
+PROVINCES = ["Madrid", "Barcelona", "Sevilla", "Valencia", "Bizkaia", "A Coruña", "Murcia", "Zaragoza", ""]
+
+
+def synthetic_rows(routes, count: int, rng: random.Random):
+    """Rows shaped like get_delivery_estimate_inputs() output"""
+    first_day = datetime(datetime.now().year, 1, 1, 9)
+    rows = []
+    for i in range(count):
+        route = rng.choice(routes)
+        rows.append((
+            f"BB{i:08d}", route.origin_country, route.destination_country, rng.choice(PROVINCES),
+            rng.uniform(20, 2500) if rng.random() < 0.7 else None,
+            rng.randint(2, 12), rng.choice((0, 0, 0, 1, 2, 5)), None,
+            first_day + timedelta(days=rng.randrange(365), hours=rng.randrange(10)),
+        ))
+    return rows
+
+
+def per_row(rows):
+    """The scalar equivalent of compute_delivery_estimates() + format_delivery_dates()"""
+    results = []
+    for _, origin, destination, province, distance_km, _, delay_days, _, start in rows:
+        origin_code = shipping_calc._normalize_country_code(origin)
+        destination_code = shipping_calc.destination_code(destination)
+        days = shipping_calc.eta.route_days(origin, destination)
+        if distance_km is not None:
+            by_distance = estimate_transit_days(distance_km, origin_code != destination_code)
+            days = by_distance if days is None else max(days, by_distance)
+        date = business_calendar.add_business_days(start, days + delay_days, destination_code, province)
+        results.append((days, date.strftime("%d/%m/%Y")))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="trackings to recompute")
+    args = parser.parse_args()
+
+    routes = [ShippingRoute(origin, destination, int(days))
+              for origin, destination, days in re.findall(r"\('([^']+)', '([^']+)', (\d+)\)", CREATE_TABLES_SQL)]
+    shipping_calc.eta.load(routes)
+    rows = synthetic_rows(routes, args.rows, random.Random(42))
+
+    begin = time.perf_counter()
+    expected = per_row(rows)
+    per_row_s = time.perf_counter() - begin
+
+    timings = {}
+    begin = time.perf_counter()
+    batch = EtaBatch.from_rows(rows, shipping_calc._normalize_country_code, shipping_calc.destination_code)
+    timings['columns'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    base_days, dates = compute_delivery_estimates(batch, shipping_calc.eta, business_calendar)
+    timings['compute'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    formatted = format_delivery_dates(dates)
+    timings['format'] = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    changes = changed_estimates(batch, base_days, formatted)
+    timings['diff'] = time.perf_counter() - begin
+    batch_s = sum(timings.values())
+
+    assert list(zip(base_days.tolist(), formatted)) == expected, "batch and per-row estimates disagree"
+
+    print(f"{args.rows:,} trackings over {len(routes)} routes, {len(changes):,} changed estimates\n")
+    print(f"{'stage':>9} {'total ms':>10} {'us/row':>8}")
+    for label, seconds in timings.items():
+        print(f"{label:>9} {seconds * 1000:>10.1f} {seconds / args.rows * 1e6:>8.3f}")
+    print(f"{'batch':>9} {batch_s * 1000:>10.1f} {batch_s / args.rows * 1e6:>8.3f}")
+    print(f"{'per-row':>9} {per_row_s * 1000:>10.1f} {per_row_s / args.rows * 1e6:>8.3f}")
+    print(f"\nbatch is {per_row_s / batch_s:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
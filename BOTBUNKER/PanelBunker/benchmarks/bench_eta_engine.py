@@ -0,0 +1,71 @@
+"""
+Benchmark: offline transit-days lookups from the shipping_routes matrix
+
+Loads the routes seeded in CREATE_TABLES_SQL into an EtaEngine (no database
+or network needed) and times, over --lookups random addresses in seeded
+countries:
+  - matrix:   EtaEngine.route_days() for a country pair
+  - distance: EtaEngine.estimate_days() with the great-circle distance
+              between cached coordinates (haversine included)
+  - batch:    EtaEngine.route_days_many() on all pairs at once
+
+The OpenRouteService path it replaces costs two geocodes and a directions
+request per estimate (see benchmarks/bench_ors_client.py for their latency).
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_eta_engine.py [--lookups 100000]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('ORS_API_KEY', 'bench')
+
+from tracking.models import ShippingRoute, CREATE_TABLES_SQL
+from tracking.gazetteer import haversine_km
+from tracking.shipping_calculator import shipping_calc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=100_000, help="estimates to compute")
+    args = parser.parse_args()
+
+    routes = [ShippingRoute(origin, destination, int(days))
+              for origin, destination, days in re.findall(r"\('([^']+)', '([^']+)', (\d+)\)", CREATE_TABLES_SQL)]
+    engine = shipping_calc.eta
+    engine.load(routes)
+
+    rng = random.Random(42)
+    pairs = [rng.choice(routes) for _ in range(args.lookups)]
+    origins = [route.origin_country for route in pairs]
+    destinations = [route.destination_country for route in pairs]
+    points = [(rng.uniform(36, 43), rng.uniform(-9, 3), rng.uniform(36, 43), rng.uniform(-9, 3)) for _ in pairs]
+
+    start = time.perf_counter()
+    for origin, destination in zip(origins, destinations):
+        engine.route_days(origin, destination)
+    matrix_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for origin, destination, (lat1, lon1, lat2, lon2) in zip(origins, destinations, points):
+        engine.estimate_days(origin, destination, haversine_km(lat1, lon1, lat2, lon2))
+    distance_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.route_days_many(origins, destinations)
+    batch_s = time.perf_counter() - start
+
+    print(f"{len(routes)} routes between {engine.stats()['countries']} countries, {args.lookups:,} lookups\n")
+    print(f"{'lookup':>9} {'total ms':>10} {'us/lookup':>10}")
+    for label, seconds in (("matrix", matrix_s), ("distance", distance_s), ("batch", batch_s)):
+        print(f"{label:>9} {seconds * 1000:>10.1f} {seconds / args.lookups * 1e6:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: SELECT * into Tracking vs projected columns into TrackingSummary
+
+Fills a temporary copy of trackings with rows carrying realistic route data
+(encoded geometry, formatted addresses, coordinates), then reads one page of
+--rows rows both ways and reports the payload transferred (text protocol),
+Python allocations (tracemalloc peak and retained) and wall time.
+
+Usage (from BOTBUNKER/PanelBunker, with DATABASE_URL set):
+    python benchmarks/bench_list_projection.py [--rows 10000] [--repeat 3]
+"""
+
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import psycopg2
+import psycopg2.extras
+
+from tracking.database import resolve_database_url
+from tracking.models import Tracking, TrackingSummary, SUMMARY_COLUMNS
+
+POPULATE_SQL = """
+INSERT INTO bench_trackings (
+    tracking_id, delivery_address, date_time, package_weight, product_name,
+    sender_address, product_price, recipient_postal_code, recipient_province, recipient_country,
+    sender_postal_code, sender_province, sender_country, recipient_name, country_postal,
+    status, created_at, updated_at, estimated_delivery_date, user_telegram_id, username,
+    sender_lat, sender_lon, sender_formatted_address,
+    recipient_lat, recipient_lon, recipient_formatted_address,
+    route_distance_km, route_duration_hours, route_geometry
+)
+SELECT
+    'PK' || lpad(g::text, 21, '0'),
+    'Calle Mayor ' || g || ', 28013 Madrid', '01/01/2025 10:00', '1.50 kg', 'Producto ' || g,
+    'Avenida Diagonal ' || g || ', 08019 Barcelona', '$25.00', '28013', 'Madrid', 'España',
+    '08019', 'Barcelona', 'España', 'Destinatario ' || g, 'España 28013',
+    'EN_TRANSITO', NOW() - g * INTERVAL '1 minute', NOW(), '15/01/2025', 42, 'user42',
+    41.40338000, 2.17403000, 'Avinguda Diagonal ' || g || ', 08019 Barcelona, Catalunya, España',
+    40.41678000, -3.70379000, 'Calle Mayor ' || g || ', 28013 Madrid, Comunidad de Madrid, España',
+    620.50, 6.25,
+    -- An encoded polyline for a ~600 km route is several KB
+    (SELECT string_agg(md5(g::text || i::text), '') FROM generate_series(1, 150) AS i)
+FROM generate_series(1, %s) AS g
+"""
+
+FULL_SQL = "SELECT * FROM bench_trackings WHERE status = %s ORDER BY created_at DESC, tracking_id DESC LIMIT %s"
+SUMMARY_SQL = (
+    f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM bench_trackings "
+    "WHERE status = %s ORDER BY created_at DESC, tracking_id DESC LIMIT %s"
+)
+
+
+def read_full(conn, rows):
+    """Old path: every column through RealDictCursor into Tracking"""
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(FULL_SQL, ("EN_TRANSITO", rows))
+        return [Tracking(**dict(row)) for row in cur.fetchall()]
+
+
+def read_summary(conn, rows):
+    """New path: displayed columns only, tuple rows into TrackingSummary"""
+    with conn.cursor() as cur:
+        cur.execute(SUMMARY_SQL, ("EN_TRANSITO", rows))
+        return [TrackingSummary(*row) for row in cur.fetchall()]
+
+
+def payload_bytes(conn, sql, rows):
+    """Approximate bytes on the wire: size of every value in text form"""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT SUM(octet_length(page::text)) FROM ({sql}) AS page", ("EN_TRANSITO", rows))
+        return cur.fetchone()[0] or 0
+
+
+def measure(conn, reader, rows, repeat):
+    """Return (avg seconds, tracemalloc peak bytes, retained bytes)"""
+    elapsed = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reader(conn, rows)
+        elapsed += time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = reader(conn, rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed / repeat, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000, help="rows in the page")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per strategy")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_database_url())
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE bench_trackings (LIKE trackings INCLUDING DEFAULTS)")
+        cur.execute(POPULATE_SQL, (args.rows,))
+        cur.execute("ANALYZE bench_trackings")
+    conn.commit()
+
+    print(f"{'strategy':>10} {'payload MB':>11} {'peak MB':>9} {'retained MB':>12} {'avg ms':>9}")
+    results = {}
+    for label, reader, sql in (("SELECT *", read_full, FULL_SQL), ("summary", read_summary, SUMMARY_SQL)):
+        payload = payload_bytes(conn, sql, args.rows)
+        seconds, peak, retained = measure(conn, reader, args.rows, args.repeat)
+        results[label] = (payload, peak, retained, seconds)
+        print(f"{label:>10} {payload / 1e6:>11.2f} {peak / 1e6:>9.2f} {retained / 1e6:>12.2f} {seconds * 1000:>9.1f}")
+
+    full, summary = results["SELECT *"], results["summary"]
+    print(f"\nReduction: payload {1 - summary[0] / full[0]:.0%}, peak allocations {1 - summary[1] / full[1]:.0%}, "
+          f"retained {1 - summary[2] / full[2]:.0%}, time {1 - summary[3] / full[3]:.0%}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
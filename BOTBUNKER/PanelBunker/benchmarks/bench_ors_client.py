@@ -0,0 +1,163 @@
+"""
+Benchmark: shared keep-alive OpenRouteService client vs a new client per call
+
+Starts a local stub of the ORS endpoints (geocode/search, geocode/reverse,
+v2/directions) and replays the calls made by one ship_package (2 geocodes,
+1 directions request, 20 reverse geocodes) --shipments times with:
+  - per-call: a fresh httpx.AsyncClient for every request (the old behaviour)
+  - shared:   OpenRouteService's long-lived client with keep-alive
+
+and reports per-call latency (mean, p50, p95) and connections opened.
+--connect-delay-ms adds a delay to every new connection on the stub to
+model the TCP + TLS handshake to the real API; --tls-cert/--tls-key serve
+real TLS instead.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_ors_client.py [--shipments 20] [--connect-delay-ms 0]
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import threading
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('ORS_API_KEY', 'bench')
+# Measure HTTP reuse only, not the persistent geocode and route caches
+os.environ.setdefault('GEOCODE_CACHE_TTL_DAYS', '0')
+os.environ.setdefault('REVERSE_GEOCODE_CACHE_SIZE', '0')
+os.environ.setdefault('ROUTE_CACHE_TTL_DAYS', '0')
+
+from tracking.openroute_service import OpenRouteService
+
+FEATURE = {
+    "features": [{
+        "geometry": {"coordinates": [-3.70379, 40.41678]},
+        "properties": {"label": "Madrid, España", "country": "España", "region": "Madrid",
+                       "county": "Madrid", "locality": "Madrid", "confidence": 1}
+    }]
+}
+ROUTE = {
+    "routes": [{
+        "summary": {"distance": 620.5, "duration": 22500.0},
+        "geometry": "_p~iF~ps|U_ulLnnqC_mqNvxq`@" * 40,
+        "segments": []
+    }]
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+    connect_delay = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+
+    def _reply(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(FEATURE)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(ROUTE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PerCallORS(OpenRouteService):
+    """Old behaviour: a new client (connection pool, handshake) for every request"""
+
+    @asynccontextmanager
+    async def client(self):
+        async with self._new_client() as client:
+            yield client
+
+
+async def timed(latencies, call):
+    start = time.perf_counter()
+    result = await call
+    latencies.append(time.perf_counter() - start)
+    return result
+
+
+async def ship_package_calls(service: OpenRouteService, latencies: list):
+    """The ORS requests one ship_package makes, in order"""
+    await timed(latencies, service.geocode_address("Avenida Diagonal 1, 08019, Barcelona", "ES"))
+    await timed(latencies, service.geocode_address("Calle Mayor 1, 28013, Madrid", "ES"))
+    await timed(latencies, service.calculate_route((2.17403, 41.40338), (-3.70379, 40.41678)))
+    for i in range(20):
+        await timed(latencies, service.reverse_geocode(41.0 - i * 0.05, 2.0 - i * 0.28))
+
+
+async def run(service: OpenRouteService, shipments: int) -> list:
+    latencies = []
+    await service.open()
+    try:
+        for _ in range(shipments):
+            await ship_package_calls(service, latencies)
+    finally:
+        await service.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shipments', type=int, default=20, help="ship_package call sequences to replay")
+    parser.add_argument('--connect-delay-ms', type=float, default=0.0,
+                        help="delay added to each new connection (models the TLS handshake)")
+    parser.add_argument('--tls-cert', help="serve HTTPS with this certificate (PEM)")
+    parser.add_argument('--tls-key', help="private key for --tls-cert")
+    args = parser.parse_args()
+
+    StubHandler.connect_delay = args.connect_delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    scheme = "http"
+    if args.tls_cert:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.tls_cert, args.tls_key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+        # Trust the stub's certificate in httpx
+        os.environ['SSL_CERT_FILE'] = args.tls_cert
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+    print(f"Stub ORS at {base_url}, {args.shipments} shipments x 23 calls, "
+          f"connect delay {args.connect_delay_ms:g} ms\n")
+    print(f"{'client':>10} {'calls':>6} {'connections':>12} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    means = {}
+    for label, cls in (("per-call", PerCallORS), ("shared", OpenRouteService)):
+        service = cls()
+        service.base_url = base_url
+        StubHandler.connections = 0
+        latencies = asyncio.run(run(service, args.shipments))
+        ms = sorted(latency * 1000 for latency in latencies)
+        means[label] = statistics.mean(ms)
+        print(f"{label:>10} {len(ms):>6} {StubHandler.connections:>12} {means[label]:>8.2f} "
+              f"{ms[len(ms) // 2]:>8.2f} {ms[int(len(ms) * 0.95)]:>8.2f}")
+
+    print(f"\nShared client: {1 - means['shared'] / means['per-call']:.0%} lower mean latency per call")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
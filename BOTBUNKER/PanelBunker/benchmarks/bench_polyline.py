@@ -0,0 +1,127 @@
+"""
+Benchmark: decoding and simplifying route polylines
+
+For polylines of 1k, 10k and 100k vertices (no database or network needed),
+times:
+  - legacy: the former character-by-character decoder (list of tuples)
+  - decode: tracking.polyline.decode_polyline() on the str, as ORS returns it
+  - decode bytes: the same on bytes, skipping the ASCII encode
+  - simplify: Douglas-Peucker at --tolerance metres, with the vertices kept
+  - sample: distance_sample() of 20 checkpoints on the decoded route
+
+Polylines are recorded once from a seeded road-like random walk (street
+segments every ~15 m, motorway stretches every ~300 m); pass --file with one
+encoded polyline per line to benchmark real ORS responses instead.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_polyline.py [--sizes 1000 10000 100000] [--tolerance 50] [--file routes.txt]
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tracking.polyline import decode_polyline, encode_polyline, simplify_polyline
+from tracking.route_sampling import distance_sample
+
+KM_PER_DEGREE = 111.32
+
+
+def legacy_decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """The decoder openroute_service used before tracking.polyline"""
+    coordinates = []
+    index = 0
+    lat = 0
+    lon = 0
+
+    while index < len(encoded):
+        shift = 0
+        result = 0
+        while True:
+            b = ord(encoded[index]) - 63
+            index += 1
+            result |= (b & 0x1f) << shift
+            shift += 5
+            if b < 0x20:
+                break
+
+        dlat = ~(result >> 1) if result & 1 else result >> 1
+        lat += dlat
+
+        shift = 0
+        result = 0
+        while True:
+            b = ord(encoded[index]) - 63
+            index += 1
+            result |= (b & 0x1f) << shift
+            shift += 5
+            if b < 0x20:
+                break
+
+        dlon = ~(result >> 1) if result & 1 else result >> 1
+        lon += dlon
+
+        coordinates.append((lon / (10 ** precision), lat / (10 ** precision)))
+
+    return coordinates
+
+
+def record_route(points: int, seed: int) -> str:
+    """Encoded road-like route of `points` vertices starting in Madrid"""
+    rng = np.random.default_rng(seed)
+    # Alternate street segments (short steps, sharp turns) and motorway stretches
+    segment = np.repeat(rng.random(points // 200 + 1) < 0.3, 200)[:points]
+    step_km = np.where(segment, 0.015, 0.3) * rng.uniform(0.5, 1.5, points)
+    heading = np.cumsum(np.where(segment, rng.normal(0, 0.3, points), rng.normal(0, 0.01, points))) + 0.8
+    lat = 40.4168 + np.cumsum(step_km * np.cos(heading)) / KM_PER_DEGREE
+    lon = -3.7038 + np.cumsum(step_km * np.sin(heading)) / (KM_PER_DEGREE * np.cos(np.radians(lat)))
+    return encode_polyline(np.column_stack((lon, lat)))
+
+
+def best_of(repeat, func, *args):
+    """(best seconds, result) over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000], help="vertices per route")
+    parser.add_argument('--tolerance', type=float, default=50.0, help="simplification tolerance in metres")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per step (best is reported)")
+    parser.add_argument('--file', help="encoded polylines, one per line, instead of the recorded routes")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            routes = [line.strip() for line in f if line.strip()]
+    else:
+        routes = [record_route(size, seed=size) for size in args.sizes]
+
+    print(f"{'points':>8} {'KB':>7} {'legacy ms':>10} {'decode ms':>10} {'bytes ms':>9} {'speedup':>8} "
+          f"{'simplify ms':>12} {'kept':>6} {'sample ms':>10}")
+    for encoded in routes:
+        raw = encoded.encode('ascii')
+        legacy_s, legacy = best_of(args.repeat, legacy_decode_polyline, encoded)
+        decode_s, coordinates = best_of(args.repeat, decode_polyline, encoded)
+        bytes_s, _ = best_of(args.repeat, decode_polyline, raw)
+        assert np.array_equal(coordinates, np.array(legacy)), "decoders disagree"
+        simplify_s, simplified = best_of(args.repeat, simplify_polyline, coordinates, args.tolerance)
+        sample_s, _ = best_of(args.repeat, distance_sample, coordinates, 20)
+        print(f"{len(coordinates):>8,} {len(raw) / 1024:>7.1f} {legacy_s * 1000:>10.2f} {decode_s * 1000:>10.2f} "
+              f"{bytes_s * 1000:>9.2f} {legacy_s / decode_s:>7.1f}x {simplify_s * 1000:>12.2f} "
+              f"{len(simplified):>6,} {sample_s * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: per-event INSERTs vs a single multi-row INSERT for route history
+
+Writes the timeline produced by build_route_timeline() for routes with 5, 20
+and 50 checkpoints into a temporary copy of status_history and reports round
+trips and wall time for both strategies.
+
+Usage (from BOTBUNKER/PanelBunker, with DATABASE_URL set):
+    python benchmarks/bench_route_history.py [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import psycopg2
+import psycopg2.extras
+
+from tracking.database import resolve_database_url, build_route_timeline
+
+CHECKPOINT_COUNTS = [5, 20, 50]
+TRACKING_ID = "PKBENCHMARK0000000000000"
+
+
+def insert_per_event(conn, events):
+    """Old strategy: one INSERT per event. Returns round trips used."""
+    with conn.cursor() as cur:
+        for old_status, new_status, notes, changed_at in events:
+            cur.execute(
+                "INSERT INTO bench_status_history (tracking_id, old_status, new_status, notes, changed_at) VALUES (%s, %s, %s, %s, %s)",
+                (TRACKING_ID, old_status, new_status, notes, changed_at)
+            )
+    conn.commit()
+    return len(events) + 1
+
+
+def insert_batched(conn, events):
+    """New strategy: the whole timeline in one statement. Returns round trips used."""
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO bench_status_history (tracking_id, old_status, new_status, notes, changed_at) VALUES %s",
+            [(TRACKING_ID, *event) for event in events],
+            page_size=len(events)
+        )
+    conn.commit()
+    return 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="runs per strategy and size")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_database_url())
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE bench_status_history (LIKE status_history INCLUDING DEFAULTS)")
+    conn.commit()
+
+    print(f"{'checkpoints':>11} {'events':>7} {'strategy':>10} {'round trips':>12} {'avg ms':>9}")
+    for count in CHECKPOINT_COUNTS:
+        names = [f"Localidad {i}" for i in range(count)]
+        events = build_route_timeline(names, estimated_days=5, start_datetime=datetime.now())
+
+        for label, strategy in (("per-event", insert_per_event), ("batched", insert_batched)):
+            elapsed = 0.0
+            round_trips = 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                round_trips = strategy(conn, events)
+                elapsed += time.perf_counter() - start
+            avg_ms = elapsed / args.repeat * 1000
+            print(f"{count:>11} {len(events):>7} {label:>10} {round_trips:>12} {avg_ms:>9.1f}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
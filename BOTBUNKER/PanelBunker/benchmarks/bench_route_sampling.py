@@ -0,0 +1,127 @@
+"""
+Benchmark: choosing route checkpoints to reverse geocode
+
+Compares, on a synthetic route (no database or network needed):
+  - index: the former sampler, every N-th polyline vertex
+  - distance: distance_sample(), equal spacing along the route
+  - snapped: distance_sample() nudged toward the nearest known locality
+
+The route leaves and enters cities whose streets have many vertices, and
+in between follows a motorway with few vertices past smaller towns. A
+sampled point "reverse geocodes" to a place only within its extent
+(--town-radius km for towns; elsewhere it is open countryside); snapping looks for towns within
+--snap-radius km, like the gazetteer. The benchmark reports lookups per
+unique checkpoint (lower is better: fewer wasted API calls per town shown
+to the user) and sampling time.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_route_sampling.py [--towns 40] [--samples 20] [--repeat 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tracking.route_sampling import distance_sample, index_sample
+from tracking.gazetteer import haversine_km
+
+START = (40.4168, -3.7038)  # Madrid
+KM_PER_DEGREE = 111.32
+
+
+def synthetic_route(towns: int, town_km: float, metro_km: float, gap_km: float, dense_every_m: float,
+                    sparse_every_m: float, seed: int):
+    """[(lon, lat)] vertices and [(lat, lon, radius km)] places along a wandering route"""
+    rng = np.random.default_rng(seed)
+    coordinates, places = [], []
+    lat, lon = START
+    heading = np.radians(45.0)
+
+    def walk(length_km, every_m):
+        nonlocal lat, lon, heading
+        for _ in range(max(1, int(length_km * 1000 / every_m))):
+            heading += rng.normal(0, 0.05)
+            step_km = every_m / 1000
+            lat += step_km * np.cos(heading) / KM_PER_DEGREE
+            lon += step_km * np.sin(heading) / (KM_PER_DEGREE * np.cos(np.radians(lat)))
+            coordinates.append((lon, lat))
+
+    # City streets at both ends are the densest part of the polyline; in between
+    # the motorway has few vertices and passes a few km off each town centre
+    coordinates.append((lon, lat))
+    walk(metro_km / 2, dense_every_m)
+    places.append((lat, lon, metro_km / 2))
+    walk(metro_km / 2, dense_every_m)
+    for _ in range(towns):
+        walk(gap_km * rng.uniform(0.5, 1.5), sparse_every_m)
+        offset_km = rng.uniform(1, town_km + 1) * rng.choice((-1, 1))
+        places.append((lat - offset_km * np.sin(heading) / KM_PER_DEGREE,
+                       lon + offset_km * np.cos(heading) / (KM_PER_DEGREE * np.cos(np.radians(lat))), town_km))
+    walk(gap_km, sparse_every_m)
+    walk(metro_km / 2, dense_every_m)
+    places.append((lat, lon, metro_km / 2))
+    walk(metro_km / 2, dense_every_m)
+    return coordinates, places
+
+
+def make_resolve(places):
+    """Reverse geocoding stand-in: the place whose extent contains the point, if any"""
+    def resolve(lat, lon):
+        distance, place = min((haversine_km(lat, lon, p[0], p[1]), p) for p in places)
+        return place if distance <= place[2] else None
+    return resolve
+
+
+def make_nearest_place(places, radius_km):
+    """(lat, lon) of the nearest place within radius_km, like Gazetteer.nearest_place"""
+    def nearest_place(lat, lon):
+        distance, place = min((haversine_km(lat, lon, p[0], p[1]), p) for p in places)
+        return place[:2] if distance <= radius_km else None
+    return nearest_place
+
+
+def lookups_per_checkpoint(coordinates, indices, resolve):
+    found = {resolve(coordinates[i][1], coordinates[i][0]) for i in indices}
+    found.discard(None)
+    return len(indices), len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--towns', type=int, default=40, help="towns crossed by the route")
+    parser.add_argument('--samples', type=int, default=20, help="points to sample")
+    parser.add_argument('--town-radius', type=float, default=3.0, help="extent of the towns along the motorway")
+    parser.add_argument('--snap-radius', type=float, default=25.0, help="km within which snapping finds a town")
+    parser.add_argument('--repeat', type=int, default=200, help="timed runs per sampler")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    coordinates, places = synthetic_route(args.towns, town_km=args.town_radius, metro_km=25, gap_km=15,
+                                          dense_every_m=20, sparse_every_m=400, seed=args.seed)
+    resolve = make_resolve(places)
+    nearest_place = make_nearest_place(places, args.snap_radius)
+    print(f"Route: {len(coordinates):,} vertices, {args.towns} towns, {args.samples} samples\n")
+
+    samplers = (
+        ("index", lambda: index_sample(len(coordinates), args.samples)),
+        ("distance", lambda: distance_sample(coordinates, args.samples)),
+        ("snapped", lambda: distance_sample(coordinates, args.samples, nearest_place=nearest_place)),
+    )
+    print(f"{'sampler':>10} {'lookups':>8} {'unique':>7} {'lookups/unique':>15} {'ms/route':>9}")
+    for label, sample in samplers:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            indices = sample()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        lookups, unique = lookups_per_checkpoint(coordinates, indices, resolve)
+        ratio = f"{lookups / unique:.2f}" if unique else "-"
+        print(f"{label:>10} {lookups:>8} {unique:>7} {ratio:>15} {elapsed * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
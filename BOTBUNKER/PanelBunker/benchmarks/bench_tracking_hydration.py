@@ -0,0 +1,142 @@
+"""
+Benchmark: hydrating Tracking objects from rows
+
+Compares, for --rows synthetic rows (no database needed):
+  - legacy: RealDictCursor-style dict rows with every column, including the
+    route data, unpacked with Tracking(**dict(row)) into a regular dataclass
+  - slotted: tuple rows of TRACKING_SELECT columns fed to Tracking.from_row(),
+    with the heavy route columns left to lazy loading
+
+and reports Python allocations (tracemalloc peak and retained) and wall time.
+Row payloads are built before measuring, so only hydration is counted.
+
+Usage (from BOTBUNKER/PanelBunker):
+    python benchmarks/bench_tracking_hydration.py [--rows 100000] [--repeat 3]
+"""
+
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+from dataclasses import make_dataclass, fields
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tracking.models import Tracking, LIGHT_COLUMNS, HEAVY_COLUMNS
+
+# Same fields as Tracking, without slots: what the model looked like before
+LegacyTracking = make_dataclass(
+    'LegacyTracking', [(f.name, f.type, f) for f in fields(Tracking)]
+)
+
+START = datetime(2025, 1, 1, 10, 0)
+
+
+def sample_values(i: int) -> dict:
+    """Column values of one realistic tracking row"""
+    created_at = START + timedelta(minutes=i)
+    return {
+        'tracking_id': f"PK{i:021d}",
+        'delivery_address': f"Calle Mayor {i}, 28013 Madrid",
+        'date_time': '01/01/2025 10:00',
+        'package_weight': '1.50 kg',
+        'product_name': f"Producto {i}",
+        'sender_address': f"Avenida Diagonal {i}, 08019 Barcelona",
+        'product_price': '$25.00',
+        'recipient_postal_code': '28013',
+        'recipient_province': 'Madrid',
+        'recipient_country': 'España',
+        'sender_postal_code': '08019',
+        'sender_province': 'Barcelona',
+        'sender_country': 'España',
+        'recipient_name': f"Destinatario {i}",
+        'country_postal': 'España 28013',
+        'sender_name': None,
+        'sender_state': None,
+        'status': 'EN_TRANSITO',
+        'created_at': created_at,
+        'updated_at': created_at,
+        'estimated_delivery_date': '15/01/2025',
+        'actual_delay_days': 0,
+        'estimated_days': 3,
+        'user_telegram_id': 42,
+        'username': 'user42',
+        'created_by_admin_id': 7,
+        'sender_lat': 41.40338,
+        'sender_lon': 2.17403,
+        'sender_formatted_address': f"Avinguda Diagonal {i}, 08019 Barcelona, Catalunya, España",
+        'recipient_lat': 40.41678,
+        'recipient_lon': -3.70379,
+        'recipient_formatted_address': f"Calle Mayor {i}, 28013 Madrid, Comunidad de Madrid, España",
+        'route_distance_km': 620.5,
+        'route_duration_hours': 6.25,
+        # An encoded polyline for a ~600 km route is several KB
+        'route_geometry': f"{i:08x}" * 600,
+        'route_steps': [{'instruction': f"Paso {n}", 'distance': 1000.0 * n} for n in range(12)],
+        'current_step_index': 0,
+        'route_distance': 620500,
+        'route_duration': 22500,
+        'owner_id': None,
+        'created_by': None,
+        'route_states': 'Cataluña,Aragón,Madrid',
+    }
+
+
+def hydrate_legacy(rows):
+    return [LegacyTracking(**dict(row)) for row in rows]
+
+
+def hydrate_slotted(rows):
+    return [Tracking.from_row(row) for row in rows]
+
+
+def measure(hydrate, rows, repeat):
+    """Return (avg seconds, tracemalloc peak bytes, retained bytes)"""
+    elapsed = 0.0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        hydrate(rows)
+        elapsed += time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = hydrate(rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed / repeat, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="rows to hydrate")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per strategy")
+    args = parser.parse_args()
+
+    # Rows as each driver path hands them over
+    values = [sample_values(i) for i in range(args.rows)]
+    dict_rows = values
+    tuple_rows = [tuple(v[column] for column in LIGHT_COLUMNS) for v in values]
+
+    print(f"Hydrating {args.rows:,} rows ({len(LIGHT_COLUMNS)} light + {len(HEAVY_COLUMNS)} lazy columns)\n")
+    print(f"{'strategy':>10} {'peak MB':>9} {'retained MB':>12} {'avg ms':>9} {'us/row':>8}")
+    results = {}
+    for label, hydrate, rows in (("legacy", hydrate_legacy, dict_rows), ("slotted", hydrate_slotted, tuple_rows)):
+        seconds, peak, retained = measure(hydrate, rows, args.repeat)
+        results[label] = (peak, retained, seconds)
+        print(f"{label:>10} {peak / 1e6:>9.2f} {retained / 1e6:>12.2f} {seconds * 1000:>9.1f} "
+              f"{seconds / args.rows * 1e6:>8.2f}")
+
+    legacy, slotted = results["legacy"], results["slotted"]
+    print(f"\nReduction: peak allocations {1 - slotted[0] / legacy[0]:.0%}, "
+          f"retained {1 - slotted[1] / legacy[1]:.0%}, time {1 - slotted[2] / legacy[2]:.0%}")
+    print("(route payloads are shared with the input rows here; against a live database "
+          "the legacy path also transfers and decodes them for every row)")
+
+
+if __name__ == '__main__':
+    main()
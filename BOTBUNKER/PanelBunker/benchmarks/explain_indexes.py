@@ -0,0 +1,213 @@
+"""
+EXPLAIN check: every DatabaseManager query should be served by an index
+
+Creates a scratch schema, applies the migrations there, fills it with a
+synthetic 1M-row trackings table (plus history), then EXPLAINs the hot
+queries issued by DatabaseManager and reports the scan type used on each
+table. Exits with status 1 if any query falls back to a sequential scan on
+trackings or status_history.
+
+Usage (from BOTBUNKER/PanelBunker, with DATABASE_URL set):
+    python benchmarks/explain_indexes.py [--rows 1000000] [--keep]
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import psycopg2
+
+from tracking.database import resolve_database_url, USER_STATISTICS_SQL, REBUILD_COUNTERS_SQL
+from tracking.migrations import run_migrations
+from tracking.models import TRACKING_SELECT
+
+SCHEMA = "explain_check"
+CHECKED_TABLES = {"trackings", "status_history", "tracking_counters"}
+
+ADMIN_ID = 42
+USER_ID = 42
+TRACKING_ID = "PK000000000000000000042"
+
+# Keyset page size (PAGE_SIZE + 1) and a cursor one year back
+PAGE_LIMIT = 11
+CURSOR_AT = datetime.now() - timedelta(days=365)
+
+# (DatabaseManager method, SQL, params)
+QUERIES = [
+    ("get_tracking (cache miss)",
+     f"SELECT {TRACKING_SELECT} FROM trackings WHERE tracking_id = %s", (TRACKING_ID,)),
+    ("get_trackings_by_status (owner, page 1)",
+     "SELECT * FROM trackings WHERE status = %s ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     ("EN_TRANSITO", PAGE_LIMIT)),
+    ("get_trackings_by_status (owner, next)",
+     "SELECT * FROM trackings WHERE status = %s AND (created_at, tracking_id) < (%s, %s) "
+     "ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     ("EN_TRANSITO", CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("get_trackings_by_status (owner, prev)",
+     "SELECT * FROM trackings WHERE status = %s AND (created_at, tracking_id) > (%s, %s) "
+     "ORDER BY created_at ASC, tracking_id ASC LIMIT %s",
+     ("EN_TRANSITO", CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("get_trackings_by_status (admin, next)",
+     "SELECT * FROM trackings WHERE status = %s AND (created_by_admin_id = %s OR user_telegram_id = %s) "
+     "AND (created_at, tracking_id) < (%s, %s) ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     ("EN_TRANSITO", ADMIN_ID, ADMIN_ID, CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("count_trackings_by_status (admin)",
+     "SELECT COALESCE(SUM(count), 0) FROM tracking_counters WHERE scope = %s AND subject_id = %s "
+     "AND day = 'infinity' AND username = '' AND status = %s",
+     ("access", ADMIN_ID, "EN_TRANSITO")),
+    ("count_trackings_by_user",
+     "SELECT COALESCE(SUM(count), 0) FROM tracking_counters WHERE scope = %s AND subject_id = %s "
+     "AND day = 'infinity'",
+     ("user", USER_ID)),
+    ("update_tracking_status",
+     "SELECT status FROM trackings WHERE tracking_id = %s", (TRACKING_ID,)),
+    ("get_tracking_history",
+     "SELECT * FROM status_history WHERE tracking_id = %s AND (changed_at IS NULL OR changed_at <= NOW()) ORDER BY changed_at ASC, id ASC",
+     (TRACKING_ID,)),
+    ("get_statistics (owner)",
+     "SELECT status, day = 'infinity', count FROM tracking_counters WHERE scope = %s AND subject_id = %s "
+     "AND username = '' AND day IN (CURRENT_DATE, 'infinity') AND count <> 0",
+     ("all", 0)),
+    ("get_statistics (admin)",
+     "SELECT status, day = 'infinity', count FROM tracking_counters WHERE scope = %s AND subject_id = %s "
+     "AND username = '' AND day IN (CURRENT_DATE, 'infinity') AND count <> 0",
+     ("access", ADMIN_ID)),
+    ("get_trackings_by_user (next)",
+     "SELECT * FROM trackings WHERE user_telegram_id = %s AND (created_at, tracking_id) < (%s, %s) "
+     "ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     (USER_ID, CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("get_all_trackings (owner, next)",
+     "SELECT * FROM trackings WHERE TRUE AND (created_at, tracking_id) < (%s, %s) "
+     "ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     (CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("get_all_trackings (admin, next)",
+     "SELECT * FROM trackings WHERE (created_by_admin_id = %s OR user_telegram_id = %s) "
+     "AND (created_at, tracking_id) < (%s, %s) ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     (ADMIN_ID, ADMIN_ID, CURSOR_AT, TRACKING_ID, PAGE_LIMIT)),
+    ("search_trackings (owner, substring)",
+     "SELECT * FROM trackings WHERE upper(tracking_id) LIKE %s "
+     "ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     ("%00042%", 6)),
+    ("search_trackings (admin, prefix)",
+     "SELECT * FROM trackings WHERE upper(tracking_id) LIKE %s "
+     "AND (created_by_admin_id = %s OR user_telegram_id = %s) "
+     "ORDER BY created_at DESC, tracking_id DESC LIMIT %s",
+     ("PK%", ADMIN_ID, ADMIN_ID, 6)),
+    ("delete_tracking",
+     "SELECT 1 FROM status_history WHERE tracking_id = %s", (TRACKING_ID,)),
+]
+
+# Reads every user's counters by definition (one row per user and status, not per tracking)
+FULL_SCAN_EXPECTED = {
+    "get_user_statistics": USER_STATISTICS_SQL,
+}
+
+POPULATE_SQL = """
+-- Bulk load without the per-row counter triggers; counters are rebuilt afterwards
+ALTER TABLE trackings DISABLE TRIGGER trackings_counters_insert_delete;
+
+INSERT INTO trackings (
+    tracking_id, delivery_address, date_time, package_weight, product_name,
+    sender_address, product_price, status, created_at, updated_at,
+    user_telegram_id, username, created_by_admin_id
+)
+SELECT
+    'PK' || lpad(g::text, 21, '0'),
+    'Calle Falsa ' || g, '01/01/2025 10:00', '1.00 kg', 'Producto', 'Origen ' || g, '$10.00',
+    CASE WHEN r < 0.02 THEN 'RETENIDO'
+         WHEN r < 0.04 THEN 'CONFIRMAR_PAGO'
+         WHEN r < 0.08 THEN 'EN_TRANSITO'
+         ELSE 'ENTREGADO' END,
+    ts, ts,
+    (g %% 5000), 'user' || (g %% 5000), (g %% 5000)
+FROM (
+    SELECT g, random() AS r, NOW() - (random() * INTERVAL '730 days') AS ts
+    FROM generate_series(1, %s) AS g
+) AS src;
+
+INSERT INTO status_history (tracking_id, old_status, new_status, notes, changed_at)
+SELECT tracking_id, NULL, 'RECIBIDO', 'Paquete recibido', created_at FROM trackings
+UNION ALL
+SELECT tracking_id, 'RECIBIDO', 'ESPERANDO_PAGO', 'Esperando confirmación de pago', created_at FROM trackings;
+
+ALTER TABLE trackings ENABLE TRIGGER trackings_counters_insert_delete;
+
+ANALYZE trackings;
+ANALYZE status_history;
+"""
+
+
+def scans(plan: dict):
+    """Yield (node type, relation) for every scan node of a JSON plan"""
+    relation = plan.get("Relation Name")
+    if relation:
+        yield plan["Node Type"], relation
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+def explain(cur, sql: str, params: tuple):
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    result = cur.fetchone()[0]
+    plan = result[0]["Plan"] if isinstance(result, list) else json.loads(result)[0]["Plan"]
+    return list(scans(plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="synthetic trackings to generate")
+    parser.add_argument('--keep', action='store_true', help=f"keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(resolve_database_url())
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cur.execute(f"CREATE SCHEMA {SCHEMA}")
+            cur.execute(f"SET search_path TO {SCHEMA}, public")
+        conn.commit()
+
+        version = run_migrations(conn)
+        print(f"Scratch schema '{SCHEMA}' migrated to v{version}, generating {args.rows:,} trackings...")
+
+        with conn.cursor() as cur:
+            cur.execute(POPULATE_SQL, (args.rows,))
+            for sql in REBUILD_COUNTERS_SQL:
+                cur.execute(sql)
+        conn.commit()
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE tracking_counters")
+        conn.commit()
+
+        with conn.cursor() as cur:
+            print(f"\n{'query':<44} {'result':<8} scans")
+            for name, sql, params in QUERIES:
+                found = explain(cur, sql, params)
+                bad = [node for node, relation in found if relation in CHECKED_TABLES and node == "Seq Scan"]
+                failures += bool(bad)
+                described = ", ".join(f"{node} on {relation}" for node, relation in found)
+                print(f"{name:<44} {'FAIL' if bad else 'ok':<8} {described}")
+
+            for name, sql in FULL_SCAN_EXPECTED.items():
+                found = explain(cur, sql, ())
+                described = ", ".join(f"{node} on {relation}" for node, relation in found)
+                print(f"{name:<44} {'full':<8} {described}")
+        conn.rollback()
+    finally:
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+        conn.close()
+
+    print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} without an index scan")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 import uuid
 import re
@@ -16,9 +17,11 @@ load_dotenv()
 
 # Import tracking modules
 from tracking.database import db_manager
+from tracking.async_database import async_db_manager
 from tracking.models import Tracking, STATUS_RETENIDO
 from tracking.shipping_calculator import shipping_calc
 from tracking.admin_panel import admin_panel
+from tracking.openroute_service import ors_service
 
 # Configurar logging
 logging.basicConfig(
@@ -646,11 +649,12 @@ async def get_date_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['sender_country'] = sender_country
     
     # Calculate estimated delivery date using correct country fields
-    delivery_date, total_days = shipping_calc.calculate_estimated_delivery(
+    delivery_date, total_days, route_info = await shipping_calc.calculate_estimated_delivery(
         context.user_data.get('sender_address', ''),
         sender_country,
         context.user_data.get('delivery_address', ''),
-        recipient_country
+        recipient_country,
+        recipient_province=recipient_province
     )
     
     # Get separated data
@@ -676,13 +680,16 @@ async def get_date_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Status and metadata
         status=STATUS_RETENIDO,
         estimated_delivery_date=delivery_date,
+        # Stored so list screens never have to route again
+        estimated_days=total_days,
+        route_distance_km=route_info["route"]["distance_km"] if route_info else None,
         user_telegram_id=context.user_data.get('user_id'),
         username=context.user_data.get('username')
     )
     
     # Save to database with admin_id
     admin_id = context.user_data.get('user_id')
-    save_success = db_manager.save_tracking(tracking, created_by_admin_id=admin_id)
+    save_success = await async_db_manager.save_tracking(tracking, created_by_admin_id=admin_id)
     
     if save_success:
         # Show summary with RETENIDO status
@@ -783,6 +790,31 @@ def create_tracking_summary_with_status(user_data: dict, delivery_date: str, tot
     
     return summary
 
+async def post_init(application: Application) -> None:
+    """Abrir recursos asíncronos una vez que el event loop del bot está en marcha."""
+    try:
+        await async_db_manager.initialize_database()
+    except Exception as e:
+        logger.error(f"Failed to open async database pool: {e}")
+        logger.warning("Bot will continue but tracking features may not work")
+    
+    if ors_service:
+        await ors_service.open()
+    
+    # Las llamadas síncronas a shipping_calc desde otros hilos se ejecutan en este loop
+    shipping_calc.bind_loop(asyncio.get_running_loop())
+    # Matriz de días de tránsito en memoria (se recarga al cambiar shipping_routes)
+    await shipping_calc.eta.start(async_db_manager)
+
+async def post_shutdown(application: Application) -> None:
+    """Cerrar conexiones al detener el bot."""
+    shipping_calc.bind_loop(None)
+    await shipping_calc.eta.stop()
+    if ors_service:
+        await ors_service.close()
+    await async_db_manager.close()
+    db_manager.close()
+
 def main() -> None:
     """Función principal del bot."""
     
@@ -808,7 +840,13 @@ def main() -> None:
     logger.info(f"Canal configurado: {CHANNEL_ID or CHANNEL_USERNAME}")
     
     # Crear aplicación
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Conversation handler for tracking creation
     conv_handler = ConversationHandler(
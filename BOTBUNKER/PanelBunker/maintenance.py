@@ -0,0 +1,117 @@
+"""
+Tareas de mantenimiento de la base de datos del sistema de tracking
+
+Uso:
+    python maintenance.py rebuild-counters
+    python maintenance.py build-gazetteer cities1000.txt --admin1 admin1CodesASCII.txt --countries countryInfo.txt
+    python maintenance.py recalculate-etas [--dry-run] [--status EN_TRANSITO] [--keep-days]
+"""
+
+import os
+import sys
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Cargar variables de entorno desde .env (antes de importar tracking)
+load_dotenv()
+
+from tracking.database import db_manager
+from tracking.gazetteer import build_gazetteer, GAZETTEER_PATH
+from tracking.models import STATUS_EN_TRANSITO
+from tracking.shipping_calculator import shipping_calc
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def rebuild_counters(args) -> int:
+    """Reconstruir los contadores de estadísticas desde la tabla trackings"""
+    drifted = db_manager.rebuild_statistics_counters()
+    print(f"Contadores reconstruidos: {drifted} filas corregidas")
+    return 0
+
+
+def build_gazetteer_file(args) -> int:
+    """Compilar un volcado de GeoNames en el fichero del geocodificador offline"""
+    places = build_gazetteer(
+        args.cities, args.output, admin1_path=args.admin1, countries_path=args.countries,
+        min_population=args.min_population, cell_degrees=args.cell_degrees
+    )
+    print(f"Gazetteer generado en {args.output}: {places} localidades")
+    return 0
+
+
+def recalculate_etas(args) -> int:
+    """Recalcular las fechas estimadas de entrega guardadas (rutas y festivos actuales)"""
+    routes = db_manager.get_shipping_routes()
+    if routes is None:
+        print("No se pudieron leer las rutas de envío")
+        return 1
+    shipping_calc.eta.load(routes)
+
+    result = shipping_calc.recalculate_stored_deliveries(
+        args.status or [STATUS_EN_TRANSITO], dry_run=args.dry_run,
+        keep_transit_days=args.keep_days, page_size=args.page_size
+    )
+    for tracking_id, old_date, new_date in result['sample']:
+        print(f"  {tracking_id}: {old_date or '-'} -> {new_date}")
+    if args.dry_run:
+        print(f"Simulación: {result['changed']} de {result['trackings']} trackings cambiarían de fecha estimada")
+    else:
+        print(f"Fechas estimadas recalculadas: {result['updated']} de {result['trackings']} trackings actualizados")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos del tracking")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser(
+        'rebuild-counters', help="reconstruir tracking_counters desde cero (reconciliación)"
+    ).set_defaults(func=rebuild_counters)
+
+    gazetteer_parser = subparsers.add_parser(
+        'build-gazetteer', help="generar el geocodificador inverso offline desde un volcado de GeoNames"
+    )
+    gazetteer_parser.add_argument('cities', help="fichero de ciudades de GeoNames (ej: cities1000.txt)")
+    gazetteer_parser.add_argument('--admin1', help="admin1CodesASCII.txt (nombres de regiones)")
+    gazetteer_parser.add_argument('--countries', help="countryInfo.txt (nombres de países)")
+    gazetteer_parser.add_argument('--min-population', type=int, default=1000,
+                                  help="población mínima de las localidades (por defecto 1000)")
+    gazetteer_parser.add_argument('--cell-degrees', type=float, default=0.5,
+                                  help="tamaño de celda del índice en grados (por defecto 0.5)")
+    gazetteer_parser.add_argument('--output', default=os.path.normpath(GAZETTEER_PATH),
+                                  help="fichero de salida (por defecto GAZETTEER_PATH o data/gazetteer.bin)")
+    gazetteer_parser.set_defaults(func=build_gazetteer_file, needs_database=False)
+
+    etas_parser = subparsers.add_parser(
+        'recalculate-etas', help="recalcular las fechas estimadas de entrega tras cambiar rutas o festivos"
+    )
+    etas_parser.add_argument('--status', action='append',
+                             help=f"estado de los trackings a recalcular (repetible, por defecto {STATUS_EN_TRANSITO})")
+    etas_parser.add_argument('--dry-run', action='store_true',
+                             help="calcular y mostrar los cambios sin escribirlos")
+    etas_parser.add_argument('--keep-days', action='store_true',
+                             help="conservar los días de tránsito guardados y mover solo las fechas (p. ej. tras añadir un festivo)")
+    etas_parser.add_argument('--page-size', type=int, default=1000,
+                             help="filas por UPDATE al escribir (por defecto 1000)")
+    etas_parser.set_defaults(func=recalculate_etas)
+
+    args = parser.parse_args()
+    try:
+        if getattr(args, 'needs_database', True):
+            db_manager.initialize_database()
+        return args.func(args)
+    except Exception as e:
+        logger.error(f"Error en mantenimiento ({args.command}): {e}")
+        return 1
+    finally:
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,12 +4,14 @@ Contains all tracking-related functionality
 """
 
 from .database import db_manager
+from .async_database import async_db_manager
 from .models import Tracking, STATUS_RETENIDO, STATUS_CONFIRMAR_PAGO, STATUS_EN_TRANSITO, STATUS_ENTREGADO
 from .shipping_calculator import shipping_calc
 from .admin_panel import admin_panel
 
 __all__ = [
     'db_manager',
+    'async_db_manager',
     'Tracking',
     'STATUS_RETENIDO',
     'STATUS_CONFIRMAR_PAGO',
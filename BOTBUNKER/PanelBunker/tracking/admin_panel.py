@@ -6,10 +6,12 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CallbackQueryHandler
 import logging
 import os
-from typing import List, Optional
-from datetime import datetime
+import hashlib
+from functools import partial
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
 
-from .database import db_manager
+from .async_database import async_db_manager
 from .models import STATUS_RETENIDO, STATUS_CONFIRMAR_PAGO, STATUS_EN_TRANSITO, STATUS_ENTREGADO, STATUS_DISPLAY
 from .shipping_calculator import shipping_calc
 
@@ -53,6 +55,53 @@ def format_datetime_spain(dt: Optional[datetime], fmt: str = '%d/%m/%Y %H:%M') -
         logger.error(f"Error converting datetime: {e}")
         return dt.strftime(fmt) if dt else 'N/A'
 
+# Trackings shown per page in the list views
+PAGE_SIZE = 10
+
+# Partial-search matches shown at once
+SEARCH_RESULTS = 5
+
+# Telegram rejects callback_data longer than 64 bytes
+MAX_CALLBACK_DATA = 64
+
+_CURSOR_EPOCH = datetime(1970, 1, 1)
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def encode_page_cursor(tracking) -> str:
+    """
+    Encode a tracking's keyset position for callback_data.
+    
+    Format: <created_at as base36 microseconds>_<tracking_id>
+    """
+    created_at = tracking.created_at.replace(tzinfo=None)
+    micros = (created_at - _CURSOR_EPOCH) // timedelta(microseconds=1)
+    digits = ""
+    while True:
+        micros, remainder = divmod(micros, 36)
+        digits = _BASE36[remainder] + digits
+        if micros == 0:
+            break
+    return f"{digits}_{tracking.tracking_id}"
+
+def decode_page_cursor(token: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_page_cursor into (created_at, tracking_id)"""
+    timestamp, tracking_id = token.split("_", 1)
+    return _CURSOR_EPOCH + timedelta(microseconds=int(timestamp, 36)), tracking_id
+
+# Cursors too long for callback_data live in user_data under a short key ('~' + hex)
+STORED_CURSOR_PREFIX = "~"
+MAX_STORED_CURSORS = 32
+
+def store_page_cursor(user_data: dict, page_cursor: str) -> str:
+    """Keep a page cursor server-side and return the short token that refers to it"""
+    key = hashlib.blake2s(page_cursor.encode(), digest_size=4).hexdigest()
+    cursors = user_data.setdefault('page_cursors', {})
+    cursors.pop(key, None)
+    cursors[key] = page_cursor
+    while len(cursors) > MAX_STORED_CURSORS:
+        cursors.pop(next(iter(cursors)))
+    return STORED_CURSOR_PREFIX + key
+
 # Owner ID - normalize to integer for consistent comparisons
 OWNER_TELEGRAM_ID = None
 _owner_id_str = os.getenv('OWNER_TELEGRAM_ID')
@@ -72,6 +121,62 @@ class AdminPanel:
         """Check if user is the owner"""
         return OWNER_TELEGRAM_ID is not None and user_id == OWNER_TELEGRAM_ID
     
+    async def _load_page(self, fetch, page_cursor: Optional[str] = None, direction: str = 'next'):
+        """
+        Load one page of trackings through a keyset query.
+        
+        Args:
+            fetch: Query coroutine accepting limit, cursor and direction
+            page_cursor: Token from encode_page_cursor, None for the first page
+            direction: 'next' (older) or 'prev' (newer)
+        
+        Returns:
+            (trackings, has_prev, has_next)
+        """
+        cursor = None
+        if page_cursor:
+            try:
+                cursor = decode_page_cursor(page_cursor)
+            except ValueError:
+                logger.warning(f"Ignoring invalid page cursor: {page_cursor}")
+        if cursor is None:
+            direction = 'next'
+        
+        # One extra row tells whether there is another page in that direction
+        trackings = await fetch(limit=PAGE_SIZE + 1, cursor=cursor, direction=direction)
+        if cursor is not None and not trackings:
+            # Everything past the cursor is gone (status changes, deletions): start over
+            cursor, direction = None, 'next'
+            trackings = await fetch(limit=PAGE_SIZE + 1, cursor=None, direction='next')
+        
+        has_more = len(trackings) > PAGE_SIZE
+        if direction == 'prev':
+            return trackings[-PAGE_SIZE:], has_more, True
+        return trackings[:PAGE_SIZE], cursor is not None, has_more
+    
+    def _page_buttons(self, view: str, trackings: List, has_prev: bool, has_next: bool,
+                      context: ContextTypes.DEFAULT_TYPE) -> List[InlineKeyboardButton]:
+        """
+        Build the ◀️/▶️ navigation row for a list view page. Cursors that do not
+        fit in callback_data (long tracking IDs) are kept in user_data.
+        """
+        buttons = []
+        for show, label, direction_code, tracking in (
+            (has_prev, "◀️ Anterior", "p", trackings[0] if trackings else None),
+            (has_next, "Siguiente ▶️", "n", trackings[-1] if trackings else None),
+        ):
+            if not show or tracking is None:
+                continue
+            page_cursor = encode_page_cursor(tracking)
+            data = f"pg_{view}_{direction_code}_{page_cursor}"
+            if len(data.encode()) > MAX_CALLBACK_DATA:
+                if context.user_data is None:
+                    logger.warning(f"Dropping {label} button of {view}: cursor too long and no user_data")
+                    continue
+                data = f"pg_{view}_{direction_code}_{store_page_cursor(context.user_data, page_cursor)}"
+            buttons.append(InlineKeyboardButton(label, callback_data=data))
+        return buttons
+    
     async def _edit_message_smart(self, update: Update, text: str, reply_markup=None, parse_mode=None):
         """
         Smart message editing that handles both text messages and messages with photos.
@@ -218,7 +323,8 @@ Por favor, ingresa la dirección de envío:
         
         logger.info(f"Tracking creation started from admin panel by user {username} ({user_id})")
     
-    async def show_retenidos(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def show_retenidos(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                             page_cursor: Optional[str] = None, direction: str = 'next'):
         """Show packages waiting for payment confirmation"""
         if not update.callback_query or not update.effective_user:
             return
@@ -226,16 +332,20 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        trackings = db_manager.get_trackings_by_status(STATUS_RETENIDO, admin_id=admin_id, is_owner=is_owner)
+        trackings, has_prev, has_next = await self._load_page(
+            partial(async_db_manager.get_tracking_summaries_by_status, STATUS_RETENIDO, admin_id=admin_id, is_owner=is_owner),
+            page_cursor, direction
+        )
         
         if not trackings:
             text = "✅ No hay paquetes retenidos actualmente."
             keyboard = [[InlineKeyboardButton("🔙 Volver", callback_data="admin_main")]]
         else:
-            text = f"🔴 **PAQUETES RETENIDOS ({len(trackings)}):**\n\n"
+            total = await async_db_manager.count_trackings_by_status(STATUS_RETENIDO, admin_id=admin_id, is_owner=is_owner)
+            text = f"🔴 **PAQUETES RETENIDOS ({total}):**\n\n"
             keyboard = []
             
-            for tracking in trackings[:10]:  # Show max 10 at a time
+            for tracking in trackings:
                 origin, destination = shipping_calc.extract_countries(tracking.sender_country, tracking.country_postal)
                 
                 summary = f"**{tracking.tracking_id[:15]}...**\n"
@@ -254,12 +364,17 @@ Por favor, ingresa la dirección de envío:
                     InlineKeyboardButton("👁️ Ver Detalles", callback_data=f"view_details_{tracking.tracking_id}")
                 ])
             
+            page_buttons = self._page_buttons("ret", trackings, has_prev, has_next, context)
+            if page_buttons:
+                keyboard.append(page_buttons)
+            
             keyboard.append([InlineKeyboardButton("🔙 Volver", callback_data="admin_main")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         await self._edit_message_smart(update, text, reply_markup=reply_markup, parse_mode='Markdown')
     
-    async def show_confirmar_pagos(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def show_confirmar_pagos(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                   page_cursor: Optional[str] = None, direction: str = 'next'):
         """Show packages ready for shipping (payment confirmed)"""
         if not update.effective_user:
             return
@@ -267,29 +382,28 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        trackings = db_manager.get_trackings_by_status(STATUS_CONFIRMAR_PAGO, admin_id=admin_id, is_owner=is_owner)
+        trackings, has_prev, has_next = await self._load_page(
+            partial(async_db_manager.get_tracking_summaries_by_status, STATUS_CONFIRMAR_PAGO, admin_id=admin_id, is_owner=is_owner),
+            page_cursor, direction
+        )
         
         if not trackings:
             text = "✅ No hay pagos pendientes de confirmar."
             keyboard = [[InlineKeyboardButton("🔙 Volver", callback_data="admin_main")]]
         else:
-            text = f"🟡 **PAGOS CONFIRMADOS - LISTOS PARA ENVÍO ({len(trackings)}):**\n\n"
+            total = await async_db_manager.count_trackings_by_status(STATUS_CONFIRMAR_PAGO, admin_id=admin_id, is_owner=is_owner)
+            text = f"🟡 **PAGOS CONFIRMADOS - LISTOS PARA ENVÍO ({total}):**\n\n"
             keyboard = []
             
-            for tracking in trackings[:10]:
+            for tracking in trackings:
                 origin, destination = shipping_calc.extract_countries(tracking.sender_country, tracking.country_postal)
-                delivery_date, total_days = shipping_calc.calculate_estimated_delivery(
-                    tracking.sender_address, 
-                    tracking.sender_country,
-                    tracking.delivery_address, 
-                    tracking.country_postal, 
-                    tracking.actual_delay_days
-                )
+                delivery_date, total_days = shipping_calc.stored_delivery(tracking)
+                days_text = f" ({total_days} días)" if total_days is not None else ""
                 
                 summary = f"**{tracking.tracking_id[:15]}...**\n"
                 summary += f"👤 {tracking.recipient_name}\n"
                 summary += f"📍 {origin} → {destination}\n"
-                summary += f"📅 Estimado: {delivery_date} ({total_days} días)\n"
+                summary += f"📅 Estimado: {delivery_date or 'Calculando...'}{days_text}\n"
                 summary += f"💰 {tracking.product_price}"
                 
                 text += summary + "\n" + "─" * 30 + "\n"
@@ -302,12 +416,17 @@ Por favor, ingresa la dirección de envío:
                     InlineKeyboardButton("👁️ Ver Detalles", callback_data=f"view_details_{tracking.tracking_id}")
                 ])
             
+            page_buttons = self._page_buttons("cfp", trackings, has_prev, has_next, context)
+            if page_buttons:
+                keyboard.append(page_buttons)
+            
             keyboard.append([InlineKeyboardButton("🔙 Volver", callback_data="admin_main")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         await self._edit_message_smart(update, text, reply_markup=reply_markup, parse_mode='Markdown')
     
-    async def show_gestionar_envios(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def show_gestionar_envios(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                    page_cursor: Optional[str] = None, direction: str = 'next'):
         """Show packages in transit"""
         if not update.effective_user:
             return
@@ -315,31 +434,29 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        trackings = db_manager.get_trackings_by_status(STATUS_EN_TRANSITO, admin_id=admin_id, is_owner=is_owner)
+        trackings, has_prev, has_next = await self._load_page(
+            partial(async_db_manager.get_tracking_summaries_by_status, STATUS_EN_TRANSITO, admin_id=admin_id, is_owner=is_owner),
+            page_cursor, direction
+        )
         
         if not trackings:
             text = "✅ No hay paquetes en tránsito actualmente."
             keyboard = [[InlineKeyboardButton("🔙 Volver", callback_data="admin_main")]]
         else:
-            text = f"🔵 **PAQUETES EN TRÁNSITO ({len(trackings)}):**\n\n"
+            total = await async_db_manager.count_trackings_by_status(STATUS_EN_TRANSITO, admin_id=admin_id, is_owner=is_owner)
+            text = f"🔵 **PAQUETES EN TRÁNSITO ({total}):**\n\n"
             keyboard = []
             
-            for tracking in trackings[:10]:
+            for tracking in trackings:
                 origin, destination = shipping_calc.extract_countries(tracking.sender_country, tracking.country_postal)
-                delivery_date, total_days = shipping_calc.calculate_estimated_delivery(
-                    tracking.sender_address,
-                    tracking.sender_country,
-                    tracking.delivery_address,
-                    tracking.country_postal,
-                    tracking.actual_delay_days
-                )
+                delivery_date, total_days = shipping_calc.stored_delivery(tracking)
                 
                 delay_text = f"⚠️ Retraso: {tracking.actual_delay_days} días" if tracking.actual_delay_days > 0 else "⏰ Sin retrasos"
                 
                 summary = f"**{tracking.tracking_id[:15]}...**\n"
                 summary += f"👤 {tracking.recipient_name}\n"
                 summary += f"📍 {origin} → {destination}\n"
-                summary += f"📅 Estimado: {delivery_date}\n"
+                summary += f"📅 Estimado: {delivery_date or 'Calculando...'}\n"
                 summary += f"{delay_text}"
                 
                 text += summary + "\n" + "─" * 30 + "\n"
@@ -352,6 +469,10 @@ Por favor, ingresa la dirección de envío:
                     InlineKeyboardButton("👁️ Ver Detalles", callback_data=f"view_details_{tracking.tracking_id}")
                 ])
             
+            page_buttons = self._page_buttons("env", trackings, has_prev, has_next, context)
+            if page_buttons:
+                keyboard.append(page_buttons)
+            
             keyboard.append([InlineKeyboardButton("🔙 Volver", callback_data="admin_main")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -366,12 +487,12 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para modificar este tracking")
             return
         
@@ -404,23 +525,27 @@ Por favor, ingresa la dirección de envío:
         # Verify admin has access to this tracking
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para modificar este tracking")
             return
         
         username = update.effective_user.username or str(admin_id)
         logger.info(f"[CONFIRMAR PAGO] User {username} ({admin_id}) confirming payment for tracking {tracking_id}")
         
-        success = db_manager.update_tracking_status(tracking_id, STATUS_CONFIRMAR_PAGO, "Pago confirmado")
+        success = await async_db_manager.update_tracking_status(tracking_id, STATUS_CONFIRMAR_PAGO, "Pago confirmado")
         
         if success:
             logger.info(f"[CONFIRMAR PAGO] SUCCESS - Tracking {tracking_id} payment confirmed by {username}")
+            # Trackings created before estimates were stored get theirs now, once
+            if tracking.estimated_days is None or not tracking.estimated_delivery_date:
+                delivery_date, base_days, distance_km = await shipping_calc.estimate_tracking_delivery(tracking)
+                await async_db_manager.update_delivery_estimate(tracking_id, base_days, delivery_date, distance_km)
             await update.callback_query.answer("✅ Pago confirmado exitosamente")
             text = f"✅ **PAGO CONFIRMADO**\n\nTracking {tracking_id} listo para envío."
         else:
@@ -440,28 +565,33 @@ Por favor, ingresa la dirección de envío:
         
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para modificar este tracking")
             return
         
         username = update.effective_user.username or str(admin_id)
         logger.info(f"[ENVIADO] User {username} ({admin_id}) marking tracking {tracking_id} as shipped")
         
-        success = db_manager.update_tracking_status(tracking_id, STATUS_EN_TRANSITO, "Paquete en tránsito")
+        success = await async_db_manager.update_tracking_status(tracking_id, STATUS_EN_TRANSITO, "Paquete en tránsito")
         
         if success:
             logger.info(f"[ENVIADO] SUCCESS - Tracking {tracking_id} marked as shipped by {username}")
             route_checkpoints = []
+            full_route = None
             try:
                 from .openroute_service import ors_service
                 
-                if ors_service:
+                # A reship reuses the route stored the first time
+                full_route = await async_db_manager.get_saved_route(tracking)
+                if full_route:
+                    logger.info(f"Reusing stored route for {tracking_id}")
+                elif ors_service:
                     logger.info(f"Getting full route with checkpoints for {tracking_id}")
                     
                     full_route = await ors_service.get_full_route_with_checkpoints(
@@ -474,21 +604,24 @@ Por favor, ingresa la dirección de envío:
                         tracking.recipient_postal_code,
                         tracking.recipient_province
                     )
-                    
-                    if full_route and full_route.get("checkpoints"):
+                    if full_route:
+                        await async_db_manager.save_route(tracking_id, full_route)
+                
+                if full_route:
+                    if full_route.get("checkpoints"):
                         route_checkpoints = full_route["checkpoints"]
                         logger.info(f"Found {len(route_checkpoints)} checkpoints for route: {[cp.get('name') for cp in route_checkpoints]}")
                     else:
                         logger.warning(f"No checkpoints found from ORS for {tracking_id}, using fallback")
                 else:
-                    logger.warning("ORS service not available, using fallback checkpoints")
+                    logger.warning(f"No route available for {tracking_id}, using fallback checkpoints")
                 
             except Exception as e:
                 logger.error(f"Error getting route from ORS for {tracking_id}: {e}")
             
-            estimated_days = 5
+            estimated_days = tracking.estimated_days or 5
             if full_route and full_route.get("route"):
-                estimated_days = full_route["route"].get("estimated_days", 5)
+                estimated_days = full_route["route"].get("estimated_days", estimated_days)
             
             if not route_checkpoints:
                 origin = tracking.sender_province or tracking.sender_country or "Origen"
@@ -499,9 +632,15 @@ Por favor, ingresa la dirección de envío:
                 ]
                 logger.info(f"Using fallback checkpoints for {tracking_id}: {origin} -> {destination}")
             
+            # The estimate now counts from departure, over the route actually taken
+            start_time = datetime.now()
+            region = shipping_calc.delivery_region(tracking)
+            delivery_date = shipping_calc.format_delivery_date(estimated_days + tracking.actual_delay_days, start_time, *region)
+            await async_db_manager.update_delivery_estimate(tracking_id, estimated_days, delivery_date)
+            
             if len(route_checkpoints) > 0:
-                start_time = datetime.now()
-                db_manager.generate_route_history_events(tracking_id, route_checkpoints, estimated_days, start_time)
+                await async_db_manager.generate_route_history_events(tracking_id, route_checkpoints, estimated_days,
+                                                                     start_time, *region)
                 checkpoint_names = [cp.get("name") if isinstance(cp, dict) else cp for cp in route_checkpoints]
                 logger.info(f"Generated route history for {tracking_id} with {len(route_checkpoints)} checkpoints over {estimated_days} days: {checkpoint_names}")
             
@@ -525,17 +664,17 @@ Por favor, ingresa la dirección de envío:
         # Verify admin has access to this tracking
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para modificar este tracking")
             return
         
-        success = db_manager.update_tracking_status(tracking_id, STATUS_ENTREGADO, "Paquete entregado")
+        success = await async_db_manager.update_tracking_status(tracking_id, STATUS_ENTREGADO, "Paquete entregado")
         
         if success:
             await update.callback_query.answer("✅ Paquete marcado como entregado")
@@ -592,19 +731,20 @@ Por favor, ingresa la dirección de envío:
         # Verify admin has access to this tracking
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para modificar este tracking")
             return
         
         reason = self.delay_reasons[reason_index] if reason_index < len(self.delay_reasons) else "Otro motivo"
         
-        success = db_manager.add_delay_to_tracking(tracking_id, delay_days, reason)
+        delivery_date = shipping_calc.delay_delivery_date(tracking, delay_days)
+        success = await async_db_manager.add_delay_to_tracking(tracking_id, delay_days, reason, delivery_date)
         
         if success:
             await update.callback_query.answer("✅ Retraso agregado exitosamente")
@@ -627,12 +767,12 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para ver este tracking")
             return
         
@@ -644,7 +784,7 @@ Por favor, ingresa la dirección de envío:
         creator_id = tracking.user_telegram_id or 'N/A'
         
         # Get status history
-        history = db_manager.get_tracking_history(tracking_id)
+        history = await async_db_manager.get_tracking_history(tracking_id)
         history_text = ""
         if history:
             history_text = "\n\n📜 HISTORIAL DE ESTADOS:\n"
@@ -710,7 +850,7 @@ Por favor, ingresa la dirección de envío:
         
         # If owner, show user statistics directly
         if is_owner:
-            user_stats = db_manager.get_user_statistics()
+            user_stats = await async_db_manager.get_user_statistics()
             
             if not user_stats:
                 text = "📊 ESTADÍSTICAS POR USUARIO\n\n❌ No hay datos de usuarios disponibles."
@@ -748,7 +888,7 @@ Por favor, ingresa la dirección de envío:
                 keyboard.append([InlineKeyboardButton("🔙 Volver", callback_data="admin_main")])
         else:
             # Regular admins see simple statistics
-            stats = db_manager.get_statistics(admin_id=admin_id, is_owner=is_owner)
+            stats = await async_db_manager.get_statistics(admin_id=admin_id, is_owner=is_owner)
             
             status_counts = stats.get('by_status', {})
             total = stats.get('total', 0)
@@ -781,7 +921,8 @@ Por favor, ingresa la dirección de envío:
         
         await self._edit_message_smart(update, text, reply_markup=reply_markup)
     
-    async def show_detailed_trackings_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def show_detailed_trackings_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                           page_cursor: Optional[str] = None, direction: str = 'next'):
         """Show detailed list of trackings from statistics (OWNER ONLY)"""
         if not update.callback_query or not update.effective_user:
             return
@@ -794,19 +935,21 @@ Por favor, ingresa la dirección de envío:
             await update.callback_query.answer("❌ Acceso denegado. Solo el administrador puede ver esta información.", show_alert=True)
             return
         
-        # Get all trackings for owner (sees all)
-        trackings = db_manager.get_all_trackings(admin_id=admin_id, is_owner=is_owner)
+        # One page of all trackings for owner (sees all)
+        trackings, has_prev, has_next = await self._load_page(
+            partial(async_db_manager.get_all_tracking_summaries, admin_id=admin_id, is_owner=is_owner),
+            page_cursor, direction
+        )
         
         if not trackings:
             text = "📋 **MIS TRACKINGS**\n\n❌ No hay trackings disponibles."
             keyboard = [[InlineKeyboardButton("🔙 Volver a Estadísticas", callback_data="admin_estadisticas")]]
         else:
-            # Limit to latest 10 trackings
-            recent_trackings = trackings[:10]
+            total = await async_db_manager.count_all_trackings(admin_id=admin_id, is_owner=is_owner)
             
-            text = f"📋 **TRACKINGS DETALLADOS** ({len(trackings)} total)\n\n"
+            text = f"📋 **TRACKINGS DETALLADOS** ({total} total)\n\n"
             
-            for i, tracking in enumerate(recent_trackings, 1):
+            for i, tracking in enumerate(trackings, 1):
                 status_emoji = {
                     STATUS_RETENIDO: "🔴",
                     STATUS_CONFIRMAR_PAGO: "🟡", 
@@ -835,10 +978,14 @@ Por favor, ingresa la dirección de envío:
 
 """.strip() + "\n\n"
             
-            if len(trackings) > 10:
-                text += f"_Mostrando últimos 10 de {len(trackings)} trackings_\n\n"
+            if total > len(trackings):
+                text += f"_Mostrando {len(trackings)} de {total} trackings_\n\n"
             
-            keyboard = [[InlineKeyboardButton("🔙 Volver a Estadísticas", callback_data="admin_estadisticas")]]
+            keyboard = []
+            page_buttons = self._page_buttons("all", trackings, has_prev, has_next, context)
+            if page_buttons:
+                keyboard.append(page_buttons)
+            keyboard.append([InlineKeyboardButton("🔙 Volver a Estadísticas", callback_data="admin_estadisticas")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         
@@ -856,7 +1003,7 @@ Por favor, ingresa la dirección de envío:
             await update.callback_query.answer("❌ Solo el propietario puede ver esta información")
             return
         
-        user_stats = db_manager.get_user_statistics()
+        user_stats = await async_db_manager.get_user_statistics()
         
         if not user_stats:
             text = "👥 **VER POR USUARIOS**\n\n❌ No hay usuarios disponibles."
@@ -880,7 +1027,8 @@ Por favor, ingresa la dirección de envío:
         
         await self._edit_message_smart(update, text, reply_markup=reply_markup, parse_mode='Markdown')
     
-    async def show_user_trackings(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str):
+    async def show_user_trackings(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: str,
+                                  page_cursor: Optional[str] = None, direction: str = 'next'):
         """Show all trackings for a specific user (owner only)"""
         if not update.callback_query or not update.effective_user:
             return
@@ -899,7 +1047,9 @@ Por favor, ingresa la dirección de envío:
             await update.callback_query.answer("❌ ID de usuario inválido")
             return
         
-        trackings = db_manager.get_trackings_by_user(user_id_int)
+        trackings, has_prev, has_next = await self._load_page(
+            partial(async_db_manager.get_tracking_summaries_by_user, user_id_int), page_cursor, direction
+        )
         
         if not trackings:
             text = "📦 TRACKINGS DEL USUARIO\n\n❌ No se encontraron trackings para este usuario."
@@ -910,10 +1060,12 @@ Por favor, ingresa la dirección de envío:
             # Get username from first tracking
             username = trackings[0].username if trackings[0].username else "Usuario"
             
-            text = f"📦 TRACKINGS DE @{username}\n\nTotal: {len(trackings)} trackings\n\n"
+            total = await async_db_manager.count_trackings_by_user(user_id_int)
+            
+            text = f"📦 TRACKINGS DE @{username}\n\nTotal: {total} trackings\n\n"
             
             keyboard = []
-            for i, tracking in enumerate(trackings[:10], 1):  # Show max 10
+            for i, tracking in enumerate(trackings, 1):
                 status_emoji = {
                     STATUS_RETENIDO: "🔴",
                     STATUS_CONFIRMAR_PAGO: "🟡", 
@@ -936,8 +1088,12 @@ Por favor, ingresa la dirección de envío:
                     callback_data=f"view_{tracking.tracking_id}"
                 )])
             
-            if len(trackings) > 10:
-                text += f"Mostrando 10 de {len(trackings)} trackings\n\n"
+            if total > len(trackings):
+                text += f"Mostrando {len(trackings)} de {total} trackings\n\n"
+            
+            page_buttons = self._page_buttons(f"u{user_id_int}", trackings, has_prev, has_next, context)
+            if page_buttons:
+                keyboard.append(page_buttons)
             
             keyboard.append([InlineKeyboardButton("🔙 Volver a Usuarios", callback_data="admin_stats_users")])
             
@@ -949,7 +1105,7 @@ Por favor, ingresa la dirección de envío:
         if not update.callback_query:
             return
         
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
@@ -983,7 +1139,7 @@ Por favor, ingresa la dirección de envío:
             return
         
         # Get tracking info before deletion for the message
-        tracking = db_manager.get_tracking(tracking_id)
+        tracking = await async_db_manager.get_tracking(tracking_id)
         if not tracking:
             await update.callback_query.answer("❌ Tracking no encontrado")
             return
@@ -992,7 +1148,7 @@ Por favor, ingresa la dirección de envío:
         admin_id = update.effective_user.id
         is_owner = self.is_owner(admin_id)
         
-        if not db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
+        if not await async_db_manager.can_access_tracking(tracking_id, admin_id, is_owner):
             await update.callback_query.answer("❌ No tienes permiso para eliminar este tracking")
             return
         
@@ -1000,7 +1156,7 @@ Por favor, ingresa la dirección de envío:
         return_status = tracking.status
         
         # Delete the tracking
-        success = db_manager.delete_tracking(tracking_id)
+        success = await async_db_manager.delete_tracking(tracking_id)
         
         if success:
             await update.callback_query.answer("✅ Tracking eliminado exitosamente")
@@ -1055,10 +1211,10 @@ Puedes escribir el ID completo o parcial.
         is_owner = self.is_owner(admin_id)
         
         # Search for tracking by ID
-        tracking = db_manager.get_tracking(search_query)
+        tracking = await async_db_manager.get_tracking(search_query)
         
         # Verify admin has access to this tracking
-        if tracking and not db_manager.can_access_tracking(search_query, admin_id, is_owner):
+        if tracking and not await async_db_manager.can_access_tracking(search_query, admin_id, is_owner):
             tracking = None  # Admin doesn't have access to this tracking
         
         if tracking:
@@ -1101,15 +1257,17 @@ Puedes escribir el ID completo o parcial.
                 [InlineKeyboardButton("🔙 Volver al Menú", callback_data="admin_main")]
             ]
         else:
-            # Not found - try partial search (filtered by admin)
-            all_trackings = db_manager.get_all_trackings(admin_id=admin_id, is_owner=is_owner)
-            matches = [t for t in all_trackings if search_query.upper() in t.tracking_id.upper()]
+            # Not found - try partial search (filtered by admin); one extra row tells if there are more
+            matches = await async_db_manager.search_tracking_summaries(
+                search_query, admin_id=admin_id, is_owner=is_owner, limit=SEARCH_RESULTS + 1
+            )
             
             if matches:
-                text = f"🔍 **RESULTADOS DE BÚSQUEDA** (encontrados: {len(matches)})\n\n"
+                found = f"{SEARCH_RESULTS}+" if len(matches) > SEARCH_RESULTS else str(len(matches))
+                text = f"🔍 **RESULTADOS DE BÚSQUEDA** (encontrados: {found})\n\n"
                 keyboard = []
                 
-                for tracking in matches[:5]:  # Show max 5 results
+                for tracking in matches[:SEARCH_RESULTS]:
                     origin, destination = shipping_calc.extract_countries(tracking.sender_country, tracking.country_postal)
                     status_display = STATUS_DISPLAY.get(tracking.status, tracking.status)
                     
@@ -1124,8 +1282,8 @@ Puedes escribir el ID completo o parcial.
                                            callback_data=f"view_details_{tracking.tracking_id}")
                     ])
                 
-                if len(matches) > 5:
-                    text += f"\n... y {len(matches) - 5} resultados más."
+                if len(matches) > SEARCH_RESULTS:
+                    text += "\n... y más resultados. Escribe más caracteres del ID para afinar la búsqueda."
                 
                 keyboard.append([InlineKeyboardButton("🔍 Buscar Otro", callback_data="admin_buscar")])
                 keyboard.append([InlineKeyboardButton("🔙 Volver al Menú", callback_data="admin_main")])
@@ -1139,6 +1297,33 @@ Puedes escribir el ID completo o parcial.
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
+    async def show_page(self, update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Route a ◀️/▶️ pagination button to its list view"""
+        try:
+            _, view, direction_code, page_cursor = data.split("_", 3)
+        except ValueError:
+            logger.warning(f"Malformed pagination callback: {data}")
+            return
+        direction = 'prev' if direction_code == 'p' else 'next'
+        
+        if page_cursor.startswith(STORED_CURSOR_PREFIX):
+            stored = (context.user_data or {}).get('page_cursors', {})
+            page_cursor = stored.get(page_cursor[len(STORED_CURSOR_PREFIX):])
+            if page_cursor is None:
+                # Evicted or lost on restart: reopen the list from the first page
+                logger.warning(f"Stored page cursor not found for {data}, showing the first page")
+        
+        if view == "ret":
+            await self.show_retenidos(update, context, page_cursor, direction)
+        elif view == "cfp":
+            await self.show_confirmar_pagos(update, context, page_cursor, direction)
+        elif view == "env":
+            await self.show_gestionar_envios(update, context, page_cursor, direction)
+        elif view == "all":
+            await self.show_detailed_trackings_list(update, context, page_cursor, direction)
+        elif view.startswith("u"):
+            await self.show_user_trackings(update, context, view[1:], page_cursor, direction)
+    
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle all callback queries from inline buttons"""
         query = update.callback_query
@@ -1168,6 +1353,10 @@ Puedes escribir el ID completo o parcial.
         elif data == "admin_buscar":
             await self.start_search(update, context)
         
+        # List view pages: pg_<view>_<p|n>_<cursor>
+        elif data.startswith("pg_"):
+            await self.show_page(update, context, data)
+        
         # User trackings view
         elif data.startswith("admin_user_trackings_"):
             user_id = data.replace("admin_user_trackings_", "")
@@ -0,0 +1,909 @@
+"""
+Asyncio database backend for the tracking system (asyncpg)
+
+Mirrors the DatabaseManager method surface so Telegram handlers can await
+queries instead of blocking the event loop.
+"""
+
+import os
+import json
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+import asyncpg
+
+from .models import (
+    Tracking, TrackingSummary, ShippingRoute, StatusHistory,
+    SUMMARY_COLUMNS, TRACKING_SELECT, HEAVY_COLUMNS
+)
+from .cache import tracking_cache
+from .database import (
+    resolve_database_url, checkpoint_names, build_route_timeline, calendar_transit_days, keyset_page_clause,
+    tracking_id_search_pattern, counter_scope, statistics_from_counters, user_statistics_from_rows,
+    USER_STATISTICS_SQL
+)
+
+logger = logging.getLogger(__name__)
+
+def _rowcount(status: str) -> int:
+    """Extract the affected row count from an asyncpg command status ('DELETE 1')"""
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, ValueError, IndexError):
+        return 0
+
+class AsyncDatabaseManager:
+    """Handle all database operations without blocking the event loop"""
+    
+    def __init__(self):
+        # Resolved on first use (see DatabaseManager)
+        self._database_url: Optional[str] = None
+        self.min_size = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+        self.max_size = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+        self.timeout = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+        self.pool: Optional[asyncpg.Pool] = None
+        # Loop the pool was opened on: asyncpg connections only work there
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Dedicated connection for LISTEN (see listen())
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        
+        # Statistics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+    
+    @property
+    def database_url(self) -> str:
+        """Normalized DATABASE_URL (raises ValueError if it is not set)"""
+        if self._database_url is None:
+            self._database_url = resolve_database_url()
+            logger.info("Async database connection configured using DATABASE_URL")
+        return self._database_url
+    
+    async def open(self):
+        """Create the connection pool (call once the event loop is running)"""
+        if self.pool is not None:
+            return
+        
+        # PgBouncer in transaction mode (Neon "-pooler" hosts) does not support prepared statements
+        statement_cache_size = 0 if '-pooler' in self.database_url else 100
+        
+        self.pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=statement_cache_size
+        )
+        self._loop = asyncio.get_running_loop()
+        logger.info(f"Async database pool opened ({self.min_size}-{self.max_size} connections)")
+    
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> bool:
+        """
+        Call callback(payload) for every NOTIFY on channel. Uses a dedicated
+        connection: pooled ones are reset between checkouts, and PgBouncer in
+        transaction mode ("-pooler" hosts) does not deliver notifications at all.
+        
+        Returns:
+            False if notifications cannot be received (callers should poll instead)
+        """
+        if '-pooler' in self.database_url:
+            return False
+        try:
+            if self._listen_conn is None or self._listen_conn.is_closed():
+                self._listen_conn = await asyncpg.connect(self.database_url)
+            await self._listen_conn.add_listener(channel, lambda conn, pid, channel, payload: callback(payload))
+            logger.info(f"Listening for notifications on {channel}")
+            return True
+        except Exception as e:
+            logger.error(f"Could not listen on {channel}: {e}")
+            return False
+    
+    async def close(self):
+        """Close the connection pool (and the notification connection)"""
+        if self._listen_conn is not None:
+            await self._listen_conn.close()
+            self._listen_conn = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            self._loop = None
+            logger.info("Async database pool closed")
+    
+    def serves_running_loop(self) -> bool:
+        """
+        Whether the pool can be used from the running event loop: it has not
+        been opened yet (it will be on this loop) or was opened on this loop.
+        False e.g. under asyncio.run() in ShippingCalculator._run_sync once the
+        pool belongs to another loop.
+        """
+        if self.pool is None:
+            return True
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a pooled connection and always give it back"""
+        if self.pool is None:
+            await self.open()
+        
+        contended = self.pool.get_idle_size() == 0 and self.pool.get_size() >= self.max_size
+        start = time.monotonic()
+        try:
+            conn = await self.pool.acquire(timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            raise
+        
+        wait_time = time.monotonic() - start
+        self._checkouts += 1
+        if contended:
+            self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+        
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+    
+    def get_pool_stats(self) -> dict:
+        """Get connection pool statistics (in use, waits, wait time...)"""
+        size = self.pool.get_size() if self.pool else 0
+        idle = self.pool.get_idle_size() if self.pool else 0
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'checkouts': self._checkouts,
+            'waits': self._waits,
+            'wait_time_total': round(self._wait_time_total, 4),
+            'wait_time_max': round(self._wait_time_max, 4),
+        }
+    
+    def get_cache_stats(self) -> dict:
+        """Get tracking cache statistics (hits, misses, evictions...)"""
+        return tracking_cache.stats()
+    
+    async def initialize_database(self):
+        """Open the pool and verify tables exist"""
+        try:
+            await self.open()
+            async with self.acquire() as conn:
+                tables = await conn.fetch("""
+                    SELECT table_name
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_name IN ('trackings', 'shipping_routes', 'status_history')
+                """)
+                if len(tables) < 3:
+                    logger.warning(f"Some tables missing. Found: {[t['table_name'] for t in tables]}")
+                    logger.warning("Expected: trackings, shipping_routes, status_history (run DatabaseManager.initialize_database to migrate)")
+            logger.info("Async database connection verified successfully")
+        except Exception as e:
+            logger.error(f"Async database initialization error: {e}")
+            raise
+    
+    async def save_tracking(self, tracking: Tracking, created_by_admin_id: Optional[int] = None) -> bool:
+        """Save a new tracking to database and create initial history entries"""
+        try:
+            # Parse the date_time to use as created_at
+            try:
+                parsed_datetime = datetime.strptime(tracking.date_time, "%d/%m/%Y %H:%M")
+            except ValueError:
+                logger.warning(f"Could not parse date_time '{tracking.date_time}', using current timestamp")
+                parsed_datetime = None
+            
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("""
+                        INSERT INTO trackings (
+                            tracking_id, delivery_address, date_time, package_weight, product_name,
+                            sender_address, product_price, recipient_postal_code, recipient_province,
+                            recipient_country, sender_postal_code, sender_province, sender_country,
+                            status, estimated_delivery_date, estimated_days, route_distance_km,
+                            user_telegram_id, username, created_by_admin_id, created_at, updated_at
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20,
+                                  COALESCE($21::timestamp, CURRENT_TIMESTAMP), COALESCE($21::timestamp, CURRENT_TIMESTAMP))
+                        """,
+                        tracking.tracking_id, tracking.delivery_address, tracking.date_time,
+                        tracking.package_weight, tracking.product_name, tracking.sender_address,
+                        tracking.product_price, tracking.recipient_postal_code, tracking.recipient_province,
+                        tracking.recipient_country, tracking.sender_postal_code, tracking.sender_province,
+                        tracking.sender_country, tracking.status, tracking.estimated_delivery_date,
+                        tracking.estimated_days, tracking.route_distance_km,
+                        tracking.user_telegram_id, tracking.username, created_by_admin_id,
+                        parsed_datetime
+                    )
+                    
+                    # Create both initial history entries in a single statement with the same timestamp:
+                    # 1. Paquete recibido en oficinas
+                    # 2. Esperando confirmación de pago
+                    sender_location = tracking.sender_province if tracking.sender_province else tracking.sender_country
+                    await conn.execute("""
+                        INSERT INTO status_history (tracking_id, old_status, new_status, notes, changed_at) VALUES
+                            ($1, NULL, 'RECIBIDO', $2, COALESCE($4::timestamp, CURRENT_TIMESTAMP)),
+                            ($1, 'RECIBIDO', 'ESPERANDO_PAGO', $3, COALESCE($4::timestamp, CURRENT_TIMESTAMP))
+                        """,
+                        tracking.tracking_id, f"Paquete recibido en oficinas de {sender_location}",
+                        "Esperando confirmación de pago", parsed_datetime
+                    )
+            logger.info(f"Tracking {tracking.tracking_id} saved successfully with initial history")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving tracking: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking.tracking_id)
+    
+    async def get_tracking(self, tracking_id: str) -> Optional[Tracking]:
+        """Get tracking by ID (served from tracking_cache when read recently)"""
+        tracking = tracking_cache.get(tracking_id)
+        if tracking is not None:
+            return tracking
+        
+        try:
+            generation = tracking_cache.generation()
+            async with self.acquire() as conn:
+                row = await conn.fetchrow(f"SELECT {TRACKING_SELECT} FROM trackings WHERE tracking_id = $1", tracking_id)
+                if row:
+                    tracking = Tracking.from_row(row)
+                    tracking_cache.put(tracking, generation)
+                    return tracking
+            return None
+        except Exception as e:
+            logger.error(f"Error getting tracking {tracking_id}: {e}")
+            return None
+    
+    async def load_route_data(self, tracking: Tracking) -> Tracking:
+        """
+        Fetch the heavy route columns (HEAVY_COLUMNS) of a tracking without blocking.
+        Call before touching route fields from a handler; otherwise Tracking loads
+        them lazily through the synchronous DatabaseManager.
+        """
+        if tracking.route_data_loaded():
+            return tracking
+        try:
+            async with self.acquire() as conn:
+                row = await conn.fetchrow(
+                    f"SELECT {', '.join(HEAVY_COLUMNS)} FROM trackings WHERE tracking_id = $1",
+                    tracking.tracking_id
+                )
+            values = dict(row) if row else {}
+            if isinstance(values.get('route_steps'), str):
+                # asyncpg returns jsonb as text
+                values['route_steps'] = json.loads(values['route_steps'])
+            for column in HEAVY_COLUMNS:
+                setattr(tracking, column, values.get(column))
+        except Exception as e:
+            logger.error(f"Error loading route data for tracking {tracking.tracking_id}: {e}")
+        return tracking
+    
+    async def can_access_tracking(self, tracking_id: str, admin_id: int, is_owner: bool = False) -> bool:
+        """Check if admin can access this tracking (shares the cached row with get_tracking)"""
+        if is_owner:
+            return True  # Owner can access everything
+        
+        tracking = await self.get_tracking(tracking_id)
+        if not tracking:
+            return False  # Tracking doesn't exist
+        
+        # Admin can access if they created it OR if it's for them
+        return tracking.created_by_admin_id == admin_id or tracking.user_telegram_id == admin_id
+    
+    async def _fetch_trackings_page(self, where: str, params: tuple, limit: Optional[int] = None,
+                                    cursor: Optional[Tuple[datetime, str]] = None,
+                                    direction: str = 'next', summary: bool = False) -> List:
+        """
+        Run a newest-first trackings query, optionally limited to one keyset page.
+        With summary=True only SUMMARY_COLUMNS are selected and TrackingSummary rows returned.
+        """
+        n = len(params)
+        condition, cursor_params, order_by = keyset_page_clause(
+            cursor, direction, placeholders=(f"${n + 1}", f"${n + 2}")
+        )
+        limit_placeholder = f"${n + len(cursor_params) + 1}"
+        columns = ", ".join(SUMMARY_COLUMNS) if summary else TRACKING_SELECT
+        async with self.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT {columns} FROM trackings WHERE {where}{condition} {order_by} LIMIT {limit_placeholder}",
+                *params, *cursor_params, limit
+            )
+        if summary:
+            trackings = [TrackingSummary(*row) for row in rows]
+        else:
+            trackings = [Tracking.from_row(row) for row in rows]
+        if direction == 'prev':
+            trackings.reverse()
+        return trackings
+    
+    def _access_filter(self, admin_id: int, is_owner: bool = False, first_param: int = 1) -> Tuple[str, tuple]:
+        """WHERE clause limiting trackings to those an admin may see (parameters start at $first_param)"""
+        if is_owner:
+            # Owner sees everything
+            return "TRUE", ()
+        # Admin sees trackings they created OR trackings created for them
+        return f"(created_by_admin_id = ${first_param} OR user_telegram_id = ${first_param})", (admin_id,)
+    
+    async def _read_counter(self, scope: str, subject_id: int, status: Optional[str] = None) -> int:
+        """All-time total of a tracking_counters scope, optionally for one status"""
+        sql = "SELECT COALESCE(SUM(count), 0) FROM tracking_counters WHERE scope = $1 AND subject_id = $2 AND day = 'infinity'"
+        args = [scope, subject_id]
+        if scope != 'user':
+            sql += " AND username = ''"
+        if status is not None:
+            sql += " AND status = $3"
+            args.append(status)
+        async with self.acquire() as conn:
+            return await conn.fetchval(sql, *args)
+    
+    async def get_trackings_by_status(self, status: str, admin_id: int, is_owner: bool = False,
+                                      limit: Optional[int] = None, cursor: Optional[Tuple[datetime, str]] = None,
+                                      direction: str = 'next') -> List[Tracking]:
+        """
+        Get trackings with specific status, filtered by admin if not owner.
+        Pass limit/cursor/direction to read a single keyset page (see keyset_page_clause).
+        """
+        try:
+            access, access_params = self._access_filter(admin_id, is_owner, first_param=2)
+            return await self._fetch_trackings_page(
+                f"status = $1 AND {access}", (status,) + access_params, limit, cursor, direction
+            )
+        except Exception as e:
+            logger.error(f"Error getting trackings by status {status}: {e}")
+            return []
+    
+    async def get_tracking_summaries_by_status(self, status: str, admin_id: int, is_owner: bool = False,
+                                               limit: Optional[int] = None,
+                                               cursor: Optional[Tuple[datetime, str]] = None,
+                                               direction: str = 'next') -> List[TrackingSummary]:
+        """Same as get_trackings_by_status() but only the columns shown in list screens"""
+        try:
+            access, access_params = self._access_filter(admin_id, is_owner, first_param=2)
+            return await self._fetch_trackings_page(
+                f"status = $1 AND {access}", (status,) + access_params, limit, cursor, direction, summary=True
+            )
+        except Exception as e:
+            logger.error(f"Error getting tracking summaries by status {status}: {e}")
+            return []
+    
+    async def count_trackings_by_status(self, status: str, admin_id: int, is_owner: bool = False) -> int:
+        """Count trackings with specific status, filtered by admin if not owner"""
+        try:
+            return await self._read_counter(*counter_scope(admin_id, is_owner), status=status)
+        except Exception as e:
+            logger.error(f"Error counting trackings by status {status}: {e}")
+            return 0
+    
+    async def update_tracking_status(self, tracking_id: str, new_status: str, notes: Optional[str] = None) -> bool:
+        """Update tracking status and log the change"""
+        try:
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    # Get current status
+                    old_status = await conn.fetchval(
+                        "SELECT status FROM trackings WHERE tracking_id = $1 FOR UPDATE", tracking_id
+                    )
+                    if not old_status:
+                        return False
+                    
+                    # Update status
+                    await conn.execute(
+                        "UPDATE trackings SET status = $1, updated_at = CURRENT_TIMESTAMP WHERE tracking_id = $2",
+                        new_status, tracking_id
+                    )
+                    
+                    # Log status change
+                    await conn.execute(
+                        "INSERT INTO status_history (tracking_id, old_status, new_status, notes) VALUES ($1, $2, $3, $4)",
+                        tracking_id, old_status, new_status, notes
+                    )
+            logger.info(f"Tracking {tracking_id} status updated from {old_status} to {new_status}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating tracking status: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking_id)
+    
+    async def add_delay_to_tracking(self, tracking_id: str, delay_days: int, reason: str,
+                                    estimated_delivery_date: Optional[str] = None) -> bool:
+        """Add delay to tracking and update estimated delivery (kept as is when no new date is given)"""
+        try:
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        """UPDATE trackings SET actual_delay_days = actual_delay_days + $1,
+                               estimated_delivery_date = COALESCE($3, estimated_delivery_date),
+                               updated_at = CURRENT_TIMESTAMP
+                           WHERE tracking_id = $2""",
+                        delay_days, tracking_id, estimated_delivery_date
+                    )
+                    
+                    # Log the delay
+                    await conn.execute(
+                        "INSERT INTO status_history (tracking_id, old_status, new_status, notes) VALUES ($1, $2, $3, $4)",
+                        tracking_id, "DELAY_ADDED", "DELAY_ADDED", f"Retraso de {delay_days} días: {reason}"
+                    )
+            logger.info(f"Added {delay_days} days delay to tracking {tracking_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error adding delay to tracking: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking_id)
+    
+    async def update_delivery_estimate(self, tracking_id: str, estimated_days: int, estimated_delivery_date: str,
+                                       route_distance_km: Optional[float] = None) -> bool:
+        """
+        Store the base transit days and estimated delivery date rendered by list
+        screens (and the route distance when known). Only changes on payment
+        confirmation, shipping and delays, so listing never calls the routing API.
+        """
+        try:
+            async with self.acquire() as conn:
+                status = await conn.execute("""
+                    UPDATE trackings SET
+                        estimated_days = $2, estimated_delivery_date = $3,
+                        route_distance_km = COALESCE($4, route_distance_km),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE tracking_id = $1
+                    """,
+                    tracking_id, estimated_days, estimated_delivery_date, route_distance_km
+                )
+            logger.info(f"Stored delivery estimate for tracking {tracking_id}: {estimated_delivery_date} ({estimated_days} days)")
+            return _rowcount(status) > 0
+        except Exception as e:
+            logger.error(f"Error storing delivery estimate for {tracking_id}: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking_id)
+    
+    async def get_shipping_routes(self) -> Optional[List[ShippingRoute]]:
+        """Get every shipping route (None on error, so callers can keep what they have)"""
+        try:
+            async with self.acquire() as conn:
+                rows = await conn.fetch(
+                    "SELECT origin_country, destination_country, estimated_days FROM shipping_routes"
+                )
+            return [ShippingRoute(**dict(row)) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting shipping routes: {e}")
+            return None
+    
+    async def get_shipping_route(self, origin: str, destination: str) -> Optional[ShippingRoute]:
+        """Get shipping route between countries"""
+        try:
+            async with self.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT origin_country, destination_country, estimated_days FROM shipping_routes WHERE origin_country = $1 AND destination_country = $2",
+                    origin, destination
+                )
+                if row:
+                    return ShippingRoute(**dict(row))
+            return None
+        except Exception as e:
+            logger.error(f"Error getting shipping route: {e}")
+            return None
+    
+    async def get_cached_geocode(self, cache_key: str) -> Tuple[bool, Optional[dict]]:
+        """
+        Look up an unexpired geocode_cache entry.
+        
+        Returns:
+            (cached, result); result is None for a cached "no results" entry
+        """
+        try:
+            async with self.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT result FROM geocode_cache WHERE cache_key = $1 AND expires_at > NOW()",
+                    cache_key
+                )
+                if not row:
+                    return False, None
+                return True, json.loads(row['result']) if row['result'] is not None else None
+        except Exception as e:
+            logger.error(f"Error reading geocode cache: {e}")
+            return False, None
+    
+    async def save_cached_geocode(self, cache_key: str, result: Optional[dict], ttl_seconds: float) -> bool:
+        """Insert or refresh a geocode_cache entry (result None caches "no results")"""
+        try:
+            async with self.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO geocode_cache (cache_key, result, created_at, expires_at)
+                    VALUES ($1, $2::jsonb, NOW(), NOW() + make_interval(secs => $3))
+                    ON CONFLICT (cache_key) DO UPDATE
+                    SET result = EXCLUDED.result, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+                    """,
+                    cache_key, json.dumps(result) if result is not None else None, float(ttl_seconds)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error writing geocode cache: {e}")
+            return False
+    
+    async def get_cached_reverse_geocodes(self, cell_keys: List[str]) -> dict:
+        """
+        Read reverse_geocode_cache cells and mark them as recently used.
+        
+        Returns:
+            {cell_key: result} for the cells found (result None for "no result")
+        """
+        try:
+            async with self.acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    UPDATE reverse_geocode_cache SET last_used_at = NOW()
+                    WHERE cell_key = ANY($1::text[])
+                    RETURNING cell_key, result
+                    """,
+                    cell_keys
+                )
+                return {
+                    row['cell_key']: json.loads(row['result']) if row['result'] is not None else None
+                    for row in rows
+                }
+        except Exception as e:
+            logger.error(f"Error reading reverse geocode cache: {e}")
+            return {}
+    
+    async def save_cached_reverse_geocode(self, cell_key: str, result: Optional[dict]) -> bool:
+        """Insert or refresh a reverse_geocode_cache cell (result None caches "no result")"""
+        try:
+            async with self.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO reverse_geocode_cache (cell_key, result, last_used_at)
+                    VALUES ($1, $2::jsonb, NOW())
+                    ON CONFLICT (cell_key) DO UPDATE
+                    SET result = EXCLUDED.result, last_used_at = EXCLUDED.last_used_at
+                    """,
+                    cell_key, json.dumps(result) if result is not None else None
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error writing reverse geocode cache: {e}")
+            return False
+    
+    async def evict_reverse_geocode_cache(self, max_rows: int) -> int:
+        """Delete the least recently used cells beyond max_rows; returns how many were deleted"""
+        try:
+            async with self.acquire() as conn:
+                status = await conn.execute("""
+                    DELETE FROM reverse_geocode_cache
+                    WHERE last_used_at < (
+                        SELECT last_used_at FROM reverse_geocode_cache
+                        ORDER BY last_used_at DESC OFFSET $1 LIMIT 1
+                    )
+                    """,
+                    max_rows - 1
+                )
+                return _rowcount(status)
+        except Exception as e:
+            logger.error(f"Error evicting reverse geocode cache: {e}")
+            return 0
+    
+    async def get_cached_route(self, cache_key: str) -> Optional[dict]:
+        """Look up an unexpired route_cache entry (None if missing or expired)"""
+        try:
+            async with self.acquire() as conn:
+                result = await conn.fetchval(
+                    "SELECT result FROM route_cache WHERE cache_key = $1 AND expires_at > NOW()",
+                    cache_key
+                )
+                return json.loads(result) if result is not None else None
+        except Exception as e:
+            logger.error(f"Error reading route cache: {e}")
+            return None
+    
+    async def save_cached_route(self, cache_key: str, result: dict, ttl_seconds: float) -> bool:
+        """Insert or refresh a route_cache entry"""
+        try:
+            async with self.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO route_cache (cache_key, result, created_at, expires_at)
+                    VALUES ($1, $2::jsonb, NOW(), NOW() + make_interval(secs => $3))
+                    ON CONFLICT (cache_key) DO UPDATE
+                    SET result = EXCLUDED.result, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+                    """,
+                    cache_key, json.dumps(result), float(ttl_seconds)
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Error writing route cache: {e}")
+            return False
+    
+    async def save_route(self, tracking_id: str, full_route: dict) -> bool:
+        """
+        Persist an OpenRouteService.get_full_route_with_checkpoints() result on the
+        tracking: geocoded endpoints, distance, duration, geometry, and the estimated
+        days and checkpoints (as JSON in route_states).
+        """
+        sender, recipient, route = full_route["sender"], full_route["recipient"], full_route["route"]
+        route_states = json.dumps({
+            "estimated_days": route.get("estimated_days"),
+            "checkpoints": full_route.get("checkpoints", [])
+        })
+        try:
+            async with self.acquire() as conn:
+                status = await conn.execute("""
+                    UPDATE trackings SET
+                        sender_lat = $2, sender_lon = $3, sender_formatted_address = $4,
+                        recipient_lat = $5, recipient_lon = $6, recipient_formatted_address = $7,
+                        route_distance_km = $8, route_duration_hours = $9, route_geometry = $10,
+                        route_distance = $11, route_duration = $12, route_states = $13,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE tracking_id = $1
+                    """,
+                    tracking_id,
+                    sender["lat"], sender["lon"], sender.get("address"),
+                    recipient["lat"], recipient["lon"], recipient.get("address"),
+                    route["distance_km"], route["duration_hours"], route.get("geometry"),
+                    round(route["distance_km"] * 1000), round(route["duration_hours"] * 3600), route_states
+                )
+            logger.info(f"Saved route for tracking {tracking_id}: {route['distance_km']}km")
+            return _rowcount(status) > 0
+        except Exception as e:
+            logger.error(f"Error saving route for tracking {tracking_id}: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking_id)
+    
+    async def get_saved_route(self, tracking: Tracking) -> Optional[dict]:
+        """
+        The route stored by save_route(), in get_full_route_with_checkpoints() shape,
+        or None if the tracking has no complete stored route.
+        """
+        if tracking.route_distance_km is None or tracking.sender_lat is None or tracking.recipient_lat is None:
+            return None
+        await self.load_route_data(tracking)
+        try:
+            saved = json.loads(tracking.route_states) if tracking.route_states else None
+        except (TypeError, ValueError):
+            saved = None
+        if not isinstance(saved, dict) or not saved.get("checkpoints") or not saved.get("estimated_days"):
+            return None
+        return {
+            "sender": {
+                "address": tracking.sender_formatted_address,
+                "lat": float(tracking.sender_lat),
+                "lon": float(tracking.sender_lon)
+            },
+            "recipient": {
+                "address": tracking.recipient_formatted_address,
+                "lat": float(tracking.recipient_lat),
+                "lon": float(tracking.recipient_lon)
+            },
+            "route": {
+                "distance_km": float(tracking.route_distance_km),
+                "duration_hours": float(tracking.route_duration_hours or 0),
+                "estimated_days": saved["estimated_days"],
+                "geometry": tracking.route_geometry
+            },
+            "checkpoints": saved["checkpoints"]
+        }
+    
+    async def _insert_history_events(self, conn, tracking_id: str, events: List[Tuple[str, str, str, datetime]]):
+        """Write a whole timeline with one INSERT ... SELECT FROM unnest() (a single round trip)"""
+        if not events:
+            return
+        old_statuses, new_statuses, notes, changed_ats = (list(column) for column in zip(*events))
+        await conn.execute("""
+            INSERT INTO status_history (tracking_id, old_status, new_status, notes, changed_at)
+            SELECT $1::varchar, * FROM unnest($2::varchar[], $3::varchar[], $4::text[], $5::timestamp[])
+            """,
+            tracking_id, old_statuses, new_statuses, notes, changed_ats
+        )
+    
+    async def generate_route_history_events(self, tracking_id: str, checkpoints: List,
+                                            estimated_days: int = 5, start_datetime: Optional[datetime] = None,
+                                            country: Optional[str] = None, province: Optional[str] = None) -> bool:
+        """
+        Generate history events for each checkpoint along the route with distributed timestamps.
+        The timeline is built in memory by build_route_timeline() and written in a single statement.
+        It spans the calendar days that estimated_days business days take at the destination
+        (country code and province), so it ends on the estimated delivery date.
+        
+        Returns:
+            True if successful
+        """
+        try:
+            if not checkpoints or len(checkpoints) == 0:
+                logger.warning(f"No checkpoints provided for tracking {tracking_id}")
+                return False
+            
+            state_names = checkpoint_names(checkpoints)
+            
+            if len(state_names) == 0:
+                logger.warning(f"No valid state names in checkpoints for tracking {tracking_id}")
+                return False
+            
+            start_datetime = start_datetime or datetime.now()
+            transit_days = calendar_transit_days(estimated_days, start_datetime, country, province)
+            events = build_route_timeline(state_names, transit_days, start_datetime)
+            
+            async with self.acquire() as conn:
+                await self._insert_history_events(conn, tracking_id, events)
+            
+            logger.info(f"Generated route history events for tracking {tracking_id} with {len(state_names)} checkpoints over {estimated_days} days: {state_names}")
+            return True
+        except Exception as e:
+            logger.error(f"Error generating route history: {e}")
+            return False
+    
+    async def get_tracking_history(self, tracking_id: str, include_future: bool = False) -> List[StatusHistory]:
+        """Get status change history for tracking
+        
+        Args:
+            tracking_id: Tracking ID
+            include_future: If True, includes future scheduled events.
+                           If False (default), only shows events up to current time.
+        """
+        try:
+            async with self.acquire() as conn:
+                if include_future:
+                    rows = await conn.fetch(
+                        "SELECT * FROM status_history WHERE tracking_id = $1 ORDER BY changed_at ASC, id ASC",
+                        tracking_id
+                    )
+                else:
+                    rows = await conn.fetch(
+                        "SELECT * FROM status_history WHERE tracking_id = $1 AND (changed_at IS NULL OR changed_at <= NOW()) ORDER BY changed_at ASC, id ASC",
+                        tracking_id
+                    )
+                return [StatusHistory(**dict(row)) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting tracking history: {e}")
+            return []
+    
+    async def get_statistics(self, admin_id: int, is_owner: bool = False) -> dict:
+        """Get tracking statistics, filtered by admin if not owner (read from tracking_counters)"""
+        try:
+            async with self.acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT status, day = 'infinity' AS is_total, count FROM tracking_counters
+                    WHERE scope = $1 AND subject_id = $2 AND username = ''
+                      AND day IN (CURRENT_DATE, 'infinity') AND count <> 0
+                    """,
+                    *counter_scope(admin_id, is_owner)
+                )
+                return statistics_from_counters((row['status'], row['is_total'], row['count']) for row in rows)
+        except Exception as e:
+            logger.error(f"Error getting statistics: {e}")
+            return {}
+    
+    async def get_user_statistics(self) -> List[dict]:
+        """Get statistics grouped by user (owner only)"""
+        try:
+            async with self.acquire() as conn:
+                rows = await conn.fetch(USER_STATISTICS_SQL)
+                return user_statistics_from_rows(rows)
+        except Exception as e:
+            logger.error(f"Error getting user statistics: {e}")
+            return []
+    
+    async def get_trackings_by_user(self, user_id: int, limit: Optional[int] = None,
+                                    cursor: Optional[Tuple[datetime, str]] = None,
+                                    direction: str = 'next') -> List[Tracking]:
+        """Get trackings created by or for a specific user, optionally one keyset page"""
+        try:
+            return await self._fetch_trackings_page("user_telegram_id = $1", (user_id,), limit, cursor, direction)
+        except Exception as e:
+            logger.error(f"Error getting trackings for user {user_id}: {e}")
+            return []
+    
+    async def get_tracking_summaries_by_user(self, user_id: int, limit: Optional[int] = None,
+                                             cursor: Optional[Tuple[datetime, str]] = None,
+                                             direction: str = 'next') -> List[TrackingSummary]:
+        """Same as get_trackings_by_user() but only the columns shown in list screens"""
+        try:
+            return await self._fetch_trackings_page(
+                "user_telegram_id = $1", (user_id,), limit, cursor, direction, summary=True
+            )
+        except Exception as e:
+            logger.error(f"Error getting tracking summaries for user {user_id}: {e}")
+            return []
+    
+    async def count_trackings_by_user(self, user_id: int) -> int:
+        """Count trackings created by or for a specific user"""
+        try:
+            return await self._read_counter('user', user_id)
+        except Exception as e:
+            logger.error(f"Error counting trackings for user {user_id}: {e}")
+            return 0
+    
+    async def delete_tracking(self, tracking_id: str) -> bool:
+        """Delete a tracking and its related records"""
+        try:
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    # Delete status history first (foreign key constraint)
+                    await conn.execute("DELETE FROM status_history WHERE tracking_id = $1", tracking_id)
+                    
+                    # Delete the tracking
+                    status = await conn.execute("DELETE FROM trackings WHERE tracking_id = $1", tracking_id)
+                    
+                    if _rowcount(status) == 0:
+                        logger.warning(f"No tracking found with ID {tracking_id}")
+                        return False
+            logger.info(f"Tracking {tracking_id} deleted successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting tracking {tracking_id}: {e}")
+            return False
+        finally:
+            tracking_cache.invalidate(tracking_id)
+    
+    async def get_all_trackings(self, admin_id: int, is_owner: bool = False, limit: Optional[int] = None,
+                                cursor: Optional[Tuple[datetime, str]] = None,
+                                direction: str = 'next') -> List[Tracking]:
+        """Get trackings, filtered by admin if not owner, optionally one keyset page"""
+        try:
+            access, access_params = self._access_filter(admin_id, is_owner)
+            return await self._fetch_trackings_page(access, access_params, limit, cursor, direction)
+        except Exception as e:
+            logger.error(f"Error getting all trackings: {e}")
+            return []
+    
+    async def get_all_tracking_summaries(self, admin_id: int, is_owner: bool = False, limit: Optional[int] = None,
+                                         cursor: Optional[Tuple[datetime, str]] = None,
+                                         direction: str = 'next') -> List[TrackingSummary]:
+        """Same as get_all_trackings() but only the columns shown in list screens"""
+        try:
+            access, access_params = self._access_filter(admin_id, is_owner)
+            return await self._fetch_trackings_page(access, access_params, limit, cursor, direction, summary=True)
+        except Exception as e:
+            logger.error(f"Error getting all tracking summaries: {e}")
+            return []
+    
+    async def _search_trackings(self, query: str, admin_id: int, is_owner: bool, limit: int, summary: bool) -> List:
+        """Indexed substring/prefix search on tracking_id, scoped and limited in SQL"""
+        if not query or not query.strip():
+            return []
+        access, access_params = self._access_filter(admin_id, is_owner, first_param=2)
+        return await self._fetch_trackings_page(
+            f"upper(tracking_id) LIKE $1 AND {access}",
+            (tracking_id_search_pattern(query),) + access_params, limit, summary=summary
+        )
+    
+    async def search_trackings(self, query: str, admin_id: int, is_owner: bool = False,
+                               limit: int = 10) -> List[Tracking]:
+        """
+        Find trackings whose ID contains (or, for short queries, starts with) `query`.
+        Matching, access filtering and the limit all run in SQL behind an index.
+        """
+        try:
+            return await self._search_trackings(query, admin_id, is_owner, limit, summary=False)
+        except Exception as e:
+            logger.error(f"Error searching trackings for '{query}': {e}")
+            return []
+    
+    async def search_tracking_summaries(self, query: str, admin_id: int, is_owner: bool = False,
+                                        limit: int = 10) -> List[TrackingSummary]:
+        """Same as search_trackings() but only the columns shown in list screens"""
+        try:
+            return await self._search_trackings(query, admin_id, is_owner, limit, summary=True)
+        except Exception as e:
+            logger.error(f"Error searching tracking summaries for '{query}': {e}")
+            return []
+    
+    async def count_all_trackings(self, admin_id: int, is_owner: bool = False) -> int:
+        """Count trackings, filtered by admin if not owner"""
+        try:
+            return await self._read_counter(*counter_scope(admin_id, is_owner))
+        except Exception as e:
+            logger.error(f"Error counting trackings: {e}")
+            return 0
+
+# Global async database manager instance
+async_db_manager = AsyncDatabaseManager()
@@ -0,0 +1,239 @@
+"""
+Business-day arithmetic with national and regional holiday calendars
+
+Delivery estimates count working days at the destination: weekends and its
+public holidays are skipped. The rules in data/holidays.json (HOLIDAYS_PATH)
+are compiled once into numpy.busdaycalendar objects per country and region,
+for a window of years around the current one, so an offset is a single
+numpy.busday_offset() call instead of a day-by-day loop, and a whole array
+of start dates is shifted in one call.
+
+Countries without rules, and dates outside the window, only skip weekends.
+"""
+
+import os
+import json
+import logging
+import unicodedata
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bundled holiday rules (see the file's _comment for the format)
+HOLIDAYS_PATH = os.getenv(
+    'HOLIDAYS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'holidays.json')
+)
+
+# Monday..Sunday working days when a country does not set its own
+DEFAULT_WEEKMASK = "1111100"
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=1024)
+def normalize_region_name(name: str) -> str:
+    """Upper case without accents or extra spaces: 'Cataluña ' -> 'CATALUNA'"""
+    decomposed = unicodedata.normalize('NFKD', name or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.upper().split())
+
+
+def expand_rules(rules: Iterable[str], years: Iterable[int]) -> List[date]:
+    """
+    Dates of holiday rules over a range of years. A rule is 'MM-DD' (every
+    year), 'easter+N' / 'easter-N' (days from Easter Sunday) or 'YYYY-MM-DD'
+    (that date only, if inside the years).
+    """
+    years = list(years)
+    dates = []
+    for rule in rules:
+        if rule.startswith('easter'):
+            delta = timedelta(days=int(rule[len('easter'):] or 0))
+            dates.extend(easter_sunday(year) + delta for year in years)
+        elif rule.count('-') == 2:
+            day = date.fromisoformat(rule)
+            if day.year in years:
+                dates.append(day)
+        else:
+            month, day = (int(part) for part in rule.split('-'))
+            dates.extend(date(year, month, day) for year in years)
+    return dates
+
+
+class _CompiledCalendar:
+    """
+    One busdaycalendar plus lookup tables over a window of days: the
+    ordinals of its working days and, for every day, how many working days
+    fall on or before it. Offsetting a date inside the window is two list
+    lookups; outside it falls back to numpy.busday_offset().
+    """
+    
+    __slots__ = ('busdaycal', 'first_ordinal', 'rank', 'working_days')
+    
+    def __init__(self, busdaycal: np.busdaycalendar, first_day: date, last_day: date):
+        self.busdaycal = busdaycal
+        self.first_ordinal = first_day.toordinal()
+        days = np.arange(np.datetime64(first_day, 'D'), np.datetime64(last_day, 'D') + 1)
+        is_working = np.is_busday(days, busdaycal=busdaycal)
+        self.rank = np.cumsum(is_working).tolist()
+        self.working_days = (np.flatnonzero(is_working) + self.first_ordinal).tolist()
+    
+    def offset_ordinal(self, ordinal: int, days: int) -> int:
+        """Ordinal of the date `days` (> 0) working days after the given ordinal"""
+        i = ordinal - self.first_ordinal
+        if 0 <= i < len(self.rank):
+            # working_days[rank - 1] is the last working day on or before the date
+            j = self.rank[i] - 1 + days
+            if j < len(self.working_days):
+                return self.working_days[j]
+        start = np.datetime64(date.fromordinal(ordinal), 'D')
+        end = np.busday_offset(start, days, roll='backward', busdaycal=self.busdaycal)
+        return ordinal + int((end - start).astype(int))
+
+
+class BusinessCalendar:
+    """
+    Precompiled business-day calendars keyed by (country code, region code).
+    
+    A region calendar holds the national holidays plus the region's own;
+    add_business_days() and offset() pick the most specific calendar known
+    for a destination and fall back to the national one, then to weekends.
+    """
+    
+    def __init__(self, data: Dict, years: Iterable[int]):
+        self.years = range(min(years), max(years) + 1)
+        self._provinces: Dict[str, Dict[str, str]] = {}
+        self._calendars: Dict[Tuple[str, Optional[str]], _CompiledCalendar] = {}
+        self._default = self._compile(DEFAULT_WEEKMASK, [])
+        
+        for country, spec in data.items():
+            if country.startswith('_'):
+                continue
+            country = country.upper()
+            weekmask = spec.get('weekmask', DEFAULT_WEEKMASK)
+            national = expand_rules(spec.get('national', {}), self.years)
+            self._calendars[(country, None)] = self._compile(weekmask, national)
+            for region, rules in spec.get('regions', {}).items():
+                self._calendars[(country, region)] = self._compile(weekmask, national + expand_rules(rules, self.years))
+            self._provinces[country] = {normalize_region_name(name): region
+                                        for name, region in spec.get('provinces', {}).items()}
+    
+    def _compile(self, weekmask: str, holidays: List[date]) -> _CompiledCalendar:
+        return _CompiledCalendar(np.busdaycalendar(weekmask=weekmask, holidays=holidays),
+                                 date(self.years.start, 1, 1), date(self.years.stop - 1, 12, 31))
+    
+    @classmethod
+    def load(cls, path: str = HOLIDAYS_PATH, years_back: int = 1, years_ahead: int = 5) -> "BusinessCalendar":
+        """Compile the calendars in a holidays file (weekends only if it cannot be read)"""
+        this_year = date.today().year
+        years = range(this_year - years_back, this_year + years_ahead + 1)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load holiday calendars from {path}: {e}; counting weekends only")
+            data = {}
+        calendar = cls(data, years)
+        logger.info(f"Business calendars loaded: {calendar.stats()}")
+        return calendar
+    
+    def region_of(self, country: Optional[str], province: Optional[str]) -> Optional[str]:
+        """Region code of a province (or region) name in a country, None if unknown"""
+        if not country or not province:
+            return None
+        return self._provinces.get(country.upper(), {}).get(normalize_region_name(province))
+    
+    def calendar(self, country: Optional[str] = None, province: Optional[str] = None) -> np.busdaycalendar:
+        """Most specific calendar for a destination country code and province"""
+        return self._compiled(country, province).busdaycal
+    
+    def _compiled(self, country: Optional[str], province: Optional[str]) -> _CompiledCalendar:
+        if not country:
+            return self._default
+        country = country.upper()
+        region = self.region_of(country, province)
+        for key in ((country, region), (country, None)):
+            if key in self._calendars:
+                return self._calendars[key]
+        return self._default
+    
+    def add_business_days(self, start: datetime, days: int, country: Optional[str] = None,
+                          province: Optional[str] = None) -> datetime:
+        """
+        The datetime `days` business days after start, keeping its time of day.
+        A start on a non-working day counts from the next working day; days <= 0
+        returns start unchanged.
+        """
+        if days <= 0:
+            return start
+        ordinal = start.toordinal()
+        return start + timedelta(days=self._compiled(country, province).offset_ordinal(ordinal, days) - ordinal)
+    
+    def offset(self, starts, days, country: Optional[str] = None, province: Optional[str] = None) -> np.ndarray:
+        """
+        Vectorized add_business_days() on dates: starts (datetime64[D]-like) and
+        days (int or array) broadcast together. Returns datetime64[D].
+        """
+        starts = np.asarray(starts, dtype='datetime64[D]')
+        days = np.asarray(days, dtype=np.int64)
+        # roll='backward' + n equals counting n working days strictly after the start
+        shifted = np.busday_offset(starts, np.maximum(days, 0), roll='backward',
+                                   busdaycal=self.calendar(country, province))
+        return np.where(days > 0, shifted, starts)
+    
+    def offset_many(self, starts, days, countries: Sequence[Optional[str]],
+                    provinces: Sequence[Optional[str]]) -> np.ndarray:
+        """
+        offset() for rows with different destinations: aligned arrays of start
+        dates, days, country codes and provinces. Rows are grouped by the
+        calendar that applies to them, with one busday_offset() call per group.
+        """
+        starts = np.asarray(starts, dtype='datetime64[D]')
+        days = np.asarray(days, dtype=np.int64)
+        
+        # Distinct destinations -> group number of their calendar
+        groups: Dict[int, Tuple[int, _CompiledCalendar]] = {}
+        group_of = {}
+        for key in set(zip(countries, provinces)):
+            compiled = self._compiled(*key)
+            group_of[key] = groups.setdefault(id(compiled), (len(groups), compiled))[0]
+        row_groups = np.fromiter(map(group_of.__getitem__, zip(countries, provinces)),
+                                 dtype=np.int64, count=len(starts))
+        
+        result = starts.copy()
+        positive = days > 0
+        for group, compiled in groups.values():
+            rows = np.flatnonzero((row_groups == group) & positive)
+            if len(rows):
+                result[rows] = np.busday_offset(starts[rows], days[rows], roll='backward',
+                                                busdaycal=compiled.busdaycal)
+        return result
+    
+    def stats(self) -> dict:
+        """Calendars compiled (per country) and the years they cover"""
+        countries = sorted({country for country, _ in self._calendars})
+        return {
+            'years': f"{self.years.start}-{self.years.stop - 1}",
+            'calendars': {country: sum(1 for c, _ in self._calendars if c == country) for country in countries},
+        }
+
+
+# Shared by the shipping calculator and the route timelines
+business_calendar = BusinessCalendar.load()
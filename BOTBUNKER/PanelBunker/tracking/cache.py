@@ -0,0 +1,134 @@
+"""
+In-process read-through cache of Tracking rows
+
+Admin handlers read the same tracking several times within seconds
+(get_tracking followed by can_access_tracking, then again on the confirmation
+callback). TrackingCache keeps recently read trackings in a bounded LRU with
+a TTL. The sync and async database managers share one instance and
+invalidate an entry whenever they modify that tracking.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .models import Tracking
+
+
+class TrackingCache:
+    """
+    Bounded LRU + TTL cache of Tracking objects keyed by tracking_id.
+    
+    - At most `max_size` entries; the least recently used one is evicted first
+    - Entries older than `ttl` seconds are treated as misses (bounds staleness
+      against writes made by other processes)
+    - Thread-safe: DatabaseManager is used from worker threads
+    - A fill is discarded if an invalidation happened while its query was in
+      flight, so a slow reader can never cache a row older than a write
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        if max_size < 0 or ttl < 0:
+            raise ValueError(f"Invalid cache settings: max_size={max_size}, ttl={ttl}")
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # tracking_id -> (tracking, stored_at)
+        self._generation = 0  # bumped by every invalidation
+        
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._discarded_fills = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+    
+    def generation(self) -> int:
+        """Token to take before querying the database and pass back to put()"""
+        return self._generation
+    
+    def get(self, tracking_id: str) -> Optional[Tracking]:
+        """Return the cached tracking, or None on a miss"""
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            entry = self._entries.get(tracking_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            tracking, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[tracking_id]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(tracking_id)
+            self._hits += 1
+            return tracking
+    
+    def put(self, tracking: Tracking, generation: int):
+        """Store a tracking read from the database after generation() was taken"""
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            if generation != self._generation:
+                # Something was written while this row was being read
+                self._discarded_fills += 1
+                return
+            
+            self._entries[tracking.tracking_id] = (tracking, time.monotonic())
+            self._entries.move_to_end(tracking.tracking_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def invalidate(self, tracking_id: str):
+        """Drop a tracking after it was modified (call once the write is committed)"""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(tracking_id, None) is not None:
+                self._invalidations += 1
+    
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        """Get cache statistics (hits, misses, evictions...) for sizing max_size and ttl"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+                'discarded_fills': self._discarded_fills,
+            }
+
+
+# Shared by db_manager and async_db_manager (TRACKING_CACHE_SIZE=0 disables it)
+tracking_cache = TrackingCache(
+    max_size=int(os.getenv('TRACKING_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('TRACKING_CACHE_TTL', '30'))
+)
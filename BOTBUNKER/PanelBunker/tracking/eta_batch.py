@@ -0,0 +1,123 @@
+"""
+Batch recomputation of stored delivery estimates
+
+When shipping_routes or the holiday calendars change, the delivery estimates
+stored on trackings go stale. EtaBatch holds the inputs of many trackings as
+columns (country codes, route distance, delays, start date), and
+compute_delivery_estimates() recomputes every base transit time and delivery
+date with NumPy in one pass: one matrix lookup for all country pairs and one
+busday_offset() call per destination calendar. Nothing is geocoded or routed.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+from .eta_engine import EtaEngine, UNKNOWN
+from .business_days import BusinessCalendar
+
+# Transit days when a pair has no route, distance or stored days (as in calculate_estimated_delivery)
+DOMESTIC_FALLBACK_DAYS = 2
+INTERNATIONAL_FALLBACK_DAYS = 10
+
+# date.toordinal() of datetime64[D] zero
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@dataclass
+class EtaBatch:
+    """Column-oriented inputs of a delivery-estimate recomputation, one row per tracking"""
+    tracking_ids: List[str]
+    origins: np.ndarray        # origin country codes (object)
+    destinations: np.ndarray   # destination country codes (object)
+    provinces: List[str]       # destination provinces, for regional holidays
+    distance_km: np.ndarray    # road distance (route_distance_km), NaN when unknown
+    stored_days: np.ndarray    # estimated_days column, UNKNOWN when NULL
+    delay_days: np.ndarray     # actual_delay_days
+    starts: np.ndarray         # datetime64[D] the estimate counts from
+    stored_dates: List[str]    # estimated_delivery_date column ('dd/mm/YYYY' or None)
+    
+    def __len__(self) -> int:
+        return len(self.tracking_ids)
+    
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], origin_code: Callable[[str], str],
+                  destination_code: Callable[[str], str]) -> "EtaBatch":
+        """
+        Build a batch from DatabaseManager.get_delivery_estimate_inputs() rows.
+        Country texts become codes through origin_code / destination_code, each
+        distinct text once.
+        """
+        if rows:
+            (tracking_ids, origins, destinations, provinces, distances,
+             stored_days, delays, stored_dates, starts) = zip(*rows)
+        else:
+            tracking_ids = origins = destinations = provinces = distances = stored_days = delays = stored_dates = starts = ()
+        
+        def codes(texts, to_code) -> np.ndarray:
+            lookup = {text: to_code(text or "") for text in set(texts)}
+            return np.array([lookup[text] for text in texts], dtype=object)
+        
+        return cls(
+            tracking_ids=list(tracking_ids),
+            origins=codes(origins, origin_code),
+            destinations=codes(destinations, destination_code),
+            provinces=[province or "" for province in provinces],
+            distance_km=np.array(distances, dtype=np.float64),  # None -> NaN
+            stored_days=np.array([UNKNOWN if d is None else d for d in stored_days], dtype=np.int64),
+            delay_days=np.array([d or 0 for d in delays], dtype=np.int64),
+            # Through ordinals: numpy converts datetime objects one by one, much slower
+            starts=(np.fromiter((start.toordinal() for start in starts), dtype=np.int64, count=len(starts))
+                    - EPOCH_ORDINAL).astype('datetime64[D]'),
+            stored_dates=list(stored_dates),
+        )
+
+
+def compute_delivery_estimates(batch: EtaBatch, engine: EtaEngine, calendar: BusinessCalendar,
+                               keep_transit_days: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Base transit days and delivery dates for a whole batch.
+    
+    Base days are the shipping_routes days for the pair, raised by the route
+    distance when stored (the formula OpenRouteService routes use); rows with
+    neither keep their stored days, else the domestic/international fallback.
+    With keep_transit_days, stored days win wherever present (only dates move,
+    e.g. after adding a holiday). Dates are start + base + delay business days
+    at the destination.
+    
+    Returns:
+        Tuple of (base_days int64 array, delivery dates datetime64[D] array)
+    """
+    base_days = engine.estimate_days_many(batch.origins, batch.destinations, batch.distance_km,
+                                          detour=1.0).astype(np.int64)
+    fallback = np.where(batch.origins == batch.destinations, DOMESTIC_FALLBACK_DAYS, INTERNATIONAL_FALLBACK_DAYS)
+    has_stored = batch.stored_days != UNKNOWN
+    
+    use_stored = has_stored if keep_transit_days else has_stored & (base_days == UNKNOWN)
+    base_days = np.where(use_stored, batch.stored_days, base_days)
+    base_days = np.where(base_days == UNKNOWN, fallback, base_days)
+    
+    dates = calendar.offset_many(batch.starts, base_days + batch.delay_days, batch.destinations, batch.provinces)
+    return base_days, dates
+
+
+def format_delivery_dates(dates: np.ndarray) -> List[str]:
+    """'dd/mm/YYYY' strings (the estimated_delivery_date format) of a datetime64[D] array"""
+    # A batch spans few distinct dates: format each once
+    distinct, inverse = np.unique(dates, return_inverse=True)
+    labels = [f"{iso[8:10]}/{iso[5:7]}/{iso[:4]}" for iso in np.datetime_as_string(distinct, unit='D').tolist()]
+    return list(map(labels.__getitem__, inverse.tolist()))
+
+
+def changed_estimates(batch: EtaBatch, base_days: np.ndarray, formatted: List[str]) -> List[Tuple[str, int, str]]:
+    """(tracking_id, estimated_days, estimated_delivery_date) of the rows whose stored estimate differs"""
+    stored_days = batch.stored_days.tolist()
+    return [
+        (tracking_id, days, date)
+        for tracking_id, days, date, old_days, old_date in zip(
+            batch.tracking_ids, base_days.tolist(), formatted, stored_days, batch.stored_dates
+        )
+        if days != old_days or date != old_date
+    ]
@@ -0,0 +1,231 @@
+"""
+In-memory transit-days engine (delivery estimates without OpenRouteService)
+
+shipping_routes holds the configured transit days per (origin, destination)
+country. EtaEngine keeps it as a dense country x country matrix indexed by
+ISO code, plus a dict of the configured pairs for single lookups, so one
+lookup is a dict read and whole arrays of country pairs are looked up with
+one fancy-indexing step. The matrix is reloaded when the table changes
+(LISTEN on the channel notified by the shipping_routes trigger) and every
+ETA_MATRIX_REFRESH_SECONDS as a safety net for missed notifications.
+
+When the great-circle distance between both addresses is known (from
+cached coordinates), the distance formula OpenRouteService routes use is
+applied to it times ROAD_DETOUR_FACTOR, and the matrix value acts as a floor
+for the country pair.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import ShippingRoute
+from .openroute_service import estimate_transit_days
+
+logger = logging.getLogger(__name__)
+
+# Notified by the trigger on shipping_routes (migration 13)
+NOTIFY_CHANNEL = 'shipping_routes_changed'
+
+# Road distance / great-circle distance, on average
+ROAD_DETOUR_FACTOR = float(os.getenv('ROAD_DETOUR_FACTOR', '1.3'))
+
+# Matrix cell for a country pair without a configured route
+UNKNOWN = -1
+
+
+def transit_days_many(distance_km: np.ndarray, international: np.ndarray) -> np.ndarray:
+    """estimate_transit_days() on aligned arrays of road distances and international flags"""
+    days = np.clip((distance_km // 400).astype(np.int64) + 2, 3, 7)
+    return np.where(international, np.minimum(days + 3, 10), days)
+
+
+class EtaEngine:
+    """
+    shipping_routes as a transit-days matrix, kept in sync with the table.
+    
+    Country names and codes are mapped to matrix positions with country_code
+    (ShippingCalculator._normalize_country_code), so 'España', 'SPAIN' and
+    'ES' share a row. A reload builds a new matrix and swaps it in with a
+    single assignment, so lookups never see a half-built one.
+    """
+    
+    def __init__(self, country_code: Callable[[str], str], refresh_seconds: float = 600.0):
+        self.country_code = country_code
+        self.refresh_seconds = refresh_seconds
+        # (country code -> matrix position, days matrix, (origin, destination) code -> days)
+        self._matrix: Tuple[Dict[str, int], np.ndarray, Dict[Tuple[str, str], int]] = (
+            {}, np.empty((0, 0), dtype=np.int16), {}
+        )
+        self._db = None
+        self._poll_task: Optional[asyncio.Task] = None
+        # Reload started by a notification (referenced so it is not collected mid-flight)
+        self._notify_task: Optional[asyncio.Task] = None
+        self._refreshing = False
+        self._refresh_pending = False
+        self._listening = False
+        
+        # Statistics
+        self._loads = 0
+        self._loaded_at: Optional[float] = None
+        self._hits = 0
+        self._misses = 0
+    
+    def load(self, routes: Iterable[ShippingRoute]) -> int:
+        """Replace the matrix with these routes. Returns the number of routes loaded."""
+        index: Dict[str, int] = {}
+        pairs: Dict[Tuple[str, str], int] = {}
+        cells = []
+        for route in routes:
+            codes = (self.country_code(route.origin_country), self.country_code(route.destination_country))
+            origin = index.setdefault(codes[0], len(index))
+            destination = index.setdefault(codes[1], len(index))
+            cells.append((origin, destination, route.estimated_days))
+            pairs[codes] = route.estimated_days
+        
+        days = np.full((len(index), len(index)), UNKNOWN, dtype=np.int16)
+        if cells:
+            origins, destinations, values = zip(*cells)
+            days[list(origins), list(destinations)] = values
+        
+        self._matrix = (index, days, pairs)
+        self._loads += 1
+        self._loaded_at = time.monotonic()
+        return len(cells)
+    
+    async def refresh(self) -> bool:
+        """Reload the matrix from the database (the current one is kept on error)"""
+        routes = await self._db.get_shipping_routes() if self._db else None
+        if routes is None:
+            return False
+        count = self.load(routes)
+        logger.info(f"Transit matrix loaded: {count} routes between {len(self._matrix[0])} countries")
+        return True
+    
+    async def _safe_refresh(self):
+        # refresh() for background callers: errors are logged, and requests that
+        # arrive while a reload is running are folded into a single reload after it
+        self._refresh_pending = True
+        if self._refreshing:
+            return
+        self._refreshing = True
+        try:
+            while self._refresh_pending:
+                self._refresh_pending = False
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing transit matrix: {e}")
+        finally:
+            self._refreshing = False
+    
+    async def start(self, db):
+        """Load the matrix and keep it in sync with shipping_routes (call from post_init)"""
+        self._db = db
+        await self.refresh()
+        self._listening = await db.listen(NOTIFY_CHANNEL, self._on_notify)
+        if self.refresh_seconds > 0:
+            self._poll_task = asyncio.create_task(self._poll())
+    
+    async def stop(self):
+        """Stop refreshing (call before closing the database)"""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._notify_task is not None:
+            self._notify_task.cancel()
+            self._notify_task = None
+        self._listening = False
+        logger.info(f"Transit matrix stats: {self.stats()}")
+    
+    def _on_notify(self, payload: str):
+        # Called by the listener connection on the event loop
+        self._refresh_pending = True
+        if self._notify_task is not None and not self._notify_task.done():
+            # Burst of NOTIFYs (one multi-statement edit): the scheduled reload covers it
+            return
+        logger.info(f"shipping_routes changed ({payload}), reloading transit matrix")
+        self._notify_task = asyncio.get_running_loop().create_task(self._safe_refresh())
+    
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._safe_refresh()
+    
+    def route_days(self, origin: str, destination: str) -> Optional[int]:
+        """Configured transit days between two countries (names or codes), None if not configured"""
+        days = self._matrix[2].get((self.country_code(origin), self.country_code(destination)))
+        if days is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return days
+    
+    def _positions(self, countries: Sequence[str], ids: Dict[str, int]) -> np.ndarray:
+        # Matrix positions of countries; codes outside the matrix get new ids
+        # (added to ids) past its size. Each distinct country is normalized once.
+        lookup = {country: ids.setdefault(self.country_code(country), len(ids)) for country in set(countries)}
+        return np.fromiter(map(lookup.__getitem__, countries), dtype=np.int64, count=len(countries))
+    
+    def _pairs_many(self, origins: Sequence[str], destinations: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (origin ids, destination ids, configured days or UNKNOWN) from one matrix snapshot
+        index, days, _ = self._matrix
+        ids = dict(index)
+        rows, cols = self._positions(origins, ids), self._positions(destinations, ids)
+        known = (rows < len(index)) & (cols < len(index))
+        result = np.full(len(rows), UNKNOWN, dtype=np.int16)
+        result[known] = days[rows[known], cols[known]]
+        return rows, cols, result
+    
+    def route_days_many(self, origins: Sequence[str], destinations: Sequence[str]) -> np.ndarray:
+        """
+        Vectorized route_days() for aligned arrays of countries: an int16 array
+        with UNKNOWN (-1) where a pair is not configured.
+        """
+        return self._pairs_many(origins, destinations)[2]
+    
+    def estimate_days_many(self, origins: Sequence[str], destinations: Sequence[str], distance_km,
+                           detour: float = ROAD_DETOUR_FACTOR) -> np.ndarray:
+        """
+        Vectorized estimate_days() for aligned arrays: distance_km holds NaN where
+        the distance is unknown, and is multiplied by detour (1.0 for distances
+        that are already road distances). UNKNOWN where neither is available.
+        """
+        rows, cols, result = self._pairs_many(origins, destinations)
+        distance_km = np.asarray(distance_km, dtype=np.float64)
+        measured = ~np.isnan(distance_km)
+        by_distance = transit_days_many(distance_km[measured] * detour, rows[measured] != cols[measured])
+        result[measured] = np.maximum(result[measured], by_distance)
+        return result
+    
+    def estimate_days(self, origin: str, destination: str, distance_km: Optional[float] = None) -> Optional[int]:
+        """
+        Transit days between two countries, given the great-circle distance
+        between the addresses when known: the configured days for the pair,
+        or more if the distance calls for it. None when neither is available.
+        """
+        days = self.route_days(origin, destination)
+        if distance_km is None:
+            return days
+        international = self.country_code(origin) != self.country_code(destination)
+        by_distance = estimate_transit_days(distance_km * ROAD_DETOUR_FACTOR, international)
+        return by_distance if days is None else max(days, by_distance)
+    
+    def stats(self) -> dict:
+        """Get matrix statistics (countries, routes, lookups, reloads...)"""
+        index, days, _ = self._matrix
+        lookups = self._hits + self._misses
+        return {
+            'countries': len(index),
+            'routes': int(np.count_nonzero(days != UNKNOWN)),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+            'loads': self._loads,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            'listening': self._listening,
+        }
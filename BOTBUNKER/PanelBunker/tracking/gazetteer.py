@@ -0,0 +1,262 @@
+"""
+Offline nearest-locality lookup (reverse geocoding without the network)
+
+A gazetteer file is a compact binary compilation of a GeoNames-style city
+dump, built once with `python maintenance.py build-gazetteer` and read
+through mmap, so opening it costs almost nothing and lookups never leave the
+process. Places are bucketed in a fixed-degree grid; a lookup scans the
+cells around the point and returns the nearest place within a radius, in
+the same shape as OpenRouteService.reverse_geocode().
+
+File layout (little-endian):
+    header   magic "GZTR", version, record count, cell count, cell size,
+             names blob size, labels blob size
+    records  (lat f32, lon f32, population u32, name offset u32,
+              region label u16, country label u16), sorted by grid cell
+    cells    (cell lat i32, cell lon i32, first record u32, record count u32)
+    names    NUL-terminated UTF-8 place names
+    labels   NUL-separated UTF-8 region and country names
+"""
+
+import os
+import csv
+import math
+import mmap
+import struct
+import logging
+from typing import Optional, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GZTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIdII")
+RECORD = struct.Struct("<ffIIHH")
+CELL = struct.Struct("<iiII")
+
+# Where the bot looks for the gazetteer and build-gazetteer writes it
+GAZETTEER_PATH = os.getenv(
+    'GAZETTEER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'gazetteer.bin')
+)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Gazetteer:
+    """
+    Memory-mapped gazetteer with a grid index.
+    
+    reverse_geocode(lat, lon) returns {country, region, locality, county, label}
+    for the nearest place within `max_distance_km`, or None (a miss, for the
+    caller to resolve online).
+    """
+    
+    def __init__(self, path: str, max_distance_km: float = 25.0):
+        self.path = path
+        self.max_distance_km = max_distance_km
+        
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, _, self.record_count, cell_count, self.cell_degrees, names_size, labels_size = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} gazetteer file")
+        
+        self._records_at = HEADER.size
+        cells_at = self._records_at + self.record_count * RECORD.size
+        self._names_at = cells_at + cell_count * CELL.size
+        labels_at = self._names_at + names_size
+        
+        # The cell index and labels are small; records and names stay on disk
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for i in range(cell_count):
+            cell_lat, cell_lon, first, count = CELL.unpack_from(self._mm, cells_at + i * CELL.size)
+            self._cells[(cell_lat, cell_lon)] = (first, count)
+        self._labels = self._mm[labels_at:labels_at + labels_size].decode("utf-8").split("\0")
+        
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+    
+    def close(self):
+        self._mm.close()
+    
+    def _name(self, offset: int) -> str:
+        start = self._names_at + offset
+        return self._mm[start:self._mm.find(b"\0", start)].decode("utf-8")
+    
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[float, int]]:
+        """(distance km, record index) of the nearest place within max_distance_km"""
+        lat_cells = math.ceil(self.max_distance_km / (KM_PER_DEGREE * self.cell_degrees))
+        lon_km_per_cell = KM_PER_DEGREE * self.cell_degrees * max(math.cos(math.radians(lat)), 0.01)
+        lon_cells = min(math.ceil(self.max_distance_km / lon_km_per_cell), math.ceil(180 / self.cell_degrees))
+        
+        center_lat = math.floor(lat / self.cell_degrees)
+        center_lon = math.floor(lon / self.cell_degrees)
+        wrap = round(360 / self.cell_degrees)
+        
+        best = None
+        for cell_lat in range(center_lat - lat_cells, center_lat + lat_cells + 1):
+            for cell_lon in range(center_lon - lon_cells, center_lon + lon_cells + 1):
+                # Longitude wraps around the antimeridian
+                cell = self._cells.get((cell_lat, (cell_lon + wrap // 2) % wrap - wrap // 2))
+                if cell is None:
+                    continue
+                first, count = cell
+                for index in range(first, first + count):
+                    place_lat, place_lon = RECORD.unpack_from(self._mm, self._records_at + index * RECORD.size)[:2]
+                    distance = haversine_km(lat, lon, place_lat, place_lon)
+                    if distance <= self.max_distance_km and (best is None or distance < best[0]):
+                        best = (distance, index)
+        return best
+    
+    def nearest_place(self, lat: float, lon: float) -> Optional[Tuple[float, float]]:
+        """(lat, lon) of the nearest place within max_distance_km, without counting a lookup"""
+        found = self.nearest(lat, lon)
+        if found is None:
+            return None
+        return RECORD.unpack_from(self._mm, self._records_at + found[1] * RECORD.size)[:2]
+    
+    def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict]:
+        """Nearest locality in OpenRouteService.reverse_geocode() shape, or None"""
+        found = self.nearest(lat, lon)
+        if found is None:
+            self._misses += 1
+            return None
+        
+        self._hits += 1
+        _, _, _, name_offset, region, country = RECORD.unpack_from(
+            self._mm, self._records_at + found[1] * RECORD.size
+        )
+        locality, region_name, country_name = self._name(name_offset), self._labels[region], self._labels[country]
+        return {
+            "country": country_name,
+            "region": region_name,
+            "locality": locality,
+            "county": "",
+            "label": ", ".join(part for part in (locality, region_name, country_name) if part)
+        }
+    
+    def stats(self) -> dict:
+        """Get lookup statistics (places, hits, misses...)"""
+        lookups = self._hits + self._misses
+        return {
+            'places': self.record_count,
+            'cells': len(self._cells),
+            'max_distance_km': self.max_distance_km,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _read_tsv(path: str):
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith("#"):
+                yield row
+
+
+def build_gazetteer(cities_path: str, output_path: str, admin1_path: Optional[str] = None,
+                    countries_path: Optional[str] = None, min_population: int = 1000,
+                    cell_degrees: float = 0.5) -> int:
+    """
+    Compile a GeoNames dump into a gazetteer file.
+    
+    Args:
+        cities_path: GeoNames cities file (e.g. cities1000.txt or allCountries.txt)
+        output_path: Gazetteer file to write
+        admin1_path: admin1CodesASCII.txt, for region names (optional)
+        countries_path: countryInfo.txt, for country names (optional, else ISO codes)
+        min_population: Skip places smaller than this
+        cell_degrees: Grid cell size of the index
+    
+    Returns:
+        Number of places written
+    """
+    regions = {row[0]: row[1] for row in _read_tsv(admin1_path)} if admin1_path else {}
+    countries = {row[0]: row[4] for row in _read_tsv(countries_path)} if countries_path else {}
+    
+    labels: List[str] = []
+    label_index: Dict[str, int] = {}
+    
+    def label(text: str) -> int:
+        if text not in label_index:
+            label_index[text] = len(labels)
+            labels.append(text)
+        return label_index[text]
+    
+    places = []
+    for row in _read_tsv(cities_path):
+        # Populated places only (feature class P)
+        if len(row) < 15 or row[6] != "P":
+            continue
+        population = int(row[14] or 0)
+        if population < min_population:
+            continue
+        lat, lon = float(row[4]), float(row[5])
+        country_code = row[8]
+        places.append((
+            (math.floor(lat / cell_degrees), math.floor(lon / cell_degrees)),
+            lat, lon, min(population, 0xFFFFFFFF), row[1],
+            label(regions.get(f"{country_code}.{row[10]}", "")),
+            label(countries.get(country_code, country_code))
+        ))
+    if len(labels) > 0xFFFF:
+        raise ValueError(f"Too many distinct regions and countries ({len(labels)})")
+    places.sort(key=lambda place: place[0])
+    
+    records = bytearray()
+    names = bytearray()
+    cells = []
+    for i, (cell, lat, lon, population, name, region, country) in enumerate(places):
+        if not cells or cells[-1][0] != cell:
+            cells.append([cell, i, 0])
+        cells[-1][2] += 1
+        records += RECORD.pack(lat, lon, population, len(names), region, country)
+        names += name.encode("utf-8") + b"\0"
+    labels_blob = "\0".join(labels).encode("utf-8")
+    
+    tmp_path = output_path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(places), len(cells), cell_degrees, len(names), len(labels_blob)))
+        f.write(records)
+        for (cell_lat, cell_lon), first, count in cells:
+            f.write(CELL.pack(cell_lat, cell_lon, first, count))
+        f.write(names)
+        f.write(labels_blob)
+    os.replace(tmp_path, output_path)
+    
+    logger.info(f"Gazetteer {output_path}: {len(places)} places in {len(cells)} cells of {cell_degrees:g}°")
+    return len(places)
+
+
+def load_gazetteer() -> Optional[Gazetteer]:
+    """Open GAZETTEER_PATH if it exists (the offline engine is optional)"""
+    path = os.path.normpath(GAZETTEER_PATH)
+    if not os.path.exists(path):
+        logger.info(f"No gazetteer at {path}, checkpoints are reverse geocoded online")
+        return None
+    try:
+        gazetteer = Gazetteer(path, max_distance_km=float(os.getenv('GAZETTEER_MAX_DISTANCE_KM', '25')))
+        logger.info(f"Gazetteer loaded: {gazetteer.record_count} places from {path}")
+        return gazetteer
+    except Exception as e:
+        logger.error(f"Could not load gazetteer {path}: {e}")
+        return None
+
+
+gazetteer = load_gazetteer()
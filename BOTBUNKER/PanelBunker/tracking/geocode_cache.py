@@ -0,0 +1,315 @@
+"""
+Persistent geocoding caches for OpenRouteService
+
+Sender warehouses and recipient cities repeat across trackings, so forward
+geocoding results are stored in the geocode_cache table keyed by the
+normalized address and country code. Addresses with no results are cached
+too (negative entries, with a shorter TTL) so they are not retried on every
+tracking.
+
+Routes between the same regions sample points in the same towns, so reverse
+geocoding results are cached per grid cell: an in-process LRU in front of
+the reverse_geocode_cache table, itself trimmed to its most recently used
+cells.
+
+Lookups never fail the caller: a database error counts as a miss. From an
+event loop the connection pool does not belong to (see
+AsyncDatabaseManager.serves_running_loop) the database is skipped, logged
+once and counted as 'skipped'.
+"""
+
+import os
+import re
+import math
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Iterable
+
+from .async_database import async_db_manager
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATOR = re.compile(r"\s*([,;])\s*")
+
+
+def normalize_address(address: str, country: Optional[str] = None) -> str:
+    """
+    Cache key for an address: accents stripped, case-folded, whitespace and
+    separator spacing collapsed, followed by the upper-cased country code.
+
+    normalize_address("Calle  Mayor 1 , Móstoles", "es") == "calle mayor 1, mostoles|ES"
+    """
+    decomposed = unicodedata.normalize('NFKD', address or "")
+    text = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    text = _SEPARATOR.sub(r"\1 ", _WHITESPACE.sub(" ", text)).strip(" ,;")
+    return f"{text}|{(country or '').strip().upper()}"
+
+
+def db_usable(db, cache_name: str, warned: bool) -> bool:
+    """
+    Whether a cache may query db from the running loop. Logs the first refusal
+    (pass the cache's warned flag, set it when this returns False).
+    """
+    if db.serves_running_loop():
+        return True
+    if not warned:
+        logger.warning(f"{cache_name} skips the database: the connection pool belongs to another event loop")
+    return False
+
+
+class GeocodeCache:
+    """
+    Read-through cache of geocode_address() results backed by async_db_manager.
+    
+    - get() returns (cached, result); result None with cached True is a
+      negative entry ("no results")
+    - Positive entries live GEOCODE_CACHE_TTL_DAYS, negative ones
+      GEOCODE_CACHE_NEGATIVE_TTL_HOURS
+    """
+    
+    def __init__(self, db, ttl_seconds: float, negative_ttl_seconds: float):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        
+        # Statistics
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._errors = 0
+        self._skipped = 0
+        self._loop_warned = False
+    
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+    
+    def _db_usable(self) -> bool:
+        if db_usable(self.db, "Geocode cache", self._loop_warned):
+            return True
+        self._loop_warned = True
+        self._skipped += 1
+        return False
+    
+    async def get(self, address: str, country: Optional[str] = None) -> Tuple[bool, Optional[Dict]]:
+        """Look up an address before calling the API"""
+        if not self.enabled:
+            return False, None
+        if not self._db_usable():
+            self._misses += 1
+            return False, None
+        
+        try:
+            cached, result = await self.db.get_cached_geocode(normalize_address(address, country))
+        except Exception as e:
+            logger.warning(f"Geocode cache lookup failed for '{address}': {e}")
+            self._errors += 1
+            cached, result = False, None
+        
+        if not cached:
+            self._misses += 1
+        elif result is None:
+            self._negative_hits += 1
+        else:
+            self._hits += 1
+        return cached, result
+    
+    async def put(self, address: str, country: Optional[str], result: Optional[Dict]):
+        """Store an API answer (None for "no results")"""
+        if not self.enabled:
+            return
+        
+        ttl = self.ttl_seconds if result is not None else self.negative_ttl_seconds
+        if ttl <= 0 or not self._db_usable():
+            return
+        try:
+            if await self.db.save_cached_geocode(normalize_address(address, country), result, ttl):
+                self._writes += 1
+            else:
+                self._errors += 1
+        except Exception as e:
+            logger.warning(f"Geocode cache write failed for '{address}': {e}")
+            self._errors += 1
+    
+    def stats(self) -> dict:
+        """Get cache statistics (hits, negative hits, misses, hit rate...)"""
+        lookups = self._hits + self._negative_hits + self._misses
+        return {
+            'hits': self._hits,
+            'negative_hits': self._negative_hits,
+            'misses': self._misses,
+            'hit_rate': round((self._hits + self._negative_hits) / lookups, 4) if lookups else 0.0,
+            'writes': self._writes,
+            'errors': self._errors,
+            'skipped': self._skipped,
+        }
+
+
+def cell_key(lat: float, lon: float, cell_degrees: float) -> str:
+    """
+    Grid cell containing a point, e.g. "0.05:808:43" for 0.05° cells.
+    The cell size is part of the key so changing the precision never mixes cells.
+    """
+    return f"{cell_degrees:g}:{math.floor(lat / cell_degrees)}:{math.floor(lon / cell_degrees)}"
+
+
+class ReverseGeocodeCache:
+    """
+    reverse_geocode() results per grid cell of `cell_degrees` (0.05° is ~5 km).
+    
+    - In-process LRU of `memory_size` cells in front of the reverse_geocode_cache
+      table; prefetch() loads a whole route's cells in one query
+    - Every database hit refreshes the cell's last_used_at; the table is trimmed
+      to the `max_rows` most recently used cells every EVICT_EVERY writes
+    - "No result" answers (e.g. points at sea) are cached like any other
+    """
+    
+    EVICT_EVERY = 200
+    
+    def __init__(self, db, cell_degrees: float, memory_size: int, max_rows: int):
+        if cell_degrees <= 0:
+            raise ValueError(f"Invalid reverse geocode cell size: {cell_degrees}")
+        
+        self.db = db
+        self.cell_degrees = cell_degrees
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        
+        self._cells: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._writes_since_evict = 0
+        
+        # Statistics
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._memory_evictions = 0
+        self._db_evictions = 0
+        self._errors = 0
+        self._skipped = 0
+        self._loop_warned = False
+    
+    @property
+    def enabled(self) -> bool:
+        return self.memory_size > 0
+    
+    def _db_usable(self) -> bool:
+        if db_usable(self.db, "Reverse geocode cache", self._loop_warned):
+            return True
+        self._loop_warned = True
+        self._skipped += 1
+        return False
+    
+    def key(self, lat: float, lon: float) -> str:
+        return cell_key(lat, lon, self.cell_degrees)
+    
+    def _remember(self, key: str, result: Optional[Dict]):
+        self._cells[key] = result
+        self._cells.move_to_end(key)
+        while len(self._cells) > self.memory_size:
+            self._cells.popitem(last=False)
+            self._memory_evictions += 1
+    
+    def contains(self, lat: float, lon: float) -> bool:
+        """Whether the point's cell is already in memory (no I/O, no statistics)"""
+        return self.enabled and self.key(lat, lon) in self._cells
+    
+    async def _load(self, keys: list) -> Dict[str, Optional[Dict]]:
+        if not self._db_usable():
+            return {}
+        try:
+            found = await self.db.get_cached_reverse_geocodes(keys)
+        except Exception as e:
+            logger.warning(f"Reverse geocode cache lookup failed: {e}")
+            self._errors += 1
+            return {}
+        for key, result in found.items():
+            self._remember(key, result)
+        return found
+    
+    async def prefetch(self, points: Iterable[Tuple[float, float]]):
+        """Load the cells of (lat, lon) points missing from memory with a single query"""
+        if not self.enabled:
+            return
+        keys = list(dict.fromkeys(self.key(lat, lon) for lat, lon in points))
+        missing = [key for key in keys if key not in self._cells]
+        if missing:
+            await self._load(missing)
+    
+    async def get(self, lat: float, lon: float) -> Tuple[bool, Optional[Dict]]:
+        """Look up a point before calling the API: (cached, result)"""
+        if not self.enabled:
+            return False, None
+        
+        key = self.key(lat, lon)
+        if key in self._cells:
+            self._cells.move_to_end(key)
+            self._memory_hits += 1
+            return True, self._cells[key]
+        
+        found = await self._load([key])
+        if key in found:
+            self._db_hits += 1
+            return True, found[key]
+        
+        self._misses += 1
+        return False, None
+    
+    async def put(self, lat: float, lon: float, result: Optional[Dict]):
+        """Store an API answer for the point's cell (None for "no result")"""
+        if not self.enabled:
+            return
+        
+        key = self.key(lat, lon)
+        self._remember(key, result)
+        if not self._db_usable():
+            return
+        try:
+            if await self.db.save_cached_reverse_geocode(key, result):
+                self._writes += 1
+                self._writes_since_evict += 1
+            else:
+                self._errors += 1
+            
+            if self.max_rows > 0 and self._writes_since_evict >= self.EVICT_EVERY:
+                self._writes_since_evict = 0
+                self._db_evictions += await self.db.evict_reverse_geocode_cache(self.max_rows)
+        except Exception as e:
+            logger.warning(f"Reverse geocode cache write failed for cell {key}: {e}")
+            self._errors += 1
+    
+    def stats(self) -> dict:
+        """Get cache statistics (memory/database hits, misses, evictions...)"""
+        lookups = self._memory_hits + self._db_hits + self._misses
+        return {
+            'cells_in_memory': len(self._cells),
+            'cell_degrees': self.cell_degrees,
+            'memory_hits': self._memory_hits,
+            'db_hits': self._db_hits,
+            'misses': self._misses,
+            'hit_rate': round((self._memory_hits + self._db_hits) / lookups, 4) if lookups else 0.0,
+            'writes': self._writes,
+            'memory_evictions': self._memory_evictions,
+            'db_evictions': self._db_evictions,
+            'errors': self._errors,
+            'skipped': self._skipped,
+        }
+
+
+# Shared by every OpenRouteService instance (GEOCODE_CACHE_TTL_DAYS=0 disables it)
+geocode_cache = GeocodeCache(
+    async_db_manager,
+    ttl_seconds=float(os.getenv('GEOCODE_CACHE_TTL_DAYS', '90')) * 86400,
+    negative_ttl_seconds=float(os.getenv('GEOCODE_CACHE_NEGATIVE_TTL_HOURS', '24')) * 3600
+)
+
+# Shared by every OpenRouteService instance (REVERSE_GEOCODE_CACHE_SIZE=0 disables it)
+reverse_geocode_cache = ReverseGeocodeCache(
+    async_db_manager,
+    cell_degrees=float(os.getenv('REVERSE_GEOCODE_CELL_DEGREES', '0.05')),
+    memory_size=int(os.getenv('REVERSE_GEOCODE_CACHE_SIZE', '5000')),
+    max_rows=int(os.getenv('REVERSE_GEOCODE_CACHE_MAX_ROWS', '100000'))
+)
@@ -0,0 +1,285 @@
+"""
+Versioned schema migrations for the tracking system
+
+Migrations are applied in order at startup by DatabaseManager.initialize_database().
+Each one runs in its own transaction and is recorded in schema_migrations, so
+it is applied exactly once. A PostgreSQL advisory lock serializes concurrent
+bot instances starting at the same time.
+
+To change the schema, append a new (version, description, sql) entry to
+MIGRATIONS. Never edit a migration that has already been released.
+"""
+
+import logging
+from typing import List, Tuple
+
+from .models import CREATE_TABLES_SQL
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+MIGRATION_LOCK_ID = 731_204_001
+
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "Base schema", CREATE_TABLES_SQL + """
+    -- Ownership column used by every access-scoped query
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS created_by_admin_id BIGINT;
+    """),
+    (2, "Index trackings for status list views", """
+    CREATE INDEX IF NOT EXISTS idx_trackings_status_created_at
+        ON trackings (status, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_trackings_created_at
+        ON trackings (created_at DESC);
+    """),
+    (3, "Index trackings for admin and user scoped queries", """
+    CREATE INDEX IF NOT EXISTS idx_trackings_admin_status_created_at
+        ON trackings (created_by_admin_id, status, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_trackings_user_status_created_at
+        ON trackings (user_telegram_id, status, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_trackings_user_created_at
+        ON trackings (user_telegram_id, created_at DESC);
+    """),
+    (4, "Index status history by tracking and time", """
+    CREATE INDEX IF NOT EXISTS idx_status_history_tracking_changed_at
+        ON status_history (tracking_id, changed_at, id);
+    """),
+    (5, "Add tracking_id tie-breaker to list indexes for keyset pagination", """
+    DROP INDEX IF EXISTS idx_trackings_status_created_at;
+    CREATE INDEX IF NOT EXISTS idx_trackings_status_created_at_id
+        ON trackings (status, created_at DESC, tracking_id DESC);
+    DROP INDEX IF EXISTS idx_trackings_created_at;
+    CREATE INDEX IF NOT EXISTS idx_trackings_created_at_id
+        ON trackings (created_at DESC, tracking_id DESC);
+    DROP INDEX IF EXISTS idx_trackings_user_created_at;
+    CREATE INDEX IF NOT EXISTS idx_trackings_user_created_at_id
+        ON trackings (user_telegram_id, created_at DESC, tracking_id DESC);
+    DROP INDEX IF EXISTS idx_trackings_admin_status_created_at;
+    CREATE INDEX IF NOT EXISTS idx_trackings_admin_status_created_at_id
+        ON trackings (created_by_admin_id, status, created_at DESC, tracking_id DESC);
+    DROP INDEX IF EXISTS idx_trackings_user_status_created_at;
+    CREATE INDEX IF NOT EXISTS idx_trackings_user_status_created_at_id
+        ON trackings (user_telegram_id, status, created_at DESC, tracking_id DESC);
+    """),
+    (6, "Index tracking IDs for partial search", """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    -- Substring search (3+ characters)
+    CREATE INDEX IF NOT EXISTS idx_trackings_tracking_id_trgm
+        ON trackings USING gin (upper(tracking_id) gin_trgm_ops);
+    -- Prefix search (any length)
+    CREATE INDEX IF NOT EXISTS idx_trackings_tracking_id_prefix
+        ON trackings (upper(tracking_id) text_pattern_ops);
+    """),
+    (7, "Trigger-maintained statistics counters", """
+    -- One row per (scope, subject, day, status):
+    --   scope 'all'    -> every tracking (subject_id 0), read by the owner
+    --   scope 'access' -> trackings an admin created or received (subject_id = admin)
+    --   scope 'user'   -> trackings per recipient user and username (owner's user stats)
+    -- day is the creation date, or 'infinity' for the all-time total.
+    CREATE TABLE IF NOT EXISTS tracking_counters (
+        scope VARCHAR(10) NOT NULL,
+        subject_id BIGINT NOT NULL,
+        username VARCHAR(255) NOT NULL DEFAULT '',
+        day DATE NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, subject_id, username, day, status)
+    );
+
+    -- Every counter row a tracking contributes to
+    CREATE OR REPLACE FUNCTION tracking_counter_keys(t trackings)
+    RETURNS TABLE (scope VARCHAR, subject_id BIGINT, username VARCHAR, day DATE, status VARCHAR) AS $$
+        SELECT k.scope, k.subject_id, k.username, d.day, COALESCE(t.status, '')::varchar
+        FROM (
+            SELECT 'all'::varchar, 0::bigint, ''::varchar
+            UNION
+            SELECT 'access', t.created_by_admin_id, '' WHERE t.created_by_admin_id IS NOT NULL
+            UNION
+            SELECT 'access', t.user_telegram_id, '' WHERE t.user_telegram_id IS NOT NULL
+            UNION
+            SELECT 'user', COALESCE(t.user_telegram_id, 0), COALESCE(t.username, '')
+            WHERE t.username IS NOT NULL OR t.user_telegram_id IS NOT NULL
+        ) AS k (scope, subject_id, username)
+        CROSS JOIN (VALUES (t.created_at::date), ('infinity'::date)) AS d (day)
+        WHERE d.day IS NOT NULL
+    $$ LANGUAGE sql STABLE;
+
+    CREATE OR REPLACE FUNCTION tracking_counters_apply(t trackings, delta INTEGER) RETURNS void AS $$
+    BEGIN
+        INSERT INTO tracking_counters (scope, subject_id, username, day, status, count)
+        SELECT k.scope, k.subject_id, k.username, k.day, k.status, delta
+        FROM tracking_counter_keys(t) AS k
+        ON CONFLICT (scope, subject_id, username, day, status)
+        DO UPDATE SET count = tracking_counters.count + EXCLUDED.count;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION tracking_counters_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM tracking_counters_apply(OLD, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM tracking_counters_apply(NEW, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trackings_counters_insert_delete ON trackings;
+    CREATE TRIGGER trackings_counters_insert_delete
+        AFTER INSERT OR DELETE ON trackings
+        FOR EACH ROW EXECUTE FUNCTION tracking_counters_trigger();
+
+    DROP TRIGGER IF EXISTS trackings_counters_update ON trackings;
+    CREATE TRIGGER trackings_counters_update
+        AFTER UPDATE OF status, created_at, created_by_admin_id, user_telegram_id, username ON trackings
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status
+              OR OLD.created_at IS DISTINCT FROM NEW.created_at
+              OR OLD.created_by_admin_id IS DISTINCT FROM NEW.created_by_admin_id
+              OR OLD.user_telegram_id IS DISTINCT FROM NEW.user_telegram_id
+              OR OLD.username IS DISTINCT FROM NEW.username)
+        EXECUTE FUNCTION tracking_counters_trigger();
+
+    -- Backfill from existing trackings
+    INSERT INTO tracking_counters (scope, subject_id, username, day, status, count)
+    SELECT k.scope, k.subject_id, k.username, k.day, k.status, COUNT(*)
+    FROM trackings AS t CROSS JOIN LATERAL tracking_counter_keys(t) AS k
+    GROUP BY k.scope, k.subject_id, k.username, k.day, k.status
+    ON CONFLICT (scope, subject_id, username, day, status) DO NOTHING;
+    """),
+    (8, "Add the remaining Tracking model columns", """
+    -- Tracking rows are read with an explicit column list, so every model field must exist
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS route_steps JSONB;
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS current_step_index INTEGER DEFAULT 0;
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS route_distance INTEGER;
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS route_duration INTEGER;
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS owner_id BIGINT;
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS created_by VARCHAR(255);
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS route_states TEXT;
+    """),
+    (9, "Persistent geocoding cache", """
+    -- Keyed by tracking.geocode_cache.normalize_address(); result NULL caches "no results"
+    CREATE TABLE IF NOT EXISTS geocode_cache (
+        cache_key TEXT PRIMARY KEY,
+        result JSONB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    );
+    """),
+    (10, "Persistent reverse geocoding cache per grid cell", """
+    -- Keyed by tracking.geocode_cache.cell_key(); result NULL caches "no result"
+    CREATE TABLE IF NOT EXISTS reverse_geocode_cache (
+        cell_key TEXT PRIMARY KEY,
+        result JSONB,
+        last_used_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    -- LRU trimming keeps the most recently used cells
+    CREATE INDEX IF NOT EXISTS idx_reverse_geocode_cache_last_used_at
+        ON reverse_geocode_cache (last_used_at DESC);
+    """),
+    (11, "Persistent route cache", """
+    -- Keyed by tracking.route_cache.route_key(): profile and rounded endpoints
+    CREATE TABLE IF NOT EXISTS route_cache (
+        cache_key TEXT PRIMARY KEY,
+        result JSONB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    );
+    """),
+    (12, "Stored base transit days for delivery estimates", """
+    ALTER TABLE trackings ADD COLUMN IF NOT EXISTS estimated_days INTEGER;
+    -- Shipped trackings already store them with their route. route_states is TEXT:
+    -- a row that is not valid JSON or holds a non-integer value keeps NULL
+    -- (estimated from the route again) instead of aborting the migration
+    DO $$
+    DECLARE
+        stored RECORD;
+    BEGIN
+        FOR stored IN
+            SELECT tracking_id, route_states FROM trackings
+            WHERE estimated_days IS NULL AND route_states LIKE '{%"estimated_days"%}'
+        LOOP
+            BEGIN
+                UPDATE trackings SET estimated_days = (stored.route_states::jsonb ->> 'estimated_days')::integer
+                WHERE tracking_id = stored.tracking_id;
+            EXCEPTION WHEN invalid_text_representation OR numeric_value_out_of_range THEN
+                NULL;
+            END;
+        END LOOP;
+    END;
+    $$;
+    """),
+    (13, "Notify shipping_routes changes", """
+    -- Listened to by tracking.eta_engine to reload its in-memory transit matrix
+    CREATE OR REPLACE FUNCTION shipping_routes_notify() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('shipping_routes_changed', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS shipping_routes_changed ON shipping_routes;
+    CREATE TRIGGER shipping_routes_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON shipping_routes
+        FOR EACH STATEMENT EXECUTE FUNCTION shipping_routes_notify();
+    """),
+]
+
+CREATE_MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+def get_schema_version(conn) -> int:
+    """Return the highest applied migration version (0 if none)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations')")
+        if cur.fetchone()[0] is None:
+            return 0
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cur.fetchone()[0]
+
+def run_migrations(conn) -> int:
+    """
+    Apply every pending migration on a psycopg2 connection.
+    
+    Returns:
+        The schema version after applying migrations
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+        try:
+            cur.execute(CREATE_MIGRATIONS_TABLE_SQL)
+            conn.commit()
+            
+            current_version = get_schema_version(conn)
+            
+            for version, description, sql in MIGRATIONS:
+                if version <= current_version:
+                    continue
+                
+                logger.info(f"Applying migration {version}: {description}")
+                try:
+                    cur.execute(sql)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Migration {version} failed: {e}")
+                    raise
+                current_version = version
+            
+            logger.info(f"Database schema at version {current_version}")
+            return current_version
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
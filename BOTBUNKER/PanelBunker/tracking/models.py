@@ -2,13 +2,22 @@
 Database models and schema definitions for the tracking system
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Optional
+from typing import Callable, ClassVar, Optional, Sequence
 
-@dataclass
+# Route data columns: large and unused by most screens, so loaded on first access
+HEAVY_COLUMNS = ('route_geometry', 'route_steps', 'route_states')
+
+@dataclass(slots=True)
 class Tracking:
-    """Tracking data model"""
+    """
+    Tracking data model.
+    
+    Rows read from the database are built with from_row(), which leaves the
+    HEAVY_COLUMNS unset; they are fetched through route_data_loader the first
+    time one of them is accessed.
+    """
     tracking_id: str
     delivery_address: str
     date_time: str
@@ -35,6 +44,8 @@ class Tracking:
     updated_at: Optional[datetime] = None
     estimated_delivery_date: Optional[str] = None
     actual_delay_days: int = 0
+    # Base transit days (without delays) behind estimated_delivery_date
+    estimated_days: Optional[int] = None
     user_telegram_id: Optional[int] = None
     username: Optional[str] = None
     created_by_admin_id: Optional[int] = None
@@ -47,15 +58,79 @@ class Tracking:
     recipient_formatted_address: Optional[str] = None
     route_distance_km: Optional[float] = None
     route_duration_hours: Optional[float] = None
-    route_geometry: Optional[str] = None
+    route_geometry: Optional[str] = field(default=None, repr=False, compare=False)
     # Additional database fields
-    route_steps: Optional[list] = None
+    route_steps: Optional[list] = field(default=None, repr=False, compare=False)
     current_step_index: int = 0
     route_distance: Optional[int] = None
     route_duration: Optional[int] = None
     owner_id: Optional[int] = None
     created_by: Optional[str] = None
-    route_states: Optional[str] = None
+    route_states: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    # Callable(tracking_id) -> {column: value} for HEAVY_COLUMNS, set by the database layer
+    route_data_loader: ClassVar[Optional[Callable[[str], dict]]] = None
+    
+    @classmethod
+    def from_row(cls, row: Sequence) -> "Tracking":
+        """Build a tracking from a tuple/Record row selected with TRACKING_SELECT"""
+        tracking = cls.__new__(cls)
+        for setter, value in zip(_LIGHT_SETTERS, row):
+            setter(tracking, value)
+        return tracking
+    
+    def __getattr__(self, name):
+        # Only reached when a slot is unset, i.e. a heavy column skipped by from_row()
+        if name not in HEAVY_COLUMNS:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        loader = type(self).route_data_loader
+        values = loader(self.tracking_id) if loader else {}
+        for column in HEAVY_COLUMNS:
+            setattr(self, column, values.get(column))
+        return values.get(name)
+    
+    def route_data_loaded(self) -> bool:
+        """Whether the heavy route columns are already in memory (never triggers a load)"""
+        try:
+            for slot in _HEAVY_SLOTS:
+                slot.__get__(self, type(self))
+        except AttributeError:
+            return False
+        return True
+
+# Columns read for a Tracking row, in from_row() order (everything except HEAVY_COLUMNS)
+LIGHT_COLUMNS = tuple(f.name for f in fields(Tracking) if f.name not in HEAVY_COLUMNS)
+TRACKING_SELECT = ", ".join(LIGHT_COLUMNS)
+
+# Precomputed slot setters: row value i goes to slot LIGHT_COLUMNS[i]
+_LIGHT_SETTERS = tuple(getattr(Tracking, column).__set__ for column in LIGHT_COLUMNS)
+_HEAVY_SLOTS = tuple(getattr(Tracking, column) for column in HEAVY_COLUMNS)
+
+@dataclass
+class TrackingSummary:
+    """Lightweight tracking row with only the columns rendered by list screens"""
+    tracking_id: str
+    status: str
+    recipient_name: Optional[str]
+    country_postal: Optional[str]
+    sender_country: Optional[str]
+    sender_address: Optional[str]
+    delivery_address: Optional[str]
+    product_name: Optional[str]
+    product_price: Optional[str]
+    estimated_delivery_date: Optional[str]
+    actual_delay_days: int
+    username: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    route_distance_km: Optional[float]
+    estimated_days: Optional[int]
+    # Destination of the stored estimate (ShippingCalculator.destination_code / delivery_region)
+    recipient_country: Optional[str]
+    recipient_province: Optional[str]
+
+# Columns selected for TrackingSummary, in constructor order
+SUMMARY_COLUMNS = tuple(field.name for field in fields(TrackingSummary))
 
 @dataclass
 class ShippingRoute:
@@ -8,54 +8,39 @@ import json
 import asyncio
 import httpx
 import random
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Tuple, List
 from datetime import datetime, timedelta
 
+from .geocode_cache import geocode_cache, reverse_geocode_cache, normalize_address
+from .route_cache import route_cache
+from .gazetteer import gazetteer
+from .rate_limit import TokenBucket
+from .singleflight import SingleFlight
+from .route_sampling import distance_sample
+from .polyline import decode_polyline, encode_polyline, simplify_polyline
+
 logger = logging.getLogger(__name__)
 
-def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
-    """
-    Decode an encoded polyline string into a list of (lon, lat) tuples.
-    ORS uses precision=5 by default.
-    """
-    coordinates = []
-    index = 0
-    lat = 0
-    lon = 0
-    
-    while index < len(encoded):
-        # Decode latitude
-        shift = 0
-        result = 0
-        while True:
-            b = ord(encoded[index]) - 63
-            index += 1
-            result |= (b & 0x1f) << shift
-            shift += 5
-            if b < 0x20:
-                break
-        
-        dlat = ~(result >> 1) if result & 1 else result >> 1
-        lat += dlat
-        
-        # Decode longitude
-        shift = 0
-        result = 0
-        while True:
-            b = ord(encoded[index]) - 63
-            index += 1
-            result |= (b & 0x1f) << shift
-            shift += 5
-            if b < 0x20:
-                break
-        
-        dlon = ~(result >> 1) if result & 1 else result >> 1
-        lon += dlon
-        
-        # Convert to actual coordinates
-        coordinates.append((lon / (10 ** precision), lat / (10 ** precision)))
-    
-    return coordinates
+try:
+    import h2  # noqa: F401  (httpx[http2] extra; missing on installs that skip it)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One limiter for the whole process, shared by concurrent shipments (ORS plan quota)
+reverse_geocode_limiter = TokenBucket(
+    rate=float(os.getenv('ORS_REVERSE_GEOCODE_RPS', '2.5')),
+    burst=int(os.getenv('ORS_REVERSE_GEOCODE_BURST', '1'))
+)
+
+
+def estimate_transit_days(distance_km: float, international: bool) -> int:
+    """Business days in transit for a road route: 2 plus one per 400 km (3-7), +3 abroad (max 10)"""
+    estimated_days = max(3, min(7, int(distance_km / 400) + 2))
+    if international:
+        estimated_days = min(10, estimated_days + 3)
+    return estimated_days
 
 
 class OpenRouteService:
@@ -71,6 +56,95 @@ class OpenRouteService:
             "Authorization": self.api_key,
             "Content-Type": "application/json"
         }
+        
+        # Shared keep-alive client (opened in Application.post_init, closed in post_shutdown)
+        self.max_connections = int(os.getenv('ORS_MAX_CONNECTIONS', '10'))
+        self.keepalive_expiry = float(os.getenv('ORS_KEEPALIVE_EXPIRY', '30'))
+        self.http2 = os.getenv('ORS_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+        if self.http2 and not HTTP2_AVAILABLE:
+            logger.warning("ORS_HTTP2 is set but the 'h2' package is not installed, using HTTP/1.1")
+            self.http2 = False
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Persistent caches consulted before every geocoding request
+        self.geocode_cache = geocode_cache
+        self.reverse_geocode_cache = reverse_geocode_cache
+        self.route_cache = route_cache
+        
+        # Identical geocoding/routing calls in flight at the same time share one request
+        self.singleflight = SingleFlight()
+        self.reverse_geocode_limiter = reverse_geocode_limiter
+        
+        # Optional offline gazetteer, preferred over the API for route checkpoints
+        self.gazetteer = gazetteer
+        
+        # Douglas-Peucker tolerance for the route geometry handed back for storage
+        self.simplify_tolerance_m = float(os.getenv('ROUTE_SIMPLIFY_TOLERANCE_M', '50'))
+        
+        # Route sampling statistics
+        self._sampled_points = 0
+        self._unique_checkpoints = 0
+    
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=10.0,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        )
+    
+    async def open(self):
+        """Create the shared HTTP client (call once the event loop is running)"""
+        if self._client is not None and not self._client.is_closed:
+            return
+        self._client = self._new_client()
+        self._client_loop = asyncio.get_running_loop()
+        logger.info(f"OpenRouteService client opened (max {self.max_connections} connections, http2={self.http2})")
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+        logger.info(f"Geocode cache stats: {self.geocode_cache.stats()}")
+        logger.info(f"Reverse geocode cache stats: {self.reverse_geocode_cache.stats()}")
+        logger.info(f"Route cache stats: {self.route_cache.stats()}")
+        logger.info(f"Request coalescing stats: {self.singleflight.stats()}")
+        logger.info(f"Reverse geocode rate limiter stats: {self.reverse_geocode_limiter.stats()}")
+        if self.gazetteer:
+            logger.info(f"Gazetteer stats: {self.gazetteer.stats()}")
+        logger.info(f"Route sampling stats: {self.sampling_stats()}")
+    
+    def sampling_stats(self) -> dict:
+        """Get route sampling statistics (points looked up per unique checkpoint found)"""
+        return {
+            'sampled_points': self._sampled_points,
+            'unique_checkpoints': self._unique_checkpoints,
+            'lookups_per_checkpoint': round(self._sampled_points / self._unique_checkpoints, 2)
+            if self._unique_checkpoints else 0.0,
+        }
+    
+    @asynccontextmanager
+    async def client(self):
+        """
+        HTTP client for one API call.
+        Reuses the shared keep-alive client (opening it on first use); callers on a
+        different event loop than the one that opened it get a short-lived client,
+        since pooled connections cannot move between loops.
+        """
+        if self._client is None or self._client.is_closed:
+            await self.open()
+        if self._client_loop is asyncio.get_running_loop():
+            yield self._client
+            return
+        async with self._new_client() as client:
+            yield client
     
     async def geocode_address(self, address: str, country: Optional[str] = None) -> Optional[Dict]:
         """
@@ -81,8 +155,19 @@ class OpenRouteService:
             country: Country code to filter results (e.g., 'ES', 'CO', 'MX')
         
         Returns:
-            Dict with lat, lon, formatted_address, or None if not found
+            Dict with lat, lon, formatted_address, or None if not found.
+            Concurrent lookups of the same normalized address share one request.
         """
+        return await self.singleflight.do(
+            ("geocode", normalize_address(address, country)),
+            lambda: self._geocode_address(address, country)
+        )
+    
+    async def _geocode_address(self, address: str, country: Optional[str]) -> Optional[Dict]:
+        cached, result = await self.geocode_cache.get(address, country)
+        if cached:
+            return result
+        
         try:
             params = {
                 "api_key": self.api_key,
@@ -93,9 +178,9 @@ class OpenRouteService:
             if country:
                 params["boundary.country"] = country
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.client() as client:
                 response = await client.get(
-                    f"{self.base_url}/geocode/search",
+                    "/geocode/search",
                     params=params
                 )
                 response.raise_for_status()
@@ -107,7 +192,7 @@ class OpenRouteService:
                     coords = feature["geometry"]["coordinates"]
                     props = feature["properties"]
                     
-                    return {
+                    result = {
                         "lon": coords[0],
                         "lat": coords[1],
                         "formatted_address": props.get("label", address),
@@ -117,8 +202,11 @@ class OpenRouteService:
                         "county": props.get("county", ""),
                         "city": props.get("locality", "") or props.get("localadmin", "")
                     }
+                    await self.geocode_cache.put(address, country, result)
+                    return result
                 
                 logger.warning(f"No geocoding results found for: {address}")
+                await self.geocode_cache.put(address, country, None)
                 return None
                 
         except httpx.HTTPError as e:
@@ -140,8 +228,22 @@ class OpenRouteService:
             profile: Transport mode (driving-car, driving-hgv, cycling-regular, foot-walking)
         
         Returns:
-            Dict with distance (km), duration (hours), route_geometry, or None if failed
+            Dict with distance (km), duration (hours), route_geometry, or None if failed.
+            Routes between the same rounded endpoints are served from route_cache
+            (without the turn-by-turn instructions), and concurrent requests for
+            them share one API call.
         """
+        return await self.singleflight.do(
+            ("route", self.route_cache.key(origin_coords, dest_coords, profile)),
+            lambda: self._calculate_route(origin_coords, dest_coords, profile)
+        )
+    
+    async def _calculate_route(self, origin_coords: Tuple[float, float], dest_coords: Tuple[float, float],
+                               profile: str) -> Optional[Dict]:
+        cached = await self.route_cache.get(origin_coords, dest_coords, profile)
+        if cached:
+            return cached
+        
         try:
             body = {
                 "coordinates": [
@@ -155,11 +257,12 @@ class OpenRouteService:
                 "instructions": True
             }
             
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with self.client() as client:
                 response = await client.post(
-                    f"{self.base_url}/v2/directions/{profile}",
+                    f"/v2/directions/{profile}",
                     headers=self.headers,
-                    json=body
+                    json=body,
+                    timeout=15.0
                 )
                 response.raise_for_status()
                 
@@ -173,13 +276,15 @@ class OpenRouteService:
                     duration_seconds = summary["duration"]
                     duration_hours = duration_seconds / 3600
                     
-                    return {
+                    result = {
                         "distance_km": round(distance_km, 2),
                         "duration_hours": round(duration_hours, 2),
                         "duration_seconds": duration_seconds,
                         "geometry": route.get("geometry", None),
                         "instructions": route.get("segments", [])
                     }
+                    await self.route_cache.put(origin_coords, dest_coords, profile, result)
+                    return result
                 
                 logger.warning(f"No route found between coordinates")
                 return None
@@ -217,18 +322,23 @@ class OpenRouteService:
                     parts.append(recipient_province)
                 complete_recipient_address = ", ".join(parts)
             
+            # Both endpoints are independent: geocode them concurrently
             logger.info(f"Geocoding sender address: {complete_sender_address}, {sender_country}")
-            sender_geo = await self.geocode_address(complete_sender_address, sender_country)
-            
-            if not sender_geo:
-                logger.error(f"Could not geocode sender address: {complete_sender_address}")
-                return None
-            
             logger.info(f"Geocoding recipient address: {complete_recipient_address}, {recipient_country}")
-            recipient_geo = await self.geocode_address(complete_recipient_address, recipient_country)
+            sender_geo, recipient_geo = await asyncio.gather(
+                self.geocode_address(complete_sender_address, sender_country),
+                self.geocode_address(complete_recipient_address, recipient_country),
+                return_exceptions=True
+            )
             
-            if not recipient_geo:
-                logger.error(f"Could not geocode recipient address: {recipient_address}")
+            failed = False
+            for role, address, geo in (("sender", complete_sender_address, sender_geo),
+                                       ("recipient", complete_recipient_address, recipient_geo)):
+                if isinstance(geo, BaseException) or not geo:
+                    reason = f": {geo}" if isinstance(geo, BaseException) else ""
+                    logger.error(f"Could not geocode {role} address: {address}{reason}")
+                    failed = True
+            if failed:
                 return None
             
             logger.info("Calculating route...")
@@ -241,10 +351,9 @@ class OpenRouteService:
                 logger.error("Could not calculate route")
                 return None
             
-            estimated_days = max(3, min(7, int(route["distance_km"] / 400) + 2))
-            
-            if sender_geo.get("country") != recipient_geo.get("country"):
-                estimated_days = min(10, estimated_days + 3)
+            estimated_days = estimate_transit_days(
+                route["distance_km"], sender_geo.get("country") != recipient_geo.get("country")
+            )
             
             return {
                 "sender": {
@@ -277,9 +386,22 @@ class OpenRouteService:
 
     async def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict]:
         """
-        Reverse geocode coordinates to get location details including state/region
+        Reverse geocode coordinates to get location details including state/region.
+        Results are shared by every point of the same grid cell (reverse_geocode_cache),
+        including concurrent lookups in flight.
         """
+        return await self.singleflight.do(
+            ("reverse_geocode", self.reverse_geocode_cache.key(lat, lon)),
+            lambda: self._reverse_geocode(lat, lon)
+        )
+    
+    async def _reverse_geocode(self, lat: float, lon: float) -> Optional[Dict]:
+        cached, location = await self.reverse_geocode_cache.get(lat, lon)
+        if cached:
+            return location
+        
         try:
+            await self.reverse_geocode_limiter.acquire()
             params = {
                 "api_key": self.api_key,
                 "point.lat": lat,
@@ -287,20 +409,21 @@ class OpenRouteService:
                 "size": 1
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.client() as client:
                 response = await client.get(
-                    f"{self.base_url}/geocode/reverse",
+                    "/geocode/reverse",
                     params=params
                 )
                 response.raise_for_status()
                 
                 data = response.json()
                 
+                location = None
                 if data.get("features") and len(data["features"]) > 0:
                     feature = data["features"][0]
                     props = feature["properties"]
                     
-                    return {
+                    location = {
                         "country": props.get("country", ""),
                         "region": props.get("region", ""),
                         "locality": props.get("locality", "") or props.get("localadmin", ""),
@@ -308,7 +431,8 @@ class OpenRouteService:
                         "label": props.get("label", "")
                     }
                 
-                return None
+                await self.reverse_geocode_cache.put(lat, lon, location)
+                return location
                 
         except Exception as e:
             logger.error(f"Error reverse geocoding ({lat}, {lon}): {e}")
@@ -375,7 +499,7 @@ class OpenRouteService:
             elif isinstance(geometry_encoded, list):
                 coordinates = geometry_encoded
             
-            if not coordinates or len(coordinates) < 2:
+            if len(coordinates) < 2:
                 logger.warning("No valid coordinates found in geometry")
                 states = self._generate_interpolated_checkpoints(
                     sender_region, recipient_region, total_distance_km, min_checkpoints
@@ -388,27 +512,41 @@ class OpenRouteService:
             
             logger.info(f"Sampling {num_samples} points for {total_distance_km}km route")
             
-            total_points = len(coordinates)
-            step = max(1, total_points // (num_samples + 1))
-            
-            sample_indices = []
-            for i in range(1, num_samples + 1):
-                idx = min(i * step, total_points - 1)
-                sample_indices.append(idx)
+            # Equal spacing by distance, not by vertex, so dense city segments do not
+            # take every sample; snapped toward known towns when the gazetteer is loaded
+            sample_indices = distance_sample(
+                coordinates, num_samples,
+                nearest_place=self.gazetteer.nearest_place if self.gazetteer else None
+            )
             
             logger.info(f"Sampling {len(sample_indices)} points along route for localities")
             
-            for i, idx in enumerate(sample_indices):
-                if idx >= len(coordinates):
-                    continue
-                
-                if i > 0:
-                    await asyncio.sleep(0.4)
-                    
-                coord = coordinates[idx]
-                lon, lat = coord[0], coord[1]
-                
-                location = await self.reverse_geocode(lat, lon)
+            points = [(idx, coordinates[idx][1], coordinates[idx][0]) for idx in sample_indices]
+            
+            # The offline gazetteer answers most points; only its misses go online
+            offline = {}
+            if self.gazetteer:
+                for idx, lat, lon in points:
+                    location = self.gazetteer.reverse_geocode(lat, lon)
+                    if location:
+                        offline[idx] = location
+            online_points = [(lat, lon) for idx, lat, lon in points if idx not in offline]
+            
+            # Cells already seen on this corridor resolve locally; one query loads them all
+            await self.reverse_geocode_cache.prefetch(online_points)
+            
+            # One request per grid cell, resolved concurrently under the global rate limit
+            cells = {}
+            for lat, lon in online_points:
+                cells.setdefault(self.reverse_geocode_cache.key(lat, lon), (lat, lon))
+            api_calls = sum(not self.reverse_geocode_cache.contains(lat, lon) for lat, lon in cells.values())
+            resolved = dict(zip(cells, await asyncio.gather(
+                *(self.reverse_geocode(lat, lon) for lat, lon in cells.values())
+            )))
+            
+            # Reassemble in polyline order so the checkpoint sequence is unchanged
+            for idx, lat, lon in points:
+                location = offline.get(idx) or resolved[self.reverse_geocode_cache.key(lat, lon)]
                 
                 if location:
                     locality = location.get("locality") or location.get("county") or location.get("region")
@@ -484,6 +622,11 @@ class OpenRouteService:
                 if not already_exists:
                     states.append({"name": recipient_region, "type": "destination"})
             
+            self._sampled_points += len(points)
+            self._unique_checkpoints += len(all_found_locations)
+            lookups_per_checkpoint = len(points) / len(all_found_locations) if all_found_locations else 0.0
+            logger.info(f"Reverse geocoded {len(sample_indices)} points: {len(offline)} offline, {api_calls} API calls, "
+                        f"{len(all_found_locations)} unique checkpoints ({lookups_per_checkpoint:.2f} lookups each)")
             logger.info(f"Total route checkpoints: {len(states)} - {[s['name'] for s in states]}")
             return states
             
@@ -553,6 +696,23 @@ class OpenRouteService:
         
         return results
 
+    def simplify_geometry(self, geometry):
+        """
+        Encoded polyline reduced to the vertices within simplify_tolerance_m of the
+        route's shape (a few hundred instead of tens of thousands). Anything that is
+        not an encoded polyline is returned unchanged.
+        """
+        if not isinstance(geometry, str) or self.simplify_tolerance_m <= 0:
+            return geometry
+        try:
+            coordinates = decode_polyline(geometry)
+            simplified = simplify_polyline(coordinates, self.simplify_tolerance_m)
+            logger.info(f"Simplified route geometry from {len(coordinates)} to {len(simplified)} points")
+            return encode_polyline(simplified)
+        except ValueError as e:
+            logger.error(f"Could not simplify route geometry: {e}")
+            return geometry
+    
     async def get_full_route_with_checkpoints(self, sender_address: str, sender_country: str,
                                               recipient_address: str, recipient_country: str,
                                               sender_postal_code: str = "", sender_province: str = "",
@@ -610,7 +770,7 @@ class OpenRouteService:
                     "distance_km": distance_km,
                     "duration_hours": route_info["route"]["duration_hours"],
                     "estimated_days": estimated_days,
-                    "geometry": geometry
+                    "geometry": self.simplify_geometry(geometry)
                 },
                 "checkpoints": route_states
             }
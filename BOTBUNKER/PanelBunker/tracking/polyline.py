@@ -0,0 +1,100 @@
+"""
+Encoded polylines (Google algorithm, as returned by OpenRouteService)
+
+decode_polyline() works on the raw bytes with NumPy instead of looping over
+characters, and returns an (n, 2) float64 array of (lon, lat) rows.
+simplify_polyline() reduces a route to the vertices that matter for its
+shape (Douglas-Peucker), so sampling and storage work on a few hundred
+points instead of tens of thousands.
+"""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+from .gazetteer import EARTH_RADIUS_KM
+
+# Seven 5-bit chunks already cover any coordinate; more means a corrupt string
+_MAX_CHUNKS = 12
+
+
+def decode_polyline(encoded: Union[str, bytes, bytearray, memoryview], precision: int = 5) -> np.ndarray:
+    """
+    Decode an encoded polyline into an (n, 2) array of (lon, lat) rows.
+    ORS uses precision=5 by default. Raises ValueError on malformed input.
+    """
+    if isinstance(encoded, str):
+        encoded = encoded.encode("ascii")
+    chunks = np.frombuffer(encoded, dtype=np.uint8).astype(np.int64) - 63
+    if chunks.size == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    if chunks.min() < 0 or chunks.max() > 0x3f:
+        raise ValueError("Polyline contains characters outside the encoding alphabet")
+    
+    # A value ends at the first chunk without the continuation bit (0x20)
+    last_chunk = chunks < 0x20
+    if not last_chunk[-1]:
+        raise ValueError("Polyline ends in the middle of a value")
+    starts = np.flatnonzero(np.concatenate(([True], last_chunk[:-1])))
+    position = np.arange(chunks.size) - np.repeat(starts, np.diff(np.append(starts, chunks.size)))
+    if position.max() >= _MAX_CHUNKS:
+        raise ValueError("Polyline value too long")
+    values = np.add.reduceat((chunks & 0x1f) << (5 * position), starts)
+    if values.size % 2:
+        raise ValueError("Polyline has an odd number of values")
+    
+    # Zigzag-decoded (lat, lon) deltas, accumulated and swapped to (lon, lat)
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1).reshape(-1, 2)
+    return np.ascontiguousarray(np.cumsum(deltas, axis=0)[:, ::-1] / 10.0 ** precision)
+
+
+def encode_polyline(coordinates: Sequence, precision: int = 5) -> str:
+    """Encode [(lon, lat), ...] rows as a polyline string (inverse of decode_polyline)"""
+    points = np.asarray(coordinates, dtype=np.float64)
+    if points.size == 0:
+        return ""
+    scaled = np.round(points[:, 1::-1] * 10.0 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    
+    encoded = bytearray()
+    for value in ((deltas << 1) ^ (deltas >> 63)).tolist():
+        while value >= 0x20:
+            encoded.append((0x20 | (value & 0x1f)) + 63)
+            value >>= 5
+        encoded.append(value + 63)
+    return encoded.decode("ascii")
+
+
+def simplify_polyline(coordinates: Sequence, tolerance_m: float = 50.0) -> np.ndarray:
+    """
+    Douglas-Peucker simplification: the (lon, lat) vertices needed to keep every
+    dropped vertex within `tolerance_m` metres of the simplified line. The first
+    and last vertices are always kept.
+    """
+    points = np.asarray(coordinates, dtype=np.float64)[:, :2]
+    if len(points) <= 2 or tolerance_m <= 0:
+        return points
+    
+    # Local equirectangular projection in metres is accurate enough at this scale
+    radius_m = EARTH_RADIUS_KM * 1000
+    x = np.radians(points[:, 0]) * np.cos(np.radians(points[:, 1].mean())) * radius_m
+    y = np.radians(points[:, 1]) * radius_m
+    
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        distances = np.abs(px * dy - py * dx) / length if length > 0 else np.hypot(px, py)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
@@ -0,0 +1,230 @@
+"""
+Thread-safe PostgreSQL connection pool for the tracking system
+"""
+
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import List
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections.
+    
+    - Keeps between min_size and max_size open connections
+    - Callers wait up to `timeout` seconds for a free connection
+    - Connections idle for more than `health_check_after` seconds are
+      validated with a cheap query before being handed out
+    - Connections are always returned (or discarded if broken) by connection()
+    """
+    
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 10.0, health_check_after: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        
+        self._lock = threading.Condition()
+        self._idle: List[tuple] = []  # (connection, returned_at)
+        self._size = 0  # open connections (idle + in use)
+        self._closed = False
+        
+        # Statistics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._failed_health_checks = 0
+    
+    def open(self):
+        """Pre-open min_size connections"""
+        with self._lock:
+            missing = self.min_size - self._size
+            self._size += max(0, missing)
+        for _ in range(max(0, missing)):
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+    
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._lock:
+            self._created += 1
+        return conn
+    
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        """Check a connection before handing it out"""
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            with self._lock:
+                self._failed_health_checks += 1
+            return False
+    
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._discarded += 1
+            self._lock.notify()
+    
+    def getconn(self):
+        """Check out a connection, waiting up to `timeout` seconds"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_start = time.monotonic()
+        
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self._lock.wait(remaining)
+                
+                if waited:
+                    wait_time = time.monotonic() - wait_start
+                    self._wait_time_total += wait_time
+                    self._wait_time_max = max(self._wait_time_max, wait_time)
+                    waited = False
+                
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1  # reserve the slot before connecting
+            
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+            
+            with self._lock:
+                self._checkouts += 1
+            return conn
+    
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool"""
+        if not discard and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception as e:
+                logger.warning(f"Could not reset pooled connection, discarding it: {e}")
+                discard = True
+        
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+    
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with-block.
+        Commits on success, rolls back on error and always gives it back.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+                conn.commit()
+        except BaseException as e:
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) or conn.closed:
+                discard = True
+            else:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+    
+    def closeall(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+    
+    def stats(self) -> dict:
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 4),
+                'wait_time_max': round(self._wait_time_max, 4),
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_discarded': self._discarded,
+                'failed_health_checks': self._failed_health_checks,
+            }
@@ -0,0 +1,69 @@
+"""
+Token-bucket rate limiting for external API calls
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` calls per second with bursts of up to `burst`.
+    
+    acquire() reserves the next free slot under a thread lock and then sleeps
+    until it, so callers are served in arrival order. The bucket holds no
+    event-loop state and can be shared by every coroutine and thread in the
+    process, which makes it a global limit rather than a per-call one.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid token bucket: rate={rate}, burst={burst}")
+        
+        self.rate = rate
+        self.burst = burst
+        
+        self._lock = threading.Lock()
+        self._tokens = float(burst)  # negative when slots are reserved ahead
+        self._updated = time.monotonic()
+        
+        # Statistics
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+    
+    def _reserve(self) -> float:
+        """Take one token and return how long to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            
+            self._acquired += 1
+            if delay > 0:
+                self._waits += 1
+                self._wait_time_total += delay
+                self._wait_time_max = max(self._wait_time_max, delay)
+            return delay
+    
+    async def acquire(self):
+        """Wait for permission to make one call"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def stats(self) -> dict:
+        """Get limiter statistics (calls, waits, wait time...)"""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'acquired': self._acquired,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 4),
+                'wait_time_max': round(self._wait_time_max, 4),
+            }
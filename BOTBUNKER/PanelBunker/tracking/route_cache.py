@@ -0,0 +1,135 @@
+"""
+Persistent route cache for OpenRouteService
+
+Reships, delay recalculations and ETAs ask for the same routes over and
+over. calculate_route() results are stored in the route_cache table keyed
+by the routing profile and the origin and destination coordinates rounded
+to ROUTE_CACHE_PRECISION decimals (3 decimals is ~100 m), so any request
+between the same two addresses is served without calling the directions
+API.
+
+Lookups never fail the caller: a database error counts as a miss. Off the
+connection pool's event loop the cache is skipped like the geocode caches.
+"""
+
+import os
+import logging
+from typing import Optional, Dict, Tuple
+
+from .async_database import async_db_manager
+from .geocode_cache import db_usable
+
+logger = logging.getLogger(__name__)
+
+
+def route_key(origin: Tuple[float, float], destination: Tuple[float, float], profile: str,
+              precision: int = 3) -> str:
+    """
+    Cache key for a route between two (lon, lat) points, e.g.
+    "driving-car:-3.704,40.417:2.174,41.403" with precision=3.
+    """
+    def point(lon: float, lat: float) -> str:
+        # + 0.0 turns a rounded -0.0 into 0.0 so both sides of zero share a key
+        return f"{round(lon, precision) + 0.0:.{precision}f},{round(lat, precision) + 0.0:.{precision}f}"
+    return f"{profile}:{point(*origin)}:{point(*destination)}"
+
+
+class RouteCache:
+    """
+    Read-through cache of calculate_route() results backed by async_db_manager.
+    
+    - Entries live ROUTE_CACHE_TTL_DAYS (road networks change slowly)
+    - The turn-by-turn instructions are not stored, only distance, duration
+      and the full encoded geometry
+    - "No route" answers are not cached
+    """
+    
+    # calculate_route() fields kept in the cache
+    FIELDS = ("distance_km", "duration_hours", "duration_seconds", "geometry")
+    
+    def __init__(self, db, ttl_seconds: float, precision: int = 3):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._errors = 0
+        self._skipped = 0
+        self._loop_warned = False
+    
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+    
+    def _db_usable(self) -> bool:
+        if db_usable(self.db, "Route cache", self._loop_warned):
+            return True
+        self._loop_warned = True
+        self._skipped += 1
+        return False
+    
+    def key(self, origin: Tuple[float, float], destination: Tuple[float, float], profile: str) -> str:
+        return route_key(origin, destination, profile, self.precision)
+    
+    async def get(self, origin: Tuple[float, float], destination: Tuple[float, float],
+                  profile: str) -> Optional[Dict]:
+        """Look up a route before calling the API (None on a miss)"""
+        if not self.enabled:
+            return None
+        if not self._db_usable():
+            self._misses += 1
+            return None
+        
+        key = self.key(origin, destination, profile)
+        try:
+            route = await self.db.get_cached_route(key)
+        except Exception as e:
+            logger.warning(f"Route cache lookup failed for {key}: {e}")
+            self._errors += 1
+            route = None
+        
+        if route is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return route
+    
+    async def put(self, origin: Tuple[float, float], destination: Tuple[float, float],
+                  profile: str, route: Dict):
+        """Store an API answer"""
+        if not self.enabled or not self._db_usable():
+            return
+        
+        key = self.key(origin, destination, profile)
+        try:
+            if await self.db.save_cached_route(key, {field: route.get(field) for field in self.FIELDS},
+                                               self.ttl_seconds):
+                self._writes += 1
+            else:
+                self._errors += 1
+        except Exception as e:
+            logger.warning(f"Route cache write failed for {key}: {e}")
+            self._errors += 1
+    
+    def stats(self) -> dict:
+        """Get cache statistics (hits, misses, hit rate...)"""
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+            'writes': self._writes,
+            'errors': self._errors,
+            'skipped': self._skipped,
+        }
+
+
+# Shared by every OpenRouteService instance (ROUTE_CACHE_TTL_DAYS=0 disables it)
+route_cache = RouteCache(
+    async_db_manager,
+    ttl_seconds=float(os.getenv('ROUTE_CACHE_TTL_DAYS', '30')) * 86400,
+    precision=int(os.getenv('ROUTE_CACHE_PRECISION', '3'))
+)
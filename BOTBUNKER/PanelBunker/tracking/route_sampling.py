@@ -0,0 +1,82 @@
+"""
+Choosing which polyline vertices to reverse geocode
+
+Sampling by vertex index follows vertex density: city streets with many
+vertices get many samples (all resolving to the same town) while long
+motorway stretches with few vertices get almost none. distance_sample()
+spaces samples at equal distances along the route instead, and can nudge
+each sample toward the nearest known locality.
+"""
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .gazetteer import EARTH_RADIUS_KM
+
+# (lat, lon) -> (lat, lon) of the nearest known locality, or None
+NearestPlace = Callable[[float, float], Optional[Tuple[float, float]]]
+
+
+def cumulative_distances_km(coordinates: Sequence) -> np.ndarray:
+    """Distance in km from the first vertex to every vertex of a [(lon, lat), ...] polyline"""
+    points = np.radians(np.asarray(coordinates, dtype=np.float64)[:, :2])
+    lon, lat = points[:, 0], points[:, 1]
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    segments = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return np.concatenate(([0.0], np.cumsum(segments)))
+
+
+def index_sample(total_points: int, num_samples: int) -> List[int]:
+    """Legacy sampler: every `total_points // (num_samples + 1)`-th vertex"""
+    step = max(1, total_points // (num_samples + 1))
+    return [min(i * step, total_points - 1) for i in range(1, num_samples + 1)]
+
+
+def _distances_to_km(lon: np.ndarray, lat: np.ndarray, place_lat: float, place_lon: float) -> np.ndarray:
+    place_lat, place_lon = np.radians(place_lat), np.radians(place_lon)
+    a = np.sin((lat - place_lat) / 2) ** 2 + np.cos(lat) * np.cos(place_lat) * np.sin((lon - place_lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_sample(coordinates: Sequence, num_samples: int,
+                    nearest_place: Optional[NearestPlace] = None) -> List[int]:
+    """
+    Indices of `num_samples` vertices at equal distance intervals along the route
+    (origin and destination excluded), in route order and without duplicates.
+    
+    With nearest_place, each sample moves, within half an interval either way,
+    to the vertex closest to the locality nearest to it, so it resolves to that
+    town rather than to open countryside.
+    """
+    total_points = len(coordinates)
+    if total_points < 2 or num_samples < 1:
+        return []
+    
+    cumulative = cumulative_distances_km(coordinates)
+    total_km = cumulative[-1]
+    if total_km <= 0:
+        return list(dict.fromkeys(index_sample(total_points, num_samples)))
+    
+    interval = total_km / (num_samples + 1)
+    targets = interval * np.arange(1, num_samples + 1)
+    
+    # Nearest vertex to each target distance
+    after = np.clip(np.searchsorted(cumulative, targets), 1, total_points - 1)
+    before = after - 1
+    indices = np.where(targets - cumulative[before] <= cumulative[after] - targets, before, after)
+    
+    if nearest_place is not None:
+        points = np.radians(np.asarray(coordinates, dtype=np.float64)[:, :2])
+        starts = np.searchsorted(cumulative, targets - interval / 2, side='left')
+        ends = np.searchsorted(cumulative, targets + interval / 2, side='right')
+        for k, index in enumerate(indices):
+            lon, lat = coordinates[index][0], coordinates[index][1]
+            place = nearest_place(lat, lon)
+            if place is None or ends[k] <= starts[k]:
+                continue
+            window = points[starts[k]:ends[k]]
+            distances = _distances_to_km(window[:, 0], window[:, 1], place[0], place[1])
+            indices[k] = starts[k] + int(np.argmin(distances))
+    
+    return list(dict.fromkeys(int(index) for index in indices))
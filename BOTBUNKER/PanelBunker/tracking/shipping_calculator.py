@@ -1,57 +1,88 @@
 """
-Shipping time calculator using OpenRouteService API for real routing
+Shipping time calculator: configured transit days offline, OpenRouteService
+real routing when a country pair is not configured
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
+import os
 import asyncio
-from typing import Tuple, Optional
+from concurrent.futures import CancelledError
+from typing import Awaitable, Callable, Sequence, Tuple, Optional, TypeVar
 import logging
 
-from .openroute_service import ors_service
+from .openroute_service import ors_service, estimate_transit_days
+from .business_days import business_calendar
+from .eta_engine import EtaEngine
+from .eta_batch import EtaBatch, compute_delivery_estimates, format_delivery_dates, changed_estimates
+from .geocode_cache import geocode_cache
+from .gazetteer import haversine_km
 from .database import db_manager
+from .models import STATUS_EN_TRANSITO
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class ShippingCalculator:
-    """Calculate shipping times using OpenRouteService real routing"""
+    """
+    Calculate shipping times from the shipping_routes matrix and cached
+    coordinates, or OpenRouteService real routing when neither is known.
+    
+    The routing API is async only: handlers await calculate_estimated_delivery().
+    Synchronous code (scripts, worker threads) goes through
+    calculate_estimated_delivery_sync(), which never runs on the bot's loop thread.
+    """
+    
+    # Common country code mappings
+    COUNTRY_CODES = {
+        'ESPAÑA': 'ES',
+        'SPAIN': 'ES',
+        'COLOMBIA': 'CO',
+        'MÉXICO': 'MX',
+        'MEXICO': 'MX',
+        'ARGENTINA': 'AR',
+        'CHILE': 'CL',
+        'PERÚ': 'PE',
+        'PERU': 'PE',
+        'ECUADOR': 'EC',
+        'FRANCIA': 'FR',
+        'FRANCE': 'FR',
+        'ITALIA': 'IT',
+        'ITALY': 'IT',
+        'ALEMANIA': 'DE',
+        'GERMANY': 'DE',
+        'PORTUGAL': 'PT',
+        'REINO UNIDO': 'GB',
+        'UNITED KINGDOM': 'GB',
+        'UK': 'GB',
+        'ESTADOS UNIDOS': 'US',
+        'UNITED STATES': 'US',
+        'USA': 'US',
+        'CANADÁ': 'CA',
+        'CANADA': 'CA'
+    }
     
     def __init__(self):
         self.weekdays_only = True  # Only count business days (Monday-Friday)
+        # The bot's event loop, where the sync bridge runs coroutines (see bind_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sync_timeout = 60.0
+        # shipping_routes in memory (loaded by eta.start() in post_init)
+        self.eta = EtaEngine(self._normalize_country_code,
+                             refresh_seconds=float(os.getenv('ETA_MATRIX_REFRESH_SECONDS', '600')))
+    
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop]):
+        """
+        Set the event loop that owns the shared ORS client and database pool
+        (call from post_init; None on shutdown). Sync callers in other threads
+        then run their coroutines there instead of on a loop of their own.
+        """
+        self._loop = loop
     
     def _normalize_country_code(self, country: str) -> str:
         """Convert country name to ISO 2-letter code for geocoding"""
         country = country.strip().upper()
-        
-        # Common country code mappings
-        country_codes = {
-            'ESPAÑA': 'ES',
-            'SPAIN': 'ES',
-            'COLOMBIA': 'CO',
-            'MÉXICO': 'MX',
-            'MEXICO': 'MX',
-            'ARGENTINA': 'AR',
-            'CHILE': 'CL',
-            'PERÚ': 'PE',
-            'PERU': 'PE',
-            'ECUADOR': 'EC',
-            'FRANCIA': 'FR',
-            'FRANCE': 'FR',
-            'ITALIA': 'IT',
-            'ITALY': 'IT',
-            'ALEMANIA': 'DE',
-            'GERMANY': 'DE',
-            'PORTUGAL': 'PT',
-            'REINO UNIDO': 'GB',
-            'UNITED KINGDOM': 'GB',
-            'UK': 'GB',
-            'ESTADOS UNIDOS': 'US',
-            'UNITED STATES': 'US',
-            'USA': 'US',
-            'CANADÁ': 'CA',
-            'CANADA': 'CA'
-        }
-        
-        return country_codes.get(country, country[:2] if len(country) > 2 else country)
+        return self.COUNTRY_CODES.get(country, country[:2] if len(country) > 2 else country)
     
     def _extract_country_from_postal(self, country_postal: str) -> str:
         """Extract country from country_postal field"""
@@ -69,14 +100,17 @@ class ShippingCalculator:
                 return text.split(separator)[0].strip()
         return text
     
-    async def calculate_estimated_delivery_async(self, sender_address: str, sender_country: str,
-                                                 recipient_address: str, recipient_country_postal: str,
-                                                 delay_days: int = 0) -> Tuple[str, int, Optional[dict]]:
+    async def calculate_estimated_delivery(self, sender_address: str, sender_country: str,
+                                           recipient_address: str, recipient_country_postal: str,
+                                           delay_days: int = 0, recipient_province: str = "") -> Tuple[str, int, Optional[dict]]:
         """
-        Calculate estimated delivery using OpenRouteService API
+        Calculate estimated delivery, offline when possible (offline_transit_days),
+        otherwise using OpenRouteService API.
+        Business days skip the holidays of the recipient's country and province.
         
         Returns:
-            Tuple of (formatted_date, total_days, route_info)
+            Tuple of (formatted_date, total_days, route_info); route_info is None
+            unless OpenRouteService was called and found a route
         """
         try:
             # Extract recipient country
@@ -86,32 +120,42 @@ class ShippingCalculator:
             sender_country_code = self._normalize_country_code(sender_country)
             recipient_country_code = self._normalize_country_code(recipient_country)
             
-            logger.info(f"Calculating route from {sender_address} ({sender_country_code}) to {recipient_address} ({recipient_country_code})")
-            
-            # Get route info from OpenRouteService
-            route_info = await ors_service.get_route_info(
+            # Offline first: transit matrix and cached coordinates, no API requests
+            route_info = None
+            estimated_days = await self.offline_transit_days(
                 sender_address, sender_country_code,
                 recipient_address, recipient_country_code
             )
             
-            if route_info:
-                # Use API-calculated estimated days
-                estimated_days = route_info["route"]["estimated_days"]
-                logger.info(f"Route calculated: {route_info['route']['distance_km']}km, {estimated_days} days")
+            if estimated_days is not None:
+                logger.info(f"Offline estimate from {sender_country_code} to {recipient_country_code}: {estimated_days} days")
             else:
-                # Fallback to basic estimation
-                logger.warning(f"Could not calculate route, using fallback estimation")
-                if sender_country == recipient_country:
-                    estimated_days = 2  # Domestic
+                logger.info(f"Calculating route from {sender_address} ({sender_country_code}) to {recipient_address} ({recipient_country_code})")
+                
+                # Get route info from OpenRouteService
+                if ors_service:
+                    route_info = await ors_service.get_route_info(
+                        sender_address, sender_country_code,
+                        recipient_address, recipient_country_code
+                    )
+                
+                if route_info:
+                    # Use API-calculated estimated days
+                    estimated_days = route_info["route"]["estimated_days"]
+                    logger.info(f"Route calculated: {route_info['route']['distance_km']}km, {estimated_days} days")
                 else:
-                    estimated_days = 10  # International default
-                route_info = None
+                    # Fallback to basic estimation
+                    logger.warning(f"Could not calculate route, using fallback estimation")
+                    if sender_country == recipient_country:
+                        estimated_days = 2  # Domestic
+                    else:
+                        estimated_days = 10  # International default
             
             # Add delays
             total_days = estimated_days + delay_days
             
             # Calculate delivery date (business days only)
-            delivery_date = self._add_business_days(datetime.now(), total_days)
+            delivery_date = self._add_business_days(datetime.now(), total_days, recipient_country_code, recipient_province)
             formatted_date = delivery_date.strftime("%d/%m/%Y")
             
             return formatted_date, total_days, route_info
@@ -125,33 +169,71 @@ class ShippingCalculator:
             formatted_date = delivery_date.strftime("%d/%m/%Y")
             return formatted_date, total_days, None
     
-    def calculate_estimated_delivery(self, sender_address: str, sender_country: str,
-                                    recipient_address: str, recipient_country_postal: str,
-                                    delay_days: int = 0) -> Tuple[str, int]:
+    async def offline_transit_days(self, sender_address: str, sender_country_code: str,
+                                   recipient_address: str, recipient_country_code: str) -> Optional[int]:
+        """
+        Transit days without calling OpenRouteService: the shipping_routes
+        matrix, raised by the great-circle distance when both addresses have
+        cached coordinates. None when neither is known.
+        """
+        (_, sender_geo), (_, recipient_geo) = await asyncio.gather(
+            geocode_cache.get(sender_address, sender_country_code),
+            geocode_cache.get(recipient_address, recipient_country_code)
+        )
+        distance_km = None
+        if sender_geo and recipient_geo:
+            distance_km = haversine_km(sender_geo["lat"], sender_geo["lon"], recipient_geo["lat"], recipient_geo["lon"])
+        return self.eta.estimate_days(sender_country_code, recipient_country_code, distance_km)
+    
+    def _run_sync(self, make_coro: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a coroutine for a synchronous caller. In a worker thread while the
+        bot is running it is scheduled on the bot's loop (which owns the pooled
+        connections) and waited for; with no loop bound it gets its own loop,
+        where the persistent caches skip the database once the pool belongs to
+        another loop (AsyncDatabaseManager.serves_running_loop).
+        Raises RuntimeError on a thread with a running loop: blocking there would
+        stall every other update, so async code must await instead.
         """
-        Synchronous wrapper for calculate_estimated_delivery_async
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("Sync ShippingCalculator call from a running event loop; await the async method instead")
+        
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return asyncio.run(make_coro())
+        
+        future = asyncio.run_coroutine_threadsafe(make_coro(), loop)
+        try:
+            return future.result(self.sync_timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+    
+    def calculate_estimated_delivery_sync(self, sender_address: str, sender_country: str,
+                                          recipient_address: str, recipient_country_postal: str,
+                                          delay_days: int = 0, recipient_province: str = "") -> Tuple[str, int]:
+        """
+        Blocking calculate_estimated_delivery() for synchronous callers (never
+        from async code, see _run_sync)
         
         Returns:
             Tuple of (formatted_date, total_days)
         """
         try:
-            # Run async function in event loop
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If already in async context, create new task
-                import nest_asyncio
-                nest_asyncio.apply()
-            
-            formatted_date, total_days, route_info = loop.run_until_complete(
-                self.calculate_estimated_delivery_async(
+            formatted_date, total_days, route_info = self._run_sync(
+                lambda: self.calculate_estimated_delivery(
                     sender_address, sender_country,
                     recipient_address, recipient_country_postal,
-                    delay_days
+                    delay_days, recipient_province
                 )
             )
             return formatted_date, total_days
-        except Exception as e:
-            logger.error(f"Error in sync calculate_estimated_delivery: {e}")
+        except (TimeoutError, CancelledError) as e:
+            logger.error(f"Error in sync calculate_estimated_delivery: {e!r}")
             # Ultimate fallback
             estimated_days = 10
             total_days = estimated_days + delay_days
@@ -159,18 +241,124 @@ class ShippingCalculator:
             formatted_date = delivery_date.strftime("%d/%m/%Y")
             return formatted_date, total_days
     
-    def _add_business_days(self, start_date: datetime, business_days: int) -> datetime:
-        """Add business days to a date (skipping weekends)"""
-        current_date = start_date
-        days_added = 0
+    def format_delivery_date(self, total_days: int, start: Optional[datetime] = None,
+                             country: Optional[str] = None, province: Optional[str] = None) -> str:
+        """
+        Delivery date (dd/mm/YYYY) total_days business days after start (default:
+        now), skipping the holidays of the destination country code and province
+        """
+        return self._add_business_days(start or datetime.now(), total_days, country, province).strftime("%d/%m/%Y")
+    
+    def destination_code(self, recipient_country_postal: str) -> str:
+        """Country code of a recipient country (or legacy country_postal) field"""
+        _, destination = self.extract_countries("", recipient_country_postal)
+        return self._normalize_country_code(destination)
+    
+    def delivery_region(self, tracking) -> Tuple[str, str]:
+        """Destination (country code, province) whose holidays apply to a Tracking's delivery"""
+        return (self.destination_code(tracking.recipient_country or tracking.country_postal),
+                tracking.recipient_province or "")
+    
+    def base_transit_days(self, tracking) -> Optional[int]:
+        """
+        Transit days without delays for a Tracking or TrackingSummary, from stored
+        columns only: estimated_days, else the estimate for the stored route
+        distance. None when neither is stored.
+        """
+        if tracking.estimated_days is not None:
+            return tracking.estimated_days
+        if tracking.route_distance_km is None:
+            return None
+        
+        origin, _ = self.extract_countries(tracking.sender_country, "")
+        destination = self.destination_code(tracking.recipient_country or tracking.country_postal)
+        international = self._normalize_country_code(origin) != destination
+        return estimate_transit_days(float(tracking.route_distance_km), international)
+    
+    def stored_delivery(self, tracking) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Estimated delivery stored on a Tracking or TrackingSummary. Never geocodes
+        or routes, so list screens can call it for every row.
+        
+        Returns:
+            Tuple of (formatted_date, total_days), each None when not stored yet
+        """
+        base_days = self.base_transit_days(tracking)
+        total_days = base_days + (tracking.actual_delay_days or 0) if base_days is not None else None
+        return tracking.estimated_delivery_date, total_days
+    
+    async def estimate_tracking_delivery(self, tracking, start: Optional[datetime] = None) -> Tuple[str, int, Optional[float]]:
+        """
+        Estimated delivery for a tracking, counted from start (default: now) and
+        including its delays. Only calls OpenRouteService when no transit days
+        are stored yet.
         
-        while days_added < business_days:
-            current_date += timedelta(days=1)
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current_date.weekday() < 5:  
-                days_added += 1
+        Returns:
+            Tuple of (formatted_date, base_days, route_distance_km)
+        """
+        base_days = self.base_transit_days(tracking)
+        distance_km = tracking.route_distance_km
+        if base_days is None:
+            _, base_days, route_info = await self.calculate_estimated_delivery(
+                tracking.sender_address,
+                tracking.sender_country,
+                tracking.delivery_address,
+                tracking.recipient_country or tracking.country_postal,
+                recipient_province=tracking.recipient_province or ""
+            )
+            if route_info:
+                distance_km = route_info["route"]["distance_km"]
         
-        return current_date
+        total_days = base_days + (tracking.actual_delay_days or 0)
+        return self.format_delivery_date(total_days, start, *self.delivery_region(tracking)), base_days, distance_km
+    
+    def delay_delivery_date(self, tracking, delay_days: int) -> str:
+        """
+        New estimated delivery date after adding delay_days: the stored date moved
+        by that many business days, or recounted from now if there is none.
+        """
+        region = self.delivery_region(tracking)
+        try:
+            start = datetime.strptime(tracking.estimated_delivery_date, "%d/%m/%Y")
+        except (TypeError, ValueError):
+            base_days = self.base_transit_days(tracking) or 0
+            return self.format_delivery_date(base_days + (tracking.actual_delay_days or 0) + delay_days, None, *region)
+        return self.format_delivery_date(delay_days, start, *region)
+    
+    def recalculate_stored_deliveries(self, statuses: Sequence[str] = (STATUS_EN_TRANSITO,), dry_run: bool = False,
+                                      keep_transit_days: bool = False, page_size: int = 1000) -> dict:
+        """
+        Recompute the stored delivery estimate of every tracking in the given
+        statuses in one vectorized pass (see tracking.eta_batch) and write back
+        the ones that changed. Uses the loaded transit matrix (eta) and never
+        calls OpenRouteService. With dry_run nothing is written.
+        
+        Returns:
+            Dict with 'trackings', 'changed' and 'updated' counts and a 'sample'
+            of (tracking_id, old date, new date) changes
+        """
+        rows = db_manager.get_delivery_estimate_inputs(statuses)
+        batch = EtaBatch.from_rows(rows, self._normalize_country_code, self.destination_code)
+        base_days, dates = compute_delivery_estimates(batch, self.eta, business_calendar, keep_transit_days)
+        changes = changed_estimates(batch, base_days, format_delivery_dates(dates))
+        
+        stored_dates = dict(zip(batch.tracking_ids, batch.stored_dates))
+        result = {
+            'trackings': len(batch),
+            'changed': len(changes),
+            'updated': 0,
+            'sample': [(tracking_id, stored_dates[tracking_id], date) for tracking_id, _, date in changes[:10]],
+        }
+        if changes and not dry_run:
+            result['updated'] = db_manager.update_delivery_estimates(changes, page_size=page_size)
+        logger.info(f"Delivery estimates recalculated{' (dry run)' if dry_run else ''}: "
+                    f"{result['trackings']} trackings, {result['changed']} changed, {result['updated']} updated")
+        return result
+    
+    def _add_business_days(self, start_date: datetime, business_days: int,
+                           country: Optional[str] = None, province: Optional[str] = None) -> datetime:
+        """Add business days to a date (skipping weekends and the country/province holidays)"""
+        return business_calendar.add_business_days(start_date, business_days, country, province)
     
     def recalculate_delivery_with_delay(self, tracking_id: str, additional_delay_days: int) -> Optional[str]:
         """Recalculate delivery date when adding delay"""
@@ -179,16 +367,7 @@ class ShippingCalculator:
             if not tracking:
                 return None
             
-            # Calculate new delivery date with total delays
-            new_date, total_days = self.calculate_estimated_delivery(
-                tracking.sender_address,
-                tracking.sender_country, 
-                tracking.delivery_address,
-                tracking.country_postal,
-                tracking.actual_delay_days + additional_delay_days
-            )
-            
-            return new_date
+            return self.delay_delivery_date(tracking, additional_delay_days)
         except Exception as e:
             logger.error(f"Error recalculating delivery for {tracking_id}: {e}")
             return None
@@ -0,0 +1,68 @@
+"""
+Request coalescing ("singleflight") for identical in-flight calls
+"""
+
+import asyncio
+import threading
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution.
+    
+    do(key, call) starts call() as a task unless a call with that key is
+    already in flight, in which case it waits for that one's result (or
+    exception) instead. Keys are (kind, ...) tuples; coalesced calls are
+    counted per kind. Nothing is kept once a call finishes: this removes
+    duplicate work during bursts, it is not a cache.
+    
+    The shared task is shielded, so a caller that gets cancelled does not
+    cancel it for the others. Tasks are bound to their event loop, so calls
+    only coalesce with calls on the same loop.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        
+        # Statistics
+        self._started: Counter = Counter()
+        self._coalesced: Counter = Counter()
+    
+    async def do(self, key: Tuple, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call(), or join the in-flight call with the same key"""
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._calls.get(flight_key)
+            if task is None:
+                task = asyncio.ensure_future(call())
+                self._calls[flight_key] = task
+                task.add_done_callback(lambda done: self._forget(flight_key, done))
+                self._started[key[0]] += 1
+            else:
+                self._coalesced[key[0]] += 1
+        return await asyncio.shield(task)
+    
+    def _forget(self, flight_key: Tuple[int, Hashable], task: asyncio.Task):
+        with self._lock:
+            if self._calls.get(flight_key) is task:
+                del self._calls[flight_key]
+        # Every caller may have been cancelled; mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> dict:
+        """Get coalescing statistics (calls started and coalesced, per kind)"""
+        with self._lock:
+            kinds = sorted(set(self._started) | set(self._coalesced))
+            return {
+                'in_flight': len(self._calls),
+                'started': sum(self._started.values()),
+                'coalesced': sum(self._coalesced.values()),
+                'by_kind': {kind: {'started': self._started[kind], 'coalesced': self._coalesced[kind]}
+                            for kind in kinds},
+            }